@@ -0,0 +1,18 @@
+#!/bin/bash -e
+#SBATCH --job-name=b4
+#SBATCH --output=job-%A.out
+#SBATCH --error=job-%A.out
+#SBATCH --nodes=2
+#SBATCH --time=00:10:00
+#SBATCH --exclusive
+#SBATCH --qos=gp_debug
+#############################
+
+# Load dataClay
+module load hdf5 python/3.12 dataclay/edge
+
+# Pin the backend executor threads to the two sockets
+export DATACLAY_EXECUTOR_NUMA_NODES=0,1
+
+# Deploy dataClay and run client
+dataclay_job_v1 client.py
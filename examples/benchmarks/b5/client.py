@@ -0,0 +1,30 @@
+"""Microbenchmark of the access to the properties of a local (loaded) object.
+
+It does not need a dataClay deployment: objects that are not persistent are local and loaded,
+which is the same path followed by persistent objects inside activemethods.
+"""
+
+import timeit
+
+from dataclay import DataClayObject
+
+iterations = 1_000_000
+
+
+class Basic:
+    def __init__(self):
+        self.value = 0
+
+
+class Local(DataClayObject):
+    value: int
+
+    def __init__(self):
+        self.value = 0
+
+
+for name, obj in (("basic", Basic()), ("dataclay", Local())):
+    get_time = timeit.timeit("obj.value", globals={"obj": obj}, number=iterations)
+    set_time = timeit.timeit("obj.value = 1", globals={"obj": obj}, number=iterations)
+    print(f"Time {name} get: {get_time:0.5f} seconds")
+    print(f"Time {name} set: {set_time:0.5f} seconds")
@@ -0,0 +1,56 @@
+"""Memory used by each proxy of a remote object.
+
+It does not need a dataClay deployment. Proxies with the full metadata are the ones created
+by ``get_by_id``, and compact proxies the ones created when a client unpickles references
+(e.g. the result of an activemethod that returns a list of objects).
+"""
+
+import tracemalloc
+import uuid
+from weakref import WeakValueDictionary
+
+from dataclay import DataClayObject
+from dataclay.dataclay_object import ProxyMetadata
+from dataclay.metadata.kvdata import ObjectMetadata
+
+num_proxies = 100_000
+
+
+class Chunk(DataClayObject):
+    items: list
+
+
+backend_id = uuid.uuid4()
+class_name = Chunk.__module__ + "." + Chunk.__name__
+
+
+def full_proxy(object_id):
+    proxy = Chunk.new_proxy_object()
+    proxy._dc_meta = ObjectMetadata(
+        id=object_id, dataset_name="admin", class_name=class_name, master_backend_id=backend_id
+    )
+    return proxy
+
+
+def compact_proxy(object_id):
+    return Chunk.new_proxy_object(ProxyMetadata(object_id, "admin", class_name, backend_id))
+
+
+for name, new_proxy in (("full", full_proxy), ("compact", compact_proxy)):
+    # The IDs are not counted, since they are received from the backend anyway
+    object_ids = [uuid.uuid4() for _ in range(num_proxies)]
+    inmemory_objects = WeakValueDictionary()
+    proxies = []
+
+    tracemalloc.start()
+    for object_id in object_ids:
+        proxy = new_proxy(object_id)
+        proxy._dc_is_local = False
+        proxy._dc_is_loaded = False
+        proxy._dc_is_registered = True
+        inmemory_objects[object_id] = proxy
+        proxies.append(proxy)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Memory per {name} proxy: {memory / num_proxies:0.1f} bytes")
@@ -0,0 +1,35 @@
+"""Tail latency of activemethods in a backend holding many loaded objects.
+
+The people are made persistent at once, which is a bulk load in the backend. Run it twice,
+with ``DATACLAY_GC_FREEZE=false`` and with the default settings, to compare the latency
+with and without freezing the loaded objects in the garbage collector.
+"""
+
+import statistics
+import time
+
+from dataclay import Client
+from dataclay.contrib.modeltest.classes import Box, Counter, Person
+
+num_people = 500_000
+num_calls = 10_000
+
+client = Client()
+client.start()
+
+people = Box([Person(f"Person {i}", i % 100) for i in range(num_people)])
+people.make_persistent()
+
+counter = Counter()
+counter.make_persistent()
+
+latencies = []
+for _ in range(num_calls):
+    start_time = time.perf_counter()
+    counter.inc()
+    latencies.append(time.perf_counter() - start_time)
+
+quantiles = statistics.quantiles(latencies, n=100)
+print(f"Latency p50: {quantiles[49] * 1000:0.3f} ms")
+print(f"Latency p99: {quantiles[98] * 1000:0.3f} ms")
+print(f"Latency max: {max(latencies) * 1000:0.3f} ms")
@@ -0,0 +1,20 @@
+#!/bin/bash -e
+#SBATCH --job-name=b7
+#SBATCH --output=job-%A.out
+#SBATCH --error=job-%A.out
+#SBATCH --nodes=2
+#SBATCH --time=00:20:00
+#SBATCH --exclusive
+#SBATCH --qos=gp_debug
+#############################
+
+# Load dataClay
+module load hdf5 python/3.12 dataclay/edge
+
+# Without freezing the loaded objects
+export DATACLAY_GC_FREEZE=false
+dataclay_job_v1 client.py
+
+# With the default GC settings
+export DATACLAY_GC_FREEZE=true
+dataclay_job_v1 client.py
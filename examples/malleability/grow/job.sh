@@ -15,6 +15,9 @@ module load DATACLAY/edge
 hostnames=($(scontrol show hostname $SLURM_JOB_NODELIST))
 hostnames=($(add_network_suffix "-ib0" "${hostnames[@]}"))
 
+# Move objects to the new backends when they join
+export DATACLAY_SCALE_OUT_REBALANCE=true
+
 # Deploy dataClay
 deploy_dataclay \
     --redis ${hostnames[0]} \
@@ -5,7 +5,7 @@ from typing import ClassVar, Generic, Type, TypeVar
 
 from .config import get_runtime
 from .dataclay_object import DataClayObject
-from .event_loop import get_dc_event_loop
+from .event_loop import get_dc_call_loop, get_dc_event_loop
 
 ignore_fields = frozenset(
     [
@@ -30,7 +30,15 @@ ignore_fields = frozenset(
 )
 
 local_fields = frozenset(
-    ["_dc_meta", "_dc_is_local", "_dc_is_loaded", "_dc_is_registered", "_dc_is_replica", "__dict__"]
+    [
+        "_dc_meta",
+        "_dc_proxy_meta",
+        "_dc_is_local",
+        "_dc_is_loaded",
+        "_dc_is_registered",
+        "_dc_is_replica",
+        "__dict__",
+    ]
 )
 
 
@@ -67,7 +75,7 @@ def virtualactivemethod(func):
                 # TODO what if it is a coroutinefunction?
                 return asyncio.run_coroutine_threadsafe(
                     get_runtime().call_remote_method(self, func.__name__, args, kwargs),
-                    get_dc_event_loop(),
+                    get_dc_call_loop(dc_meta.master_backend_id),
                 ).result()
         except Exception:
             logger.debug("Error calling virtualactivemethod '%s'", func.__name__, exc_info=True)
@@ -148,7 +156,7 @@ class AlienDataClayObject(DataClayObject, Generic[T]):
 
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__getattribute__", (name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
 
     def __setattr__(self, name, value):
@@ -165,7 +173,7 @@ class AlienDataClayObject(DataClayObject, Generic[T]):
             logger.debug("remote set")
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__setattr__", (name, value), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
 
     def __delattr__(self, name: str):
@@ -182,7 +190,7 @@ class AlienDataClayObject(DataClayObject, Generic[T]):
             logger.debug("remote del")
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__delattr__", (name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
 
     def __getstate__(self):
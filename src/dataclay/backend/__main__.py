@@ -1,16 +1,23 @@
 """Entry point for standalone dataClay Backend server."""
 
-import asyncio
 import logging
+import sys
 
 from dataclay.backend import servicer
 from dataclay.config import BackendSettings, settings
+from dataclay.event_loop import run_event_loop
 
 logger = logging.getLogger(__name__)
 
 settings.backend = BackendSettings()
 logger.info("Backend settings: %s", settings.backend)
 
+if settings.backend.workers > 1:
+    # pylint: disable=import-outside-toplevel
+    from dataclay.backend.supervisor import Supervisor
+
+    sys.exit(Supervisor(settings.backend.workers).run())
+
 # Start tracing and metrics
 if settings.service_name is None:
     settings.service_name = "backend"
@@ -36,4 +43,4 @@ if settings.metrics:
         settings.metrics_exporter,
     )
 
-asyncio.run(servicer.serve())
+run_event_loop(servicer.serve())
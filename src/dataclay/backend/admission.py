@@ -0,0 +1,204 @@
+"""Admission control of the activemethod calls received by a backend.
+
+Calls are admitted when there are enough slots in the limits that apply to them: the backend
+threads (weighted by the ``max_threads`` execution constraint), the concurrent calls to the
+same method, and the memory budget (weighted by the ``max_memory`` execution constraint).
+Otherwise they wait in a bounded queue, ordered by priority class. When a queue is full, the
+call is rejected with :class:`~dataclay.exceptions.BackendOverloadedError`, which the caller
+retries.
+
+All the limits are disabled by default (see the admission control settings). Control-plane
+operations (e.g. ``FlushAll`` or ``GetClassInfo``) are never subject to admission control, so
+they are never queued behind data-plane calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Optional
+
+from dataclay.config import settings
+from dataclay.exceptions import BackendOverloadedError
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+#: Priority classes of the calls, from the execution constraint ``priority``
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: Any) -> Optional[int]:
+    """Parse a size in bytes, like 1073741824, "1GB" or "512 MiB"."""
+    if size is None or isinstance(size, (int, float)):
+        return None if size is None else int(size)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)i?B?\s*", str(size), re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Invalid size '{size}'")
+    return int(float(match[1]) * _SIZE_UNITS[match[2].upper()])
+
+
+class _DummyGauge:
+    def inc(self, amount=1):
+        """Dummy function"""
+        pass
+
+    def dec(self, amount=1):
+        """Dummy function"""
+        pass
+
+
+class _DummyCounter:
+    def inc(self):
+        """Dummy function"""
+        pass
+
+
+class AdmissionLimit:
+    """Weighted semaphore with a bounded, priority-ordered, queue of waiters.
+
+    Waiters are admitted in order (priority class, then arrival), so a heavy call at the
+    head of the queue is not starved by lighter ones.
+    """
+
+    def __init__(self, name: str, capacity: int, max_queued: int):
+        self.name = name
+        self.capacity = capacity
+        self.available = capacity
+        self.max_queued = max_queued
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def _weight(self, weight: int) -> int:
+        # A call heavier than the limit would never be admitted
+        return max(1, min(weight, self.capacity))
+
+    async def acquire(self, weight: int = 1, priority: int = PRIORITIES["normal"]) -> int:
+        """Wait until the weight is admitted, and return the acquired weight."""
+        weight = self._weight(weight)
+        if not self._waiters and self.available >= weight:
+            self.available -= weight
+            return weight
+
+        if len(self._waiters) >= self.max_queued:
+            raise BackendOverloadedError(f"{self.name} queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), weight, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before being cancelled
+                self.release(weight)
+            else:
+                self._waiters = [waiter for waiter in self._waiters if waiter[3] is not future]
+                heapq.heapify(self._waiters)
+                self._wake_up()
+            raise
+        return weight
+
+    def release(self, weight: int):
+        self.available += weight
+        self._wake_up()
+
+    def _wake_up(self):
+        while self._waiters:
+            _, _, weight, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.available < weight:
+                break
+            heapq.heappop(self._waiters)
+            self.available -= weight
+            future.set_result(None)
+
+
+class AdmissionController:
+    """Limits of the activemethod calls of a backend."""
+
+    def __init__(self):
+        self.threads = None
+        if settings.max_concurrent_calls is not None:
+            self.threads = AdmissionLimit(
+                "threads", settings.max_concurrent_calls, settings.max_queued_calls
+            )
+        self.memory = None
+        if settings.admission_memory_budget is not None:
+            self.memory = AdmissionLimit(
+                "memory", settings.admission_memory_budget, settings.max_queued_calls
+            )
+        self.methods: dict[str, AdmissionLimit] = {}
+
+        if settings.metrics:
+            # pylint: disable=import-outside-toplevel
+            from dataclay.utils import metrics
+
+            self.queued_calls = metrics.dataclay_admission_queued_calls
+            self.running_calls = metrics.dataclay_admission_running_calls
+            self.rejected_calls_total = metrics.dataclay_admission_rejected_calls_total
+        else:
+            self.queued_calls = _DummyGauge()
+            self.running_calls = _DummyGauge()
+            self.rejected_calls_total = _DummyCounter()
+
+    def _method_limit(self, method_key: str) -> Optional[AdmissionLimit]:
+        if method_key not in self.methods:
+            limit = settings.method_concurrency_limits.get(
+                method_key, settings.max_concurrent_calls_per_method
+            )
+            if limit is None:
+                return None
+            self.methods[method_key] = AdmissionLimit(method_key, limit, settings.max_queued_calls)
+        return self.methods[method_key]
+
+    @contextlib.asynccontextmanager
+    async def admit(
+        self, class_name: str, method_name: str, exec_constraints: dict[str, Any]
+    ) -> AsyncIterator[None]:
+        """Wait until the call is admitted, and keep its slots while the context is active.
+
+        Raises:
+            BackendOverloadedError: If the call must wait, but the queue is full.
+        """
+        priority = PRIORITIES.get(exec_constraints.get("priority"), PRIORITIES["normal"])
+        # Same order for all calls, to avoid deadlocks
+        limits = [
+            (self._method_limit(f"{class_name}.{method_name}"), 1),
+            (self.threads, exec_constraints.get("max_threads") or 1),
+        ]
+        if self.memory is not None:
+            limits.append((self.memory, parse_size(exec_constraints.get("max_memory")) or 1))
+
+        acquired: list[tuple[AdmissionLimit, int]] = []
+        self.queued_calls.inc()
+        try:
+            for limit, weight in limits:
+                if limit is not None:
+                    acquired.append((limit, await limit.acquire(weight, priority)))
+        except BaseException as e:
+            for limit, weight in reversed(acquired):
+                limit.release(weight)
+            if isinstance(e, BackendOverloadedError):
+                logger.warning("Rejecting call to '%s.%s': %s", class_name, method_name, e)
+                self.rejected_calls_total.inc()
+            raise
+        finally:
+            self.queued_calls.dec()
+
+        self.running_calls.inc()
+        try:
+            yield
+        finally:
+            self.running_calls.dec()
+            for limit, weight in reversed(acquired):
+                limit.release(weight)
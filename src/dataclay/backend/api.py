@@ -4,14 +4,15 @@ import asyncio
 import logging
 import pickle
 import time
-from collections.abc import Iterable
-from typing import TYPE_CHECKING, Any, Optional
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from threadpoolctl import threadpool_limits
 
 from dataclay import utils
+from dataclay.backend.admission import AdmissionController
 from dataclay.config import LEGACY_DEPS, set_runtime, settings
-from dataclay.event_loop import dc_to_thread_io
+from dataclay.event_loop import constraint_cpus, cpu_affinity_var, dc_to_thread_io
 from dataclay.exceptions import (
     DataClayException,
     DoesNotExistError,
@@ -21,18 +22,42 @@ from dataclay.exceptions import (
 from dataclay.lock_manager import lock_manager
 from ..metadata.kvdata import ObjectMetadata
 from dataclay.runtime import BackendRuntime
-from dataclay.utils.serialization import dcdumps, dcloads, recursive_dcloads
+from dataclay.utils.process_pool import call_in_process
+from dataclay.utils.rebalance import evacuate_replicas, execute_transfers, rebalance
+from dataclay.utils.serialization import (
+    dcdumps,
+    dcdumps_iter,
+    dcloads,
+    dcloads_iter,
+    recursive_dcloads,
+)
 from dataclay.utils.telemetry import trace
 from dataclay.event_loop import get_dc_event_loop
 
 if TYPE_CHECKING:
     from uuid import UUID
 
+    from dataclay.backend.client import BackendClient
     from dataclay.dataclay_object import DataClayObject
+    from dataclay.utils.rebalance import RebalancePlan
 
 tracer = trace.get_tracer(__name__)
 logger: logging.Logger = utils.LoggerEvent(logging.getLogger(__name__))
 
+#: Maximum passes moving the objects of a backend being drained
+DRAIN_PASSES = 5
+#: Maximum attempts moving objects to the backends that join, before giving up on them
+SCALE_OUT_ATTEMPTS = 3
+
+
+def _dumps_exception(e: Exception) -> bytes:
+    """Serialize an exception raised by an activemethod, to be raised by the client."""
+    try:
+        return pickle.dumps(e)
+    except TypeError:
+        # If the exception can't be serialized, do your best
+        return pickle.dumps(type(e)(str(e)))
+
 
 class BackendAPI:
     def __init__(self, name: str, port: int, backend_id: UUID, kv_host: str, kv_port: int):
@@ -45,7 +70,11 @@ class BackendAPI:
         self.backend_id = backend_id
         self.runtime = BackendRuntime(kv_host, kv_port, self.backend_id)
         set_runtime(self.runtime)
+        self.admission = AdmissionController()
 
+        # Backends that have joined, and the task moving objects to them
+        self.new_backend_ids: set[UUID] = set()
+        self.scale_out_task = None
 
     async def _is_ready(self, timeout, pause):
         ref = time.time()
@@ -72,9 +101,23 @@ class BackendAPI:
     # Object Methods
     async def register_objects(self, serialized_objects: Iterable[bytes], make_replica: bool):
         logger.debug("Receiving (%d) objects to register", len(serialized_objects))
-        for object_bytes in serialized_objects:
-            metadata_dict, dc_properties, getstate = await dcloads(object_bytes)
+        loaded_objects = [await dcloads(object_bytes) for object_bytes in serialized_objects]
+        await self._register_loaded_objects(loaded_objects, make_replica)
 
+    async def register_objects_stream(
+        self, serialized_objects: AsyncIterable[bytes], make_replica: bool
+    ):
+        """Same as register_objects, but each object is deserialized as soon as it is received.
+
+        The objects are registered when the whole stream has been received, so that their
+        ownership is not split between the backends if the stream fails.
+        """
+        logger.debug("Receiving stream of objects to register")
+        loaded_objects = [await dcloads(object_bytes) async for object_bytes in serialized_objects]
+        await self._register_loaded_objects(loaded_objects, make_replica)
+
+    async def _register_loaded_objects(self, loaded_objects: list[tuple], make_replica: bool):
+        for metadata_dict, dc_properties, getstate in loaded_objects:
             if LEGACY_DEPS:
                 dc_meta = ObjectMetadata.parse_obj(metadata_dict)
             else:
@@ -103,17 +146,20 @@ class BackendAPI:
 
                 if make_replica:
                     instance._dc_is_replica = True
-                    instance._dc_meta.replica_backend_ids.add(self.backend_id)
+                    await self.runtime.metadata_service.upsert_object_replicas(
+                        instance._dc_meta, add=self.backend_id
+                    )
 
                 else:
                     # If not make_replica then its a move
                     instance._dc_meta.master_backend_id = self.backend_id
-                    instance._dc_meta.replica_backend_ids.discard(self.backend_id)
                     # we can only move masters
                     # instance._dc_is_replica = False # already set by vars(instance).update(state)
+                    await self.runtime.metadata_service.upsert_object_replicas(
+                        instance._dc_meta, discard=self.backend_id
+                    )
 
-                # ¿Should be always updated here, or from the calling backend?
-                await self.runtime.metadata_service.upsert_object(instance._dc_meta)
+        self.runtime.data_manager.freeze_gc(len(loaded_objects))
 
     @tracer.start_as_current_span("make_persistent")
     async def make_persistent(self, serialized_objects: Iterable[bytes]):
@@ -126,7 +172,29 @@ class BackendAPI:
             proxy_object._dc_meta.master_backend_id = self.backend_id
 
         assert len(serialized_objects) == len(unserialized_objects)
+        await self._register_persistent_objects(unserialized_objects)
 
+    @tracer.start_as_current_span("make_persistent_stream")
+    async def make_persistent_stream(self, serialized_objects: AsyncIterable[bytes]):
+        """Same as make_persistent, but each object is deserialized as soon as it is received.
+
+        The objects are registered when the whole stream has been received, so that no object
+        is registered if the stream fails.
+        """
+        logger.debug("Receiving stream of objects to make persistent")
+        unserialized_objects: dict[UUID, DataClayObject] = {}
+        num_objects = 0
+        async for object_bytes in serialized_objects:
+            proxy_object = await recursive_dcloads(object_bytes, unserialized_objects)
+            proxy_object._dc_is_local = True
+            proxy_object._dc_is_loaded = True
+            proxy_object._dc_meta.master_backend_id = self.backend_id
+            num_objects += 1
+
+        assert num_objects == len(unserialized_objects)
+        await self._register_persistent_objects(unserialized_objects)
+
+    async def _register_persistent_objects(self, unserialized_objects: dict[UUID, DataClayObject]):
         for proxy_object in unserialized_objects.values():
             logger.debug(
                 "(%s) Registering %s",
@@ -138,6 +206,8 @@ class BackendAPI:
             await self.runtime.metadata_service.upsert_object(proxy_object._dc_meta)
             proxy_object._dc_is_registered = True
 
+        self.runtime.data_manager.freeze_gc(len(unserialized_objects))
+
     @tracer.start_as_current_span("call_active_method")
     async def call_active_method(
         self,
@@ -151,6 +221,64 @@ class BackendAPI:
 
         logger.debug("(%s) Receiving remote call to activemethod '%s'", object_id, method_name)
 
+        result, is_exception = await self._call_active_method(
+            object_id,
+            method_name,
+            lambda: asyncio.gather(dcloads(args), dcloads(kwargs)),
+            exec_constraints,
+        )
+
+        if is_exception:
+            return _dumps_exception(result), True
+
+        # Serialize the result if not None
+        if result is not None:
+            result = await dcdumps(result)
+
+        return result, False
+
+    @tracer.start_as_current_span("call_active_method_stream")
+    async def call_active_method_stream(
+        self,
+        object_id: UUID,
+        method_name: str,
+        serialized_arguments: AsyncIterable[bytes],
+        exec_constraints: dict[str, Any],
+    ) -> tuple[AsyncIterator[bytes], bool]:
+        """Same as call_active_method, but the arguments (args followed by kwargs) are
+        deserialized while they are received, and the result is returned in chunks while
+        it is being serialized.
+        """
+
+        logger.debug(
+            "(%s) Receiving remote streaming call to activemethod '%s'", object_id, method_name
+        )
+
+        result, is_exception = await self._call_active_method(
+            object_id,
+            method_name,
+            lambda: dcloads_iter(serialized_arguments, num_objects=2),
+            exec_constraints,
+        )
+
+        if is_exception:
+
+            async def exception_chunks():
+                yield _dumps_exception(result)
+
+            return exception_chunks(), True
+
+        return dcdumps_iter(result), False
+
+    async def _call_active_method(
+        self,
+        object_id: UUID,
+        method_name: str,
+        load_arguments: Callable[[], Awaitable[tuple[tuple, dict]]],
+        exec_constraints: dict[str, Any],
+    ) -> tuple[Any, bool]:
+        """Call the activemethod, returning its result (or the exception raised)."""
+
         instance = await self.runtime.get_object_by_id(object_id)
 
         # If the object isn't local (not owned by this backend), a custom exception is sent to the
@@ -168,16 +296,46 @@ class BackendAPI:
                 "(%s) Update backend to %s", object_id, instance._dc_meta.master_backend_id
             )
             return (
-                pickle.dumps(
-                    ObjectWithWrongBackendIdError(
-                        instance._dc_meta.master_backend_id, instance._dc_meta.replica_backend_ids
-                    )
+                ObjectWithWrongBackendIdError(
+                    instance._dc_meta.master_backend_id, instance._dc_meta.replica_backend_ids
                 ),
                 False,
             )
 
-        # Deserialize arguments
-        args, kwargs = await asyncio.gather(dcloads(args), dcloads(kwargs))
+        self.runtime.data_manager.record_access(object_id)
+
+        # Pin the executor threads used by the call to the requested CPUs (or NUMA node)
+        cpus = constraint_cpus(exec_constraints)
+        token = cpu_affinity_var.set(cpus)
+        try:
+            # Wait for the limits of concurrent calls (or fail fast if the backend is overloaded)
+            class_name = instance._dc_meta.class_name
+            async with self.admission.admit(class_name, method_name, exec_constraints):
+                if cpus is not None and not instance._dc_is_loaded:
+                    # Load the object in the requested CPUs, so its memory is allocated near them
+                    await self.runtime.data_manager.load_object(instance)
+
+                # Deserialize arguments
+                args, kwargs = await load_arguments()
+
+                result, is_exception = await self._execute_active_method(
+                    instance, method_name, args, kwargs, exec_constraints
+                )
+        finally:
+            cpu_affinity_var.reset(token)
+
+        await self.runtime.sync_replicas()
+        return result, is_exception
+
+    async def _execute_active_method(
+        self,
+        instance: DataClayObject,
+        method_name: str,
+        args: tuple,
+        kwargs: dict,
+        exec_constraints: dict[str, Any],
+    ) -> tuple[Any, bool]:
+        object_id = instance._dc_meta.id
 
         # Call activemethod in another thread
         logger.info("(%s) *** Starting activemethod '%s' in executor", object_id, method_name)
@@ -193,23 +351,22 @@ class BackendAPI:
                 if asyncio.iscoroutinefunction(func):
                     logger.debug("(%s) Awaiting activemethod coroutine", object_id)
                     result = await func(*args, **kwargs)
+                elif getattr(func, "_executor", "thread") == "process":
+                    logger.debug("(%s) Running activemethod in process pool", object_id)
+                    result, is_exception = await call_in_process(
+                        instance, method_name, args, kwargs
+                    )
+                    if is_exception:
+                        raise result
                 else:
                     logger.debug("(%s) Running activemethod in new thread", object_id)
                     result = await dc_to_thread_io(func, *args, **kwargs)
             except Exception as e:
-                # If an exception was raised, serialize it and return it to be raised by the client
+                # If an exception was raised, return it to be raised by the client
                 logger.info("(%s) *** Exception in activemethod '%s'", object_id, method_name)
-                try:
-                    return pickle.dumps(e), True
-                except TypeError:
-                    # If the exception can't be serialized, do your best
-                    return pickle.dumps(type(e)(str(e))), True
+                return e, True
         logger.info("(%s) *** Finished activemethod '%s' in executor", object_id, method_name)
 
-        # Serialize the result if not None
-        if result is not None:
-            result = await dcdumps(result)
-
         return result, False
 
     # Store Methods
@@ -270,6 +427,7 @@ class BackendAPI:
         try:
             object_attribute = await dcloads(serialized_attribute)
             await dc_to_thread_io(setattr, instance, attribute, object_attribute)
+            await self.runtime.sync_replicas()
             return None, False
         except Exception as e:
             return pickle.dumps(e), True
@@ -310,6 +468,7 @@ class BackendAPI:
             The pickled properties of the object.
         """
         instance = await self.runtime.get_object_by_id(object_id)
+        self.runtime.data_manager.record_access(object_id)
         object_properties = await self.runtime.get_object_properties(instance)
         return await dcdumps(object_properties)
 
@@ -320,6 +479,7 @@ class BackendAPI:
             self.runtime.get_object_by_id(object_id), dcloads(serialized_properties)
         )
         await self.runtime.update_object_properties(instance, object_properties)
+        await self.runtime.sync_replicas()
 
     async def new_object_version(self, object_id: UUID):
         """Creates a new version of the object with ID provided
@@ -373,6 +533,8 @@ class BackendAPI:
 
     @tracer.start_as_current_span("stop")
     async def stop(self):
+        if self.scale_out_task:
+            self.scale_out_task.cancel()
         await self.runtime.stop()
 
     @tracer.start_as_current_span("flush_all")
@@ -380,39 +542,172 @@ class BackendAPI:
         await self.runtime.data_manager.flush_all()
 
     @tracer.start_as_current_span("move_all_objects")
-    async def move_all_objects(self):
-        dc_objects = await self.runtime.metadata_service.get_all_objects()
-        await self.runtime.backend_clients.update()
-        backends = self.runtime.backend_clients
-
-        if len(backends) <= 1:
-            raise NoOtherBackendsAvailable()
+    async def move_all_objects(
+        self, parallel_transfers: Optional[int] = None, max_bandwidth: Optional[int] = None
+    ) -> RebalancePlan:
+        """Move all the objects of this backend to the other ones, balancing their load."""
+        backend_ids = await self._get_backend_ids()
+        plan = await rebalance(
+            self.runtime.metadata_service,
+            backend_ids,
+            self._get_backend_client,
+            evacuate={self.backend_id},
+            parallel_transfers=parallel_transfers,
+            max_bandwidth=max_bandwidth,
+        )
+        logger.info("Moved %d objects to other backends", plan.num_objects)
+        return plan
 
-        num_objects = len(dc_objects)
-        mean = -(num_objects // -(len(backends) - 1))
+    @tracer.start_as_current_span("drain")
+    async def drain(self):
+        """Evacuate this backend to the other ones, and then deregister it.
 
-        backends_objects = {backend_id: [] for backend_id in backends.keys()}
-        for object_md in dc_objects.values():
-            backends_objects[object_md.master_backend_id].append(object_md.id)
+        The master objects are moved, and the replicas recreated by their masters, with parallel
+        transfers. Calls are served meanwhile: the ones to objects that have already left are
+        redirected with ObjectWithWrongBackendIdError. Objects made persistent in this backend
+        during the evacuation are moved in further passes.
+        """
+        start_time = time.perf_counter()
+        parallel_transfers = settings.drain_parallel_transfers
+        max_bandwidth = settings.drain_max_bandwidth
+
+        # Pending updates are only sent while this backend is the master
+        await self.runtime.flush_replica_updates()
+
+        num_objects = num_bytes = 0
+        for _ in range(DRAIN_PASSES):
+            plan = await self.move_all_objects(parallel_transfers, max_bandwidth)
+            if not plan.num_objects:
+                break
+            num_objects += plan.num_objects
+            num_bytes += plan.num_bytes
+        else:
+            logger.warning("Objects still being made persistent after %d passes", DRAIN_PASSES)
+
+        backend_ids = await self._get_backend_ids()
+        replica_ids = await evacuate_replicas(
+            self.runtime.metadata_service,
+            backend_ids,
+            self._get_backend_client,
+            evacuate={self.backend_id},
+            parallel_transfers=parallel_transfers,
+            max_bandwidth=max_bandwidth,
+        )
+        await asyncio.gather(*[self._drop_replica(object_id) for object_id in replica_ids])
+
+        await self.runtime.metadata_service.delete_backend(self.backend_id)
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            "Drained %d objects (%d bytes) and %d replicas in %.2fs (%.0f bytes/s)",
+            num_objects,
+            num_bytes,
+            len(replica_ids),
+            elapsed,
+            num_bytes / elapsed if elapsed else 0,
+        )
 
-        backends_diff = {}
-        for backend_id, objects in backends_objects.items():
-            diff = len(objects) - mean
-            backends_diff[backend_id] = diff
+    async def _drop_replica(self, object_id: UUID):
+        """Stop being a replica of an object. Calls to it are redirected to the master."""
+        instance = self.runtime.inmemory_objects.get(object_id)
+        if instance is not None and instance._dc_is_local:
+            async with lock_manager.get_lock(object_id).writer_lock:
+                self.runtime.data_manager.remove_hard_reference(instance)
+                self.runtime.data_manager.forget_object(object_id)
+                instance._clean_dc_properties()
+                instance._dc_is_local = False
+                instance._dc_is_loaded = False
+                instance._dc_is_replica = False
+                instance._dc_meta.replica_backend_ids.discard(self.backend_id)
+
+        # Under the lock of the metadata, since the master may be registering other replicas
+        object_md = await self.runtime.metadata_service.get_object_md_by_id(object_id)
+        await self.runtime.metadata_service.upsert_object_replicas(
+            object_md, discard=self.backend_id
+        )
 
-        # for backend_id, object_ids in backends_objects.items():
-        #     if backends_diff[backend_id] <= 0:
-        #         continue
+    async def _get_backend_ids(self) -> set[UUID]:
+        """IDs of all the backends, including this one.
 
-        object_ids = backends_objects[self.backend_id]
+        Raises:
+            NoOtherBackendsAvailable: If this is the only backend.
+        """
+        await self.runtime.backend_clients.update()
+        backend_ids = set(self.runtime.backend_clients) | {self.backend_id}
+        if len(backend_ids) <= 1:
+            raise NoOtherBackendsAvailable()
+        return backend_ids
+
+    def start_scale_out_rebalance(self):
+        """Move objects to the backends that join from now on, in the background."""
+        self.runtime.backend_clients.new_backend_callbacks.append(self._on_new_backend)
+
+    def _on_new_backend(self, backend_id: UUID):
+        if backend_id == self.backend_id:
+            return
+        logger.info("Backend %s joined. Moving objects to it in the background", backend_id)
+        self.new_backend_ids.add(backend_id)
+        # Backends that join while objects are being moved are handled afterwards
+        if self.scale_out_task is None or self.scale_out_task.done():
+            self.scale_out_task = get_dc_event_loop().create_task(self.scale_out_rebalance())
+
+    async def scale_out_rebalance(self):
+        """Gradually move objects of this backend to the new ones, to balance the load.
+
+        Each backend plans the rebalance on its own from the current stats, and executes only
+        its transfers to the new backends: one at a time, in small batches and under a
+        bandwidth limit, so that the calls being served are barely affected. The plans of the
+        backends may differ slightly, so the resulting balance is approximate. Failed attempts
+        are retried, up to :data:`SCALE_OUT_ATTEMPTS` times.
+        """
+        attempts = 0
+        try:
+            while self.new_backend_ids:
+                # Let other backends join
+                await asyncio.sleep(settings.scale_out_delay)
 
-        for new_backend_id in backends_objects.keys():
-            if new_backend_id == self.backend_id or backends_diff[new_backend_id] >= 0:
-                continue
-            while backends_diff[new_backend_id] < 0:
-                object_id = object_ids.pop()
-                self.move_object(object_id, new_backend_id, None)
-                backends_diff[new_backend_id] += 1
+                new_backend_ids = set(self.new_backend_ids)
+                try:
+                    backend_ids = await self._get_backend_ids()
+                    plan = await rebalance(
+                        self.runtime.metadata_service,
+                        backend_ids,
+                        self._get_backend_client,
+                        dry_run=True,
+                    )
+                    transfers = [
+                        transfer
+                        for transfer in plan.transfers
+                        if transfer.source == self.backend_id
+                        and transfer.destination in new_backend_ids
+                    ]
+                    await execute_transfers(
+                        transfers,
+                        self._get_backend_client,
+                        batch_bytes=settings.scale_out_batch_bytes,
+                        parallel_transfers=1,
+                        max_bandwidth=settings.scale_out_max_bandwidth,
+                    )
+                except Exception as e:
+                    attempts += 1
+                    if attempts < SCALE_OUT_ATTEMPTS:
+                        logger.warning("Error moving objects to new backends (retrying): %s", e)
+                        continue
+                    logger.warning("Error moving objects to new backends (giving up): %s", e)
+                else:
+                    logger.info(
+                        "Moved %d objects to new backends",
+                        sum(len(transfer.objects) for transfer in transfers),
+                    )
+                attempts = 0
+                self.new_backend_ids -= new_backend_ids
+        except asyncio.CancelledError:
+            logger.debug("Scale-out rebalance has been cancelled.")
+
+    async def _get_backend_client(self, backend_id: UUID) -> Union[BackendAPI, BackendClient]:
+        """Client of a backend, or this backend itself (which has the same ``send_objects``)."""
+        if backend_id == self.backend_id:
+            return self
+        return await self.runtime.backend_clients.get(backend_id)
 
     # Replicas
 
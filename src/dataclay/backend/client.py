@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Iterable, Optional
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Optional
 from uuid import UUID
 
 import asyncio
@@ -9,14 +9,36 @@ from google.protobuf.wrappers_pb2 import BoolValue, FloatValue, Int32Value, Stri
 from grpc._cython.cygrpc import ChannelArgKey
 
 import dataclay
+from dataclay.backend.streaming import BackendStreamStub
 from dataclay.config import session_var, settings
 from dataclay.proto.backend import backend_pb2, backend_pb2_grpc
-from dataclay.utils.decorators import grpc_aio_error_handler
+from dataclay.utils.decorators import grpc_aio_error_handler, grpc_aio_iter_error_handler
 from dataclay.event_loop import get_dc_event_loop
 
 logger = logging.getLogger(__name__)
 
 
+def _pack_exec_constraints(exec_constraints: dict[str, Any]) -> dict[str, any_pb2.Any]:
+    converted_exec_constraints = {}
+    for key, value in exec_constraints.items():
+        any_value = any_pb2.Any()
+
+        if isinstance(value, int) or value is None:
+            wrapped_value = Int32Value(value=value)
+        elif isinstance(value, float):
+            wrapped_value = FloatValue(value=value)
+        elif isinstance(value, str):
+            wrapped_value = StringValue(value=value)
+        elif isinstance(value, bool):
+            wrapped_value = BoolValue(value=value)
+        else:
+            raise TypeError(f"Unsupported type {type(value)} for exec_constraints key '{key}'")
+
+        any_value.Pack(wrapped_value)
+        converted_exec_constraints[key] = any_value
+    return converted_exec_constraints
+
+
 class BackendClient:
     def __init__(self, host: str, port: int, backend_id: Optional[UUID] = None):
         """Create the stub and the channel at the address passed by the server.
@@ -51,6 +73,7 @@ class BackendClient:
         # Commented beause seems to fail with async
         # grpc.channel_ready_future(self.channel).result(timeout=settings.grpc_check_alive_timeout)
         self.stub = backend_pb2_grpc.BackendServiceStub(self.channel)
+        self.stream_stub = BackendStreamStub(self.channel)
 
     def _configure_ssl(self, options):
         # read in certificates
@@ -126,8 +149,10 @@ class BackendClient:
         """Closing channel by deleting channel and stub"""
         del self.channel
         del self.stub
+        del self.stream_stub
         self.channel = None
         self.stub = None
+        self.stream_stub = None
 
     @grpc_aio_error_handler
     async def register_objects(self, dict_bytes: Iterable[bytes], make_replica: bool):
@@ -136,11 +161,31 @@ class BackendClient:
         )
         await self.stub.RegisterObjects(request, metadata=self.metadata_call)
 
+    @grpc_aio_error_handler
+    async def register_objects_stream(self, dict_bytes: AsyncIterable[bytes], make_replica: bool):
+        async def request_iterator():
+            async for object_bytes in dict_bytes:
+                yield backend_pb2.RegisterObjectsRequest(
+                    dict_bytes=[object_bytes], make_replica=make_replica
+                )
+
+        await self.stream_stub.RegisterObjectsStream(
+            request_iterator(), metadata=self.metadata_call
+        )
+
     @grpc_aio_error_handler
     async def make_persistent(self, pickled_obj: Iterable[bytes]):
         request = backend_pb2.MakePersistentRequest(pickled_obj=pickled_obj)
         await self.stub.MakePersistent(request, metadata=self.metadata_call)
 
+    @grpc_aio_error_handler
+    async def make_persistent_stream(self, pickled_objs: AsyncIterable[bytes]):
+        async def request_iterator():
+            async for pickled_obj in pickled_objs:
+                yield backend_pb2.MakePersistentRequest(pickled_obj=[pickled_obj])
+
+        await self.stream_stub.MakePersistentStream(request_iterator(), metadata=self.metadata_call)
+
     @grpc_aio_error_handler
     async def call_active_method(
         self,
@@ -151,30 +196,12 @@ class BackendClient:
         exec_constraints: dict[str, Any],
     ) -> tuple[bytes, bool]:
 
-        converted_exec_constraints = {}
-        for key, value in exec_constraints.items():
-            any_value = any_pb2.Any()
-
-            if isinstance(value, int) or value is None:
-                wrapped_value = Int32Value(value=value)
-            elif isinstance(value, float):
-                wrapped_value = FloatValue(value=value)
-            elif isinstance(value, str):
-                wrapped_value = StringValue(value=value)
-            elif isinstance(value, bool):
-                wrapped_value = BoolValue(value=value)
-            else:
-                raise TypeError(f"Unsupported type {type(value)} for exec_constraints key '{key}'")
-
-            any_value.Pack(wrapped_value)
-            converted_exec_constraints[key] = any_value
-
         request = backend_pb2.CallActiveMethodRequest(
             object_id=str(object_id),
             method_name=method_name,
             args=args,
             kwargs=kwargs,
-            exec_constraints=converted_exec_constraints,
+            exec_constraints=_pack_exec_constraints(exec_constraints),
         )
 
         current_context = session_var.get()
@@ -188,6 +215,60 @@ class BackendClient:
         response = await self.stub.CallActiveMethod(request, metadata=metadata)
         return response.value, response.is_exception
 
+    @grpc_aio_error_handler
+    async def call_active_method_stream(
+        self,
+        object_id: UUID,
+        method_name: str,
+        serialized_arguments: Iterable[bytes],
+        exec_constraints: dict[str, Any],
+    ) -> tuple[AsyncIterator[bytes], bool]:
+        """Call an activemethod sending the arguments, and receiving the result, in chunks.
+
+        Args:
+            serialized_arguments: The serialized args followed by the serialized kwargs.
+
+        Returns:
+            The chunks of the serialized result (as they are received), and if it is an exception.
+        """
+        call = backend_pb2.CallActiveMethodRequest(
+            object_id=str(object_id),
+            method_name=method_name,
+            exec_constraints=_pack_exec_constraints(exec_constraints),
+        )
+
+        async def request_iterator():
+            yield call
+            for data in serialized_arguments:
+                data = memoryview(data)
+                for i in range(0, len(data), settings.stream_chunk_size):
+                    yield backend_pb2.CallActiveMethodRequest(
+                        args=bytes(data[i : i + settings.stream_chunk_size])
+                    )
+
+        current_context = session_var.get()
+
+        metadata = self.metadata_call + [
+            ("dataset-name", current_context["dataset_name"]),
+            ("username", current_context["username"]),
+            ("authorization", current_context["token"]),
+        ]
+
+        stream = self.stream_stub.CallActiveMethodStream(request_iterator(), metadata=metadata)
+        response = await stream.read()
+        if response == grpc.aio.EOF:
+            raise RuntimeError(f"({object_id}) No response from activemethod '{method_name}'")
+
+        # The next chunks are read after returning, so their errors are mapped here
+        @grpc_aio_iter_error_handler
+        async def chunks():
+            nonlocal response
+            while response != grpc.aio.EOF:
+                yield response.value
+                response = await stream.read()
+
+        return chunks(), response.is_exception
+
     #################
     # Store Methods #
     #################
@@ -20,8 +20,10 @@ from grpc_health.v1 import health, health_pb2, health_pb2_grpc
 
 from dataclay import utils
 from dataclay.backend.api import BackendAPI
+from dataclay.backend.streaming import add_stream_methods_to_server
 from dataclay.config import session_var, settings
 from dataclay.event_loop import get_dc_event_loop, set_dc_event_loop
+from dataclay.exceptions import BackendOverloadedError
 from dataclay.proto.backend import backend_pb2, backend_pb2_grpc
 
 logger = logging.getLogger(__name__)
@@ -39,6 +41,9 @@ def _get_or_generate_backend_id() -> UUID:
     store it.
     """
     backend_id_file = os.path.join(settings.storage_path, "BACKEND_ID")
+    if settings.backend.worker_index is not None:
+        # Workers of a supervised backend share the storage path
+        backend_id_file += f".{settings.backend.worker_index}"
 
     if settings.backend.id is None and os.path.exists(backend_id_file):
         # Seems like we will be using a preexisting UUID
@@ -97,6 +102,7 @@ async def serve():
     )
     backend_servicer = BackendServicer(backend, server)
     backend_pb2_grpc.add_BackendServiceServicer_to_server(backend_servicer, server)
+    add_stream_methods_to_server(backend_servicer, server)
 
     # Enable healthcheck for the server
     if settings.backend.enable_healthcheck:
@@ -126,6 +132,14 @@ async def serve():
         settings.dataclay_id,
     )
 
+    # Preload the objects that were loaded before the last restart
+    if settings.preload_hot_set and not settings.ephemeral:
+        backend.runtime.start_preload()
+
+    # Move objects to the backends that join
+    if settings.scale_out_rebalance:
+        backend.start_scale_out_rebalance()
+
     # Register signal handlers for graceful termination
     loop = get_dc_event_loop()
     for sig in [signal.SIGINT, signal.SIGTERM]:
@@ -140,6 +154,30 @@ async def serve():
     await backend.stop()
 
 
+def _unpack_exec_constraints(packed_exec_constraints) -> dict:
+    exec_constraints = {}
+    for key, any_value in packed_exec_constraints.items():
+        if any_value.Is(Int32Value.DESCRIPTOR):
+            value = Int32Value()
+            any_value.Unpack(value)
+            exec_constraints[key] = value.value
+        elif any_value.Is(FloatValue.DESCRIPTOR):
+            value = FloatValue()
+            any_value.Unpack(value)
+            exec_constraints[key] = value.value
+        elif any_value.Is(StringValue.DESCRIPTOR):
+            value = StringValue()
+            any_value.Unpack(value)
+            exec_constraints[key] = value.value
+        elif any_value.Is(BoolValue.DESCRIPTOR):
+            value = BoolValue()
+            any_value.Unpack(value)
+            exec_constraints[key] = value.value
+        else:
+            raise ValueError(f"Unknown type for {key}: {any_value}")
+    return exec_constraints
+
+
 class ServicerMethod:
     def __init__(self, ret_factory):
         self.ret_factory = ret_factory
@@ -183,6 +221,12 @@ class ServicerMethod:
                 return self.ret_factory()
             try:
                 return await func(servicer, request, context)
+            except BackendOverloadedError as e:
+                # Retryable by the client, possibly in another backend
+                context.set_details(e.details)
+                context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+                context.set_trailing_metadata((BackendOverloadedError.grpc_metadata,))
+                return self.ret_factory()
             except Exception as e:
                 context.set_details(str(e))
                 context.set_code(grpc.StatusCode.INTERNAL)
@@ -203,43 +247,72 @@ class BackendServicer(backend_pb2_grpc.BackendServiceServicer):
         await self.backend.register_objects(request.dict_bytes, request.make_replica)
         return Empty()
 
+    @ServicerMethod(Empty)
+    async def RegisterObjectsStream(self, request_iterator, context):
+        # All the requests have the same make_replica
+        request = await context.read()
+        if request == grpc.aio.EOF:
+            return Empty()
+        make_replica = request.make_replica
+
+        async def dict_bytes():
+            nonlocal request
+            while request != grpc.aio.EOF:
+                for object_bytes in request.dict_bytes:
+                    yield object_bytes
+                request = await context.read()
+
+        await self.backend.register_objects_stream(dict_bytes(), make_replica)
+        return Empty()
+
     @ServicerMethod(Empty)
     async def MakePersistent(self, request, context):
         await self.backend.make_persistent(request.pickled_obj)
         return Empty()
 
+    @ServicerMethod(Empty)
+    async def MakePersistentStream(self, request_iterator, context):
+        await self.backend.make_persistent_stream(
+            pickled_obj async for request in request_iterator for pickled_obj in request.pickled_obj
+        )
+        return Empty()
+
     @ServicerMethod(backend_pb2.CallActiveMethodResponse)
     async def CallActiveMethod(self, request, context):
-        exec_constraints = {}
-        for key, any_value in request.exec_constraints.items():
-            if any_value.Is(Int32Value.DESCRIPTOR):
-                value = Int32Value()
-                any_value.Unpack(value)
-                exec_constraints[key] = value.value
-            elif any_value.Is(FloatValue.DESCRIPTOR):
-                value = FloatValue()
-                any_value.Unpack(value)
-                exec_constraints[key] = value.value
-            elif any_value.Is(StringValue.DESCRIPTOR):
-                value = StringValue()
-                any_value.Unpack(value)
-                exec_constraints[key] = value.value
-            elif any_value.Is(BoolValue.DESCRIPTOR):
-                value = BoolValue()
-                any_value.Unpack(value)
-                exec_constraints[key] = value.value
-            else:
-                raise ValueError(f"Unknown type for {key}: {any_value}")
-
         value, is_exception = await self.backend.call_active_method(
             UUID(request.object_id),
             request.method_name,
             request.args,
             request.kwargs,
-            exec_constraints,
+            _unpack_exec_constraints(request.exec_constraints),
         )
         return backend_pb2.CallActiveMethodResponse(value=value, is_exception=is_exception)
 
+    # Responses are written to the stream
+    @ServicerMethod(lambda: None)
+    async def CallActiveMethodStream(self, request_iterator, context):
+        # The first request has the call, and the next ones a chunk of the arguments
+        call = await context.read()
+
+        async def chunks():
+            while True:
+                request = await context.read()
+                if request == grpc.aio.EOF:
+                    break
+                if request.args:
+                    yield request.args
+
+        value_chunks, is_exception = await self.backend.call_active_method_stream(
+            UUID(call.object_id),
+            call.method_name,
+            chunks(),
+            _unpack_exec_constraints(call.exec_constraints),
+        )
+        async for chunk in value_chunks:
+            await context.write(
+                backend_pb2.CallActiveMethodResponse(value=chunk, is_exception=is_exception)
+            )
+
     #################
     # Store Methods #
     #################
@@ -327,7 +400,7 @@ class BackendServicer(backend_pb2_grpc.BackendServiceServicer):
     @ServicerMethod(Empty)
     async def Drain(self, request, context):
         logger.info("Draining backend. Grace period: %ss", settings.shutdown_grace_period)
-        await self.backend.move_all_objects()
+        await self.backend.drain()
         get_dc_event_loop().create_task(self.server.stop(settings.shutdown_grace_period))
         return Empty()
 
@@ -0,0 +1,64 @@
+"""Streaming RPCs of the backend service.
+
+The protos of dataclay-common do not define these RPCs, and the stubs compiled from them are
+regenerated by the build, so the RPCs are registered here by hand, under the same service and
+with its existing messages:
+
+- ``MakePersistentStream`` and ``RegisterObjectsStream`` (client streaming) receive one
+  ``MakePersistentRequest`` or ``RegisterObjectsRequest`` per serialized object.
+- ``CallActiveMethodStream`` (bidirectional streaming) receives a ``CallActiveMethodRequest``
+  with the call, followed by ``CallActiveMethodRequest`` messages with a chunk of the
+  serialized arguments in ``args``. It responds with ``CallActiveMethodResponse`` messages
+  with a chunk of the serialized result in ``value``.
+"""
+
+import grpc
+from google.protobuf.empty_pb2 import Empty
+
+from dataclay.proto.backend import backend_pb2
+
+SERVICE_NAME = "dataclay.proto.backend.BackendService"
+
+
+class BackendStreamStub:
+    """Client side of the streaming RPCs, to use along with the ``BackendServiceStub``."""
+
+    def __init__(self, channel: grpc.aio.Channel):
+        self.MakePersistentStream = channel.stream_unary(
+            f"/{SERVICE_NAME}/MakePersistentStream",
+            request_serializer=backend_pb2.MakePersistentRequest.SerializeToString,
+            response_deserializer=Empty.FromString,
+        )
+        self.RegisterObjectsStream = channel.stream_unary(
+            f"/{SERVICE_NAME}/RegisterObjectsStream",
+            request_serializer=backend_pb2.RegisterObjectsRequest.SerializeToString,
+            response_deserializer=Empty.FromString,
+        )
+        self.CallActiveMethodStream = channel.stream_stream(
+            f"/{SERVICE_NAME}/CallActiveMethodStream",
+            request_serializer=backend_pb2.CallActiveMethodRequest.SerializeToString,
+            response_deserializer=backend_pb2.CallActiveMethodResponse.FromString,
+        )
+
+
+def add_stream_methods_to_server(servicer, server: grpc.aio.Server):
+    """Register the streaming RPCs implemented by the servicer in the server."""
+    rpc_method_handlers = {
+        "MakePersistentStream": grpc.stream_unary_rpc_method_handler(
+            servicer.MakePersistentStream,
+            request_deserializer=backend_pb2.MakePersistentRequest.FromString,
+            response_serializer=Empty.SerializeToString,
+        ),
+        "RegisterObjectsStream": grpc.stream_unary_rpc_method_handler(
+            servicer.RegisterObjectsStream,
+            request_deserializer=backend_pb2.RegisterObjectsRequest.FromString,
+            response_serializer=Empty.SerializeToString,
+        ),
+        "CallActiveMethodStream": grpc.stream_stream_rpc_method_handler(
+            servicer.CallActiveMethodStream,
+            request_deserializer=backend_pb2.CallActiveMethodRequest.FromString,
+            response_serializer=backend_pb2.CallActiveMethodResponse.SerializeToString,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(SERVICE_NAME, rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
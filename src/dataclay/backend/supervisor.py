@@ -0,0 +1,133 @@
+"""Supervisor of the worker processes of a backend.
+
+A backend process is limited by its single event loop and the GIL. When
+``DATACLAY_BACKEND_WORKERS`` is greater than one, ``python -m dataclay.backend`` starts that many
+worker processes instead. Each worker is a backend of its own (with its own ID, registered in
+the metadata service) listening on consecutive ports, and all of them share the storage path,
+where objects are stored by ID. The available CPUs are split among the workers, and workers that
+exit unexpectedly are restarted.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Optional
+
+from dataclay.config import settings
+
+logger = logging.getLogger(__name__)
+
+#: Seconds to wait before restarting a worker that has exited unexpectedly
+RESTART_DELAY = 1.0
+#: Seconds between checks of the workers
+POLL_INTERVAL = 0.5
+
+
+def split_cpus(num_workers: int) -> list[Optional[frozenset[int]]]:
+    """Split the available CPUs in contiguous sets, one for each worker.
+
+    CPUs are not split if the executor CPUs are configured, or if there are fewer CPUs than workers.
+    """
+    if (
+        settings.executor_cpus is not None
+        or settings.executor_numa_nodes is not None
+        or not hasattr(os, "sched_getaffinity")
+    ):
+        return [None] * num_workers
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < num_workers:
+        return [None] * num_workers
+
+    cpu_sets = []
+    size, remainder = divmod(len(cpus), num_workers)
+    start = 0
+    for index in range(num_workers):
+        end = start + size + (1 if index < remainder else 0)
+        cpu_sets.append(frozenset(cpus[start:end]))
+        start = end
+    return cpu_sets
+
+
+class Supervisor:
+    """Starts the backend workers, restarts them if they fail, and forwards them the signals."""
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self.cpu_sets = split_cpus(num_workers)
+        self.processes: list[Optional[subprocess.Popen]] = [None] * num_workers
+        self.stopping = False
+
+    def worker_env(self, index: int) -> dict[str, str]:
+        """Environment of a worker, with the settings that must differ between workers."""
+        env = dict(os.environ)
+        env["DATACLAY_BACKEND_WORKERS"] = "1"
+        env["DATACLAY_BACKEND_WORKER_INDEX"] = str(index)
+        env["DATACLAY_BACKEND_PORT"] = str(settings.backend.port + index)
+        if settings.backend.name is not None:
+            env["DATACLAY_BACKEND_NAME"] = f"{settings.backend.name}-{index}"
+        if settings.backend.id is not None:
+            # Derived from the configured ID, so it is the same after a restart
+            env["DATACLAY_BACKEND_ID"] = str(uuid.uuid5(settings.backend.id, str(index)))
+        if settings.metrics and settings.metrics_exporter == "http":
+            env["DATACLAY_METRICS_PORT"] = str(settings.metrics_port + index)
+        return env
+
+    def start_worker(self, index: int):
+        process = subprocess.Popen(
+            [sys.executable, "-m", "dataclay.backend"], env=self.worker_env(index)
+        )
+        cpus = self.cpu_sets[index]
+        if cpus is not None:
+            try:
+                os.sched_setaffinity(process.pid, cpus)
+            except OSError as e:
+                logger.warning("Could not pin backend worker %d: %s", index, e)
+        self.processes[index] = process
+        logger.info(
+            "Started backend worker %d (pid %d) on port %d",
+            index,
+            process.pid,
+            settings.backend.port + index,
+        )
+
+    def stop(self, signum, frame):
+        """Signal handler, forwarding the signal to the workers."""
+        logger.info("Stopping backend workers")
+        self.stopping = True
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.send_signal(signum)
+
+    def run(self) -> int:
+        """Run the workers until they are stopped, and return the highest exit code."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for index in range(self.num_workers):
+            self.start_worker(index)
+
+        while True:
+            time.sleep(POLL_INTERVAL)
+            returncodes = [process.poll() for process in self.processes]
+            if self.stopping:
+                if all(returncode is not None for returncode in returncodes):
+                    break
+                continue
+
+            for index, returncode in enumerate(returncodes):
+                if returncode is not None:
+                    logger.warning(
+                        "Backend worker %d exited with code %d. Restarting...", index, returncode
+                    )
+                    time.sleep(RESTART_DELAY)
+                    if not self.stopping:
+                        self.start_worker(index)
+
+        logger.info("Backend workers stopped")
+        return max(abs(returncode) for returncode in returncodes)
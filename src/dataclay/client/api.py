@@ -24,7 +24,15 @@ from dataclay.config import (
     set_runtime,
     settings,
 )
-from dataclay.event_loop import EventLoopThread, get_dc_event_loop, set_dc_event_loop
+from dataclay.event_loop import (
+    EventLoopThread,
+    dc_call_loops,
+    get_dc_event_loop,
+    new_event_loop,
+    set_dc_event_loop,
+    start_dc_call_loops,
+    stop_dc_call_loops,
+)
 from dataclay.proxy import generate_jwt
 from dataclay.runtime import ClientRuntime
 from dataclay.utils.telemetry import trace
@@ -104,7 +112,10 @@ class Client:
     :param username: Username. Authentication and authorization happens only at the Proxy.
     :param password: `DEPRECATED`
     :param dataset: Dataset name. All objects created by this client will be associated with this dataset.
-    :param local_backend: Name of the local backend. If set, the client will use this backend for all operations.
+    :param local_backend: ID of the local backend, used by the ``local`` placement policy. By default,
+        the backends in the same host are detected.
+    :param placement: Placement policy of the new persistent objects (``random``, ``local``,
+        ``round-robin`` or ``hash``). It can be overridden in each ``make_persistent``.
     :param proxy_host: Proxy host. It is mutually exclusive with `host`. If this is set, this client will
         connect to the proxy instead for communicating with the metadata service or any backend.
     :param proxy_port: Proxy port. Optional. Use if you want to override the default port.
@@ -128,6 +139,7 @@ class Client:
         password: Optional[str] = None,
         dataset: Optional[str] = None,
         local_backend: Optional[str] = None,
+        placement: Optional[str] = None,
         proxy_host: Optional[str] = None,
         proxy_port: Optional[int] = None,
     ):
@@ -145,6 +157,8 @@ class Client:
             settings_kwargs["dataset"] = dataset
         if local_backend:
             settings_kwargs["local_backend"] = local_backend
+        if placement:
+            settings_kwargs["placement"] = placement
         if proxy_host:
             settings_kwargs["proxy_host"] = proxy_host
             settings_kwargs["proxy_enabled"] = True
@@ -184,7 +198,7 @@ class Client:
         loop = get_dc_event_loop()
         if loop is None:
             logger.info("Creating event loop in new thread")
-            loop = asyncio.new_event_loop()
+            loop = new_event_loop()
             set_dc_event_loop(loop)
             event_loop_thread = EventLoopThread(loop)
             event_loop_thread.start()
@@ -192,6 +206,10 @@ class Client:
         else:
             logger.info("Using existing event loop")
 
+        if settings.client_call_loops and not dc_call_loops:
+            logger.info("Creating %d event loops for remote calls", settings.client_call_loops)
+            start_dc_call_loops(settings.client_call_loops)
+
         # Replace settings
         self.previous_settings = settings.client
         settings.client = self.settings
@@ -245,6 +263,7 @@ class Client:
 
         logger.info("Stopping client runtime")
         asyncio.run_coroutine_threadsafe(self.runtime.stop(), get_dc_event_loop()).result()
+        stop_dc_call_loops()
         settings.client = self.previous_settings
         set_runtime(self.previous_runtime)
         self.is_active = False
@@ -67,6 +67,12 @@ class BackendSettings(BaseSettings):
     listen_address: str = "0.0.0.0"
     #: Enable healthcheck endpoint. Defaults to True.
     enable_healthcheck: bool = True
+    #: Number of backend worker processes. With more than one, this process supervises them:
+    #: each worker is a backend of its own, listening on consecutive ports starting at
+    #: :attr:`port`, and all of them share the storage path.
+    workers: int = 1
+    #: Index of this worker, set by the supervisor. Not to be set manually.
+    worker_index: Optional[int] = None
 
 
 class MetadataSettings(BaseSettings):
@@ -159,9 +165,13 @@ class ClientSettings(BaseSettings):
     username: str = "admin"
     #: Dataset to use for the client. Defaults to "admin".
     dataset: str = "admin"
-    #: Specifying this option will result in most client operations to be performed against this
-    #: _local_ backend instead of being performed to a random backend.
+    #: ID of the backend used by the ``local`` placement policy. By default, the backends in the
+    #: same host as the client are detected from their registered host.
     local_backend: Optional[str] = None
+    #: Placement policy of the new persistent objects: ``random``, ``local`` (a backend in the
+    #: same host), ``round-robin`` (in turns, among the objects placed by this client) or
+    #: ``hash`` (consistent hashing of the object ID).
+    placement: Literal["random", "local", "round-robin", "hash"] = "random"
     #: Hostname or IP address for the metadata service. This should be reachable by other dataClay services.
     #: Aliases: ``dc_host``, ``dataclay_metadata_host``, ``dataclay_host``.
     if LEGACY_DEPS:
@@ -217,12 +227,27 @@ class Settings(BaseSettings):
 
     ephemeral: bool = False
 
+    # Event loop
+    #: Use uvloop (``pip install dataclay[uvloop]``) instead of the default asyncio event loop.
+    uvloop: bool = False
+    #: Number of additional event loop threads of clients, for the calls to remote objects.
+    #: Calls are distributed among them by backend. If 0, all calls use the main event loop.
+    client_call_loops: int = 0
+
     # Threads
     #: Multiplier for I/O-bound tasks
     io_bound_multiplier: int = 2
     # TODO: Rename it with proxy...
     thread_pool_max_workers: Optional[int] = None
     healthcheck_max_workers: Optional[int] = None
+    #: Pin the executor threads to these CPUs (e.g. "0-23,48-71").
+    executor_cpus: Optional[str] = None
+    #: Pin each executor thread to one of these NUMA nodes (e.g. "0,1"), assigned in turns.
+    #: Takes precedence over :attr:`executor_cpus`.
+    executor_numa_nodes: Optional[str] = None
+    #: Number of worker processes for activemethods with ``executor="process"``.
+    #: Defaults to the number of available CPUs.
+    process_pool_workers: Optional[int] = None
 
     # Timeouts
     grpc_check_alive_timeout: int = 60
@@ -242,6 +267,125 @@ class Settings(BaseSettings):
     memory_threshold_high: float = 0.75
     memory_threshold_low: float = 0.50
     memory_check_interval: int = 10
+    #: Freeze the garbage collector after bulk loads (e.g. preloading the hot set), so the
+    #: long-lived loaded objects are not traversed by later collections. Frozen objects are
+    #: unfrozen when memory is over the threshold, so the unloaded ones can be collected.
+    #: Opt-in, since any other cyclic garbage alive at that moment is not collected until then.
+    gc_freeze: bool = False
+    #: Minimum number of objects received at once to be considered a bulk load.
+    gc_freeze_min_objects: int = 1000
+    #: Maximum threshold of the youngest GC generation. The threshold is raised with the
+    #: number of loaded objects up to this value, so collections are less frequent with big
+    #: heaps. Disabled if None (the Python defaults are used).
+    gc_max_threshold: Optional[int] = 100_000
+    #: Number of objects unloaded between explicit collections when memory is over the threshold.
+    gc_collect_batch: int = 1000
+
+    # Storage
+    #: Minimum size (in bytes) for a NumPy array to be stored in its own raw ``.npy`` file
+    #: when an object is unloaded, and to be loaded back lazily as a ``numpy.memmap``.
+    #: Disabled if None (arrays are pickled together with the rest of the object).
+    memmap_threshold: Optional[int] = None
+    #: Compression codec for the stored object files. The codec used is recorded in each file,
+    #: so files written with different codecs can be loaded. Requires ``dataclay[compression]``.
+    storage_compression: Literal["none", "zstd", "lz4"] = "none"
+    #: Compression level. If None, the default level of the codec is used.
+    storage_compression_level: Optional[int] = None
+    #: Files smaller than this (in bytes) are stored uncompressed.
+    storage_compression_min_size: int = 4096
+    #: If True, the backend records the objects loaded in memory when it is stopped, and
+    #: preloads them in the background when it is started again.
+    preload_hot_set: bool = False
+    #: Maximum number of bytes (as stored on disk) to preload on startup. No limit if None.
+    preload_max_bytes: Optional[int] = None
+    #: Maximum number of objects being preloaded concurrently.
+    preload_concurrency: int = 16
+    #: Default depth of the referenced objects prefetched when an object is loaded
+    #: (see :attr:`~dataclay.DataClayObject._dc_prefetch_depth`). Disabled if 0.
+    prefetch_depth: int = 0
+
+    # Object transfer
+    #: Use client-streaming RPCs to send objects to the backends, so that they are
+    #: serialized and transferred one by one instead of all at once.
+    stream_objects: bool = False
+    #: Maximum number of serialized objects (or chunks) waiting to be sent in a stream.
+    stream_max_pending_objects: int = 16
+    #: Call activemethods with big arguments or results (see :attr:`stream_call_threshold`)
+    #: with a bidirectional-streaming RPC, so that they are sent and received in chunks.
+    stream_calls: bool = False
+    #: Size (in bytes) of the serialized arguments above which activemethods are called with
+    #: a streaming RPC. Methods that have returned bigger results are also called with it.
+    stream_call_threshold: int = 64 * 1024 * 1024
+    #: Size (in bytes) of the chunks of streamed activemethod arguments and results.
+    stream_chunk_size: int = 1024 * 1024
+
+    # Rebalancing
+    #: Interval (in seconds) at which backends publish the sizes and access rates of their
+    #: objects. If None, they are only published when a rebalance requests them.
+    stats_interval: Optional[float] = None
+    #: Time (in seconds) that a rebalance waits for the backends to publish their stats.
+    stats_request_timeout: float = 5.0
+    #: Weight of the access rate in the load of the backends, between 0 (balance only the
+    #: stored bytes) and 1 (balance only the accesses).
+    rebalance_access_weight: float = 0.5
+    #: Imbalance tolerated, as a fraction of the mean load of the backends.
+    rebalance_tolerance: float = 0.05
+    #: Maximum size (in bytes) of each batch of objects sent in a transfer.
+    rebalance_batch_bytes: int = 64 * 1024 * 1024
+    #: Maximum number of transfers (between pairs of backends) in progress at the same time.
+    rebalance_parallel_transfers: int = 4
+    #: Maximum total bandwidth (in bytes per second) of the transfers. No limit if None.
+    rebalance_max_bandwidth: Optional[int] = None
+    #: Gradually move objects to the backends that join, in the background, so that they take
+    #: their share of the load. Each backend moves its own objects, most loaded first.
+    scale_out_rebalance: bool = False
+    #: Seconds to wait after a backend joins before moving objects to it, so that backends
+    #: joining together are handled at once.
+    scale_out_delay: float = 5.0
+    #: Maximum size (in bytes) of each batch of objects moved to a new backend.
+    scale_out_batch_bytes: int = 4 * 1024 * 1024
+    #: Maximum bandwidth (in bytes per second) of the objects moved by each backend to the new
+    #: ones, to bound their impact on the calls being served. No limit if None.
+    scale_out_max_bandwidth: Optional[int] = 16 * 1024 * 1024
+    #: Maximum number of transfers in progress when a backend is drained, both for its master
+    #: objects and for its replicas.
+    drain_parallel_transfers: int = 8
+    #: Target bandwidth (in bytes per second) of the transfers when a backend is drained, to
+    #: bound their impact on the calls being served. No limit if None.
+    drain_max_bandwidth: Optional[int] = None
+
+    # Replication
+    #: How the master propagates property updates to the replicas. With "sync", updates
+    #: are sent before the call that made them returns. With "async", they are batched
+    #: and sent in the background. With "none" (the default), replicas are never refreshed.
+    replica_sync: Literal["sync", "async", "none"] = "none"
+    #: Maximum time (in seconds) that replicas lag behind the master with "async" sync.
+    replica_max_lag: float = 1.0
+    #: Send a duplicate of slow readonly calls to another replica, and use the first response.
+    hedged_reads: bool = False
+    #: Time (in seconds) to wait for a readonly call before sending the duplicate. If None,
+    #: the 95th percentile of the observed latency of readonly calls is used.
+    hedge_delay: Optional[float] = None
+
+    # Admission control
+    #: Maximum number of threads used by concurrent activemethods in a backend. Each call
+    #: takes as many as its ``max_threads`` execution constraint. If None, unlimited. Since
+    #: nested calls also take threads, chains of nested calls may wait for each other if it
+    #: is too low.
+    max_concurrent_calls: Optional[int] = None
+    #: Maximum number of concurrent calls to the same activemethod. If None, unlimited.
+    max_concurrent_calls_per_method: Optional[int] = None
+    #: Concurrency limits for specific activemethods (``"module.Class.method"``), which
+    #: override :attr:`max_concurrent_calls_per_method`.
+    method_concurrency_limits: dict[str, int] = {}
+    #: Maximum number of activemethod calls waiting for each limit. Calls beyond it are
+    #: rejected, and retried by the caller.
+    max_queued_calls: int = 1024
+    #: Memory (in bytes) reserved by concurrent activemethods, according to their
+    #: ``max_memory`` execution constraint. If None, memory is not reserved.
+    admission_memory_budget: Optional[int] = None
+    #: Number of times a rejected call is retried (with exponential backoff) before failing.
+    overload_max_retries: int = 10
 
     # Root account
     if LEGACY_DEPS:
@@ -0,0 +1,37 @@
+"""Module with classes for testing how activemethods are called and executed"""
+
+import time
+
+from dataclay import DataClayObject, activemethod
+
+
+class Counter(DataClayObject):
+    value: int
+
+    @activemethod
+    def __init__(self, value=0):
+        self.value = value
+
+    @activemethod(executor="process")
+    def process_add(self, amount):
+        self.value += amount
+        return self.value
+
+    @activemethod(executor="process")
+    def process_delete_value(self):
+        del self.value
+
+    @activemethod
+    def slow_add(self, amount):
+        # Limited to one concurrent call in the backends of the functional tests
+        time.sleep(0.05)
+        self.value += amount
+        return self.value
+
+    @activemethod
+    def echo(self, data):
+        return data
+
+    @activemethod
+    def fail(self, data):
+        raise ValueError(f"Received {len(data)} bytes")
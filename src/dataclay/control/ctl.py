@@ -8,9 +8,13 @@ import grpc
 from grpc_health.v1 import health_pb2, health_pb2_grpc
 
 import dataclay
+from dataclay.backend.admission import parse_size
 from dataclay.backend.client import BackendClient
 from dataclay.config import ClientSettings, settings
+from dataclay.metadata.api import MetadataAPI
 from dataclay.metadata.client import MetadataClient
+from dataclay.utils.rebalance import execute_plan
+from dataclay.utils.rebalance import rebalance as plan_and_rebalance
 from dataclay.utils.uuid import UUIDEncoder
 
 logger = logging.getLogger(__name__)
@@ -69,6 +73,12 @@ async def stop_backend(host, port):
     await backend_client.stop()
 
 
+async def drain_backend(host, port):
+    logger.info("Draining backend at %s:%s", host, port)
+    backend_client = BackendClient(host, port)
+    await backend_client.drain()
+
+
 async def stop_dataclay(host, port):
     logger.info("Stopping dataclay at %s:%s", host, port)
     metadata_client = MetadataClient(host, port)
@@ -79,53 +89,51 @@ async def stop_dataclay(host, port):
     await metadata_client.stop()
 
 
-def rebalance(host, port):
+async def rebalance(
+    host,
+    port,
+    kv_host,
+    kv_port,
+    dry_run=False,
+    batch_bytes=None,
+    parallel_transfers=None,
+    max_bandwidth=None,
+):
     logger.info("Rebalancing dataclay at %s:%s", host, port)
     metadata_client = MetadataClient(host, port)
-    backend_infos = metadata_client.get_all_backends()
-
-    # Get backend clients
-    backend_clients = {}
-    for id, info in backend_infos.items():
-        backend_client = BackendClient(info.host, info.port)
-        if backend_client.is_ready(5):
-            backend_clients[id] = backend_client
-
-    object_mds = metadata_client.get_all_objects()
-    num_objects = len(object_mds)
-    mean = num_objects // len(backend_clients)
-
-    print("Num backends:", len(backend_clients))
-    print("Num objects:", num_objects)
-    print("Avg objects per backend:", mean)
-
-    backend_objects = {backend_id: [] for backend_id in backend_clients.keys()}
-    for object_md in object_mds.values():
-        backend_objects[object_md.master_backend_id].append(object_md.id)
-
-    print("\nBefore rebalance:")
-    backends_diff = {}
-    for backend_id, objects in backend_objects.items():
-        print(f"{backend_id}: {len(objects)}")
-        diff = len(objects) - mean
-        backends_diff[backend_id] = diff
-
-    for backend_id, object_ids in backend_objects.items():
-        if backends_diff[backend_id] <= 0:
-            continue
-        for new_backend_id in backend_objects.keys():
-            if backend_id == new_backend_id or backends_diff[new_backend_id] >= 0:
-                continue
-            while backends_diff[backend_id] > 0 and backends_diff[new_backend_id] < 0:
-                object_id = object_ids.pop()
-                backend_client = backend_clients[backend_id]
-                backend_client.move_object(object_id, new_backend_id, None)
-                backends_diff[backend_id] -= 1
-                backends_diff[new_backend_id] += 1
-
-    print("\nAfter rebalance:")
-    for backend_id, diff in backends_diff.items():
-        print(f"{backend_id}: {mean+diff}")
+    backend_infos = await metadata_client.get_all_backends()
+    backend_clients = {
+        backend_id: BackendClient(info.host, info.port, backend_id=backend_id)
+        for backend_id, info in backend_infos.items()
+    }
+
+    async def get_backend_client(backend_id):
+        return backend_clients[backend_id]
+
+    def progress(num_moved, num_objects):
+        print(f"\rMoved {num_moved}/{num_objects} objects", end="", flush=True)
+
+    # The objects, and their sizes and access rates, are read from the kv database
+    metadata_api = MetadataAPI(kv_host, kv_port)
+    try:
+        plan = await plan_and_rebalance(
+            metadata_api, backend_clients.keys(), get_backend_client, dry_run=True
+        )
+        print(plan.summary())
+        if not dry_run and plan.transfers:
+            await execute_plan(
+                plan,
+                get_backend_client,
+                batch_bytes,
+                parallel_transfers,
+                max_bandwidth,
+                progress,
+            )
+            print("\nRebalance finished")
+    finally:
+        await metadata_api.close()
+        for backend_client in backend_clients.values():
+            backend_client.close()
 
 
 async def flush_all(host, port):
@@ -219,6 +227,41 @@ def parse_arguments():
     # rebalance #
     #############
     parser_rebalance = subparsers.add_parser("rebalance", parents=[common_args])
+    parser_rebalance.add_argument(
+        "--kv-host",
+        type=str,
+        default=settings.kv_host,
+        help="Specify the kv database host (default: DATACLAY_KV_HOST)",
+    )
+    parser_rebalance.add_argument(
+        "--kv-port",
+        type=int,
+        default=settings.kv_port,
+        help="Specify the kv database port (default: DATACLAY_KV_PORT or 6379)",
+    )
+    parser_rebalance.add_argument(
+        "--dry-run", action="store_true", help="Print the plan without moving any object"
+    )
+    parser_rebalance.add_argument(
+        "--batch-size",
+        type=parse_size,
+        default=None,
+        help="Maximum size of each batch of objects, e.g. 64MB (default: "
+        "DATACLAY_REBALANCE_BATCH_BYTES)",
+    )
+    parser_rebalance.add_argument(
+        "--parallel",
+        type=int,
+        default=None,
+        help="Maximum transfers in progress (default: DATACLAY_REBALANCE_PARALLEL_TRANSFERS)",
+    )
+    parser_rebalance.add_argument(
+        "--max-bandwidth",
+        type=parse_size,
+        default=None,
+        help="Maximum bytes per second of all the transfers, e.g. 100MB (default: "
+        "DATACLAY_REBALANCE_MAX_BANDWIDTH)",
+    )
 
     ##############
     # flush_all #
@@ -243,6 +286,17 @@ def parse_arguments():
         "--port", type=int, default=6867, help="Specify the backend port (default: 6867)"
     )
 
+    #################
+    # drain_backend #
+    #################
+    parser_drain_backend = subparsers.add_parser("drain_backend")
+    parser_drain_backend.add_argument(
+        "--host", type=str, required=True, help="Specify the backend host"
+    )
+    parser_drain_backend.add_argument(
+        "--port", type=int, default=6867, help="Specify the backend port (default: 6867)"
+    )
+
     #################
     # stop_dataclay #
     #################
@@ -281,11 +335,25 @@ async def main():
     elif args.function == "stop_backend":
         await stop_backend(args.host, args.port)
 
+    elif args.function == "drain_backend":
+        await drain_backend(args.host, args.port)
+
     elif args.function == "stop_dataclay":
         await stop_dataclay(args.host, args.port)
 
     elif args.function == "rebalance":
-        rebalance(args.host, args.port)
+        if args.kv_host is None:
+            raise ValueError("The kv database host is required (--kv-host or DATACLAY_KV_HOST)")
+        await rebalance(
+            args.host,
+            args.port,
+            args.kv_host,
+            args.kv_port,
+            args.dry_run,
+            args.batch_size,
+            args.parallel,
+            args.max_bandwidth,
+        )
 
     elif args.function == "flush_all":
         await flush_all(args.host, args.port)
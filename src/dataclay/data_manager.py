@@ -1,21 +1,31 @@
 from __future__ import annotations
 
 import asyncio
+import collections
 import gc
+import io
+import json
 import logging
-import pickle
-from typing import TYPE_CHECKING, Optional
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Optional
+from uuid import UUID
 
 import psutil
 
-from dataclay.config import settings
-from dataclay.event_loop import dc_to_thread_cpu, get_dc_event_loop
+from dataclay.config import get_runtime, settings
+from dataclay.event_loop import dc_to_thread_cpu, dc_to_thread_io, get_dc_event_loop
 from dataclay.exceptions import DataClayException, ObjectNotFound, ObjectStorageError
 from dataclay.lock_manager import lock_manager
-from dataclay.utils.serialization import DataClayPickler
+from dataclay.utils import compression
+from dataclay.utils.serialization import (
+    StorageDataClayPickler,
+    StorageDataClayUnpickler,
+)
 
 if TYPE_CHECKING:
-    from uuid import UUID
+    from collections.abc import Iterable
 
     from dataclay.dataclay_object import DataClayObject
 
@@ -23,6 +33,155 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def _store_state(path: str, state) -> set[UUID]:
+    """Pickle the state to ``path``, removing the arrays files no longer referenced.
+
+    Returns the IDs of the dataClay objects referenced by the state.
+    """
+    if settings.storage_compression == "none":
+        with open(path, "wb") as f:
+            pickler = StorageDataClayPickler(f, path)
+            pickler.dump(state)
+    else:
+        buffer = io.BytesIO()
+        pickler = StorageDataClayPickler(buffer, path)
+        pickler.dump(state)
+        with open(path, "wb") as f:
+            f.write(compression.compress(buffer.getbuffer()))
+
+    if os.path.isdir(pickler.arrays_dir):
+        for filename in os.listdir(pickler.arrays_dir):
+            array_path = os.path.join(pickler.arrays_dir, filename)
+            if array_path not in pickler.array_paths:
+                os.remove(array_path)
+
+    return pickler.references
+
+
+def _load_state(path: str):
+    """Unpickle the state stored in ``path``."""
+    with open(path, "rb") as f:
+        if compression.is_compressed(f.read(compression.HEADER_SIZE)):
+            f.seek(0)
+            data = compression.decompress(f.read())
+            return StorageDataClayUnpickler(io.BytesIO(data), path).load()
+        f.seek(0)
+        return StorageDataClayUnpickler(f, path).load()
+
+
+def _remove_state(path: str):
+    """Remove the file ``path`` and its arrays files (if any)."""
+    shutil.rmtree(path + ".arrays", ignore_errors=True)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _store_properties(
+    path: str,
+    metadata_dict: dict,
+    dc_properties: dict[str, Any],
+    unloaded_properties: set[str],
+    stored_properties: frozenset[str],
+) -> set[UUID]:
+    """Store each loaded property in its own file, and the object metadata in ``path``.
+
+    The properties that have not been loaded are already up to date on disk,
+    so they are not rewritten (and their references are not returned).
+    """
+    references = set()
+    for dc_property_name, value in dc_properties.items():
+        references |= _store_state(f"{path}.{dc_property_name}", value)
+
+    new_stored_properties = frozenset(dc_properties.keys() | unloaded_properties)
+    for dc_property_name in stored_properties - new_stored_properties:
+        _remove_state(f"{path}.{dc_property_name}")
+
+    # A set of names (instead of a dict of values) tells that properties are stored independently
+    _store_state(path, (metadata_dict, new_stored_properties, None))
+    return references
+
+
+def _stored_size(path: str, dc_property_names: Iterable[str] = ()) -> int:
+    """Size (in bytes) of a stored object, including its properties stored independently."""
+    size = 0
+    for file_path in (path, *(f"{path}.{name}" for name in dc_property_names)):
+        try:
+            size += os.path.getsize(file_path)
+        except OSError:
+            pass
+    return size
+
+
+def _store_object(
+    path: str,
+    state: tuple[dict, dict[str, Any], Any],
+    property_storage: bool,
+    unloaded_properties: set[str],
+    stored_properties: frozenset[str],
+) -> tuple[set[UUID], int]:
+    """Store the state of an object in ``path``, with each property in its own file if
+    ``property_storage`` is set or some properties have not been loaded.
+
+    Returns the IDs of the dataClay objects referenced by the stored state, and its size.
+    """
+    metadata_dict, dc_properties, getstate = state
+    if getstate is None and (property_storage or unloaded_properties):
+        references = _store_properties(
+            path, metadata_dict, dc_properties, unloaded_properties, stored_properties
+        )
+        return references, _stored_size(path, dc_properties.keys() | unloaded_properties)
+
+    references = _store_state(path, state)
+    for dc_property_name in stored_properties:
+        _remove_state(f"{path}.{dc_property_name}")
+    return references, _stored_size(path)
+
+
+def _write_hot_set(path: str, hot_set: list[tuple[str, int]]):
+    with open(path, "w") as f:
+        json.dump(hot_set, f)
+
+
+def _read_hot_set(path: str, max_bytes: Optional[int]) -> list[tuple[str, int]]:
+    """Read the hot set, keeping the most accessed objects that fit in ``max_bytes``.
+
+    The file is removed, so that a stale hot set is not preloaded if the backend is not
+    stopped cleanly next time.
+    """
+    with open(path) as f:
+        hot_set = json.load(f)
+    os.remove(path)
+
+    if max_bytes is None:
+        return hot_set
+
+    # Size on disk of each object, including the files of its properties
+    sizes = collections.Counter()
+    with os.scandir(os.path.dirname(path)) as it:
+        for entry in it:
+            if entry.is_file():
+                sizes[entry.name.split(".", 1)[0]] += entry.stat().st_size
+
+    total_bytes = 0
+    result = []
+    for object_id, count in hot_set:
+        total_bytes += sizes[object_id]
+        if total_bytes > max_bytes:
+            break
+        result.append((object_id, count))
+    return result
+
+
+def _hot_set_path() -> str:
+    path = os.path.join(settings.storage_path, "HOT_SET")
+    if settings.backend is not None and settings.backend.worker_index is not None:
+        # Workers of a supervised backend share the storage path
+        path += f".{settings.backend.worker_index}"
+    return path
+
+
 class _DummyStoredObjects:
     def inc(self):
         """Dummy function"""
@@ -46,25 +205,80 @@ class DataManager:
         self.loaded_objects: dict[UUID, DataClayObject] = {}
         self.memory_lock = asyncio.Lock()
         self.memory_task = None
+        # Number of accesses to each object, used to choose the objects to preload on restart
+        self.access_counts: collections.Counter[UUID] = collections.Counter()
+        # Size of the objects when they were last stored, and the access counts when the stats
+        # were last reported, used to rebalance the objects
+        self.object_sizes: dict[UUID, int] = {}
+        self.reported_access_counts: collections.Counter[UUID] = collections.Counter()
+        self.stats_time = time.monotonic()
+        # Known references between objects, used to prefetch the referenced objects
+        self.references: dict[UUID, frozenset[UUID]] = {}
+        # Objects referenced by the affinity properties, used to move the groups together
+        self.affinity: dict[UUID, frozenset[UUID]] = {}
+        self.prefetch_tasks: set[asyncio.Task] = set()
 
         if settings.metrics:
             # pylint: disable=import-outside-toplevel
             from dataclay.utils import metrics
 
             metrics.dataclay_loaded_objects.set_function(lambda: len(self.loaded_objects))
+            metrics.dataclay_gc_frozen_objects.set_function(gc.get_freeze_count)
             self.dataclay_stored_objects = metrics.dataclay_stored_objects
+            self.gc_pause_seconds = metrics.dataclay_gc_pause_seconds
         else:
             self.dataclay_stored_objects = _DummyStoredObjects()
+            self.gc_pause_seconds = None
+
+        # Thresholds of the garbage collector, before tuning them
+        self.gc_default_thresholds = gc.get_threshold()
+        self.gc_start_time = None
 
     def start_memory_monitor(self):
         if self.memory_task is None or self.memory_task.done():
             self.memory_task = get_dc_event_loop().create_task(self.memory_monitor_loop())
+            if self.gc_pause_seconds is not None:
+                gc.callbacks.append(self.gc_callback)
         else:
             logger.warning("Memory monitor is already running")
 
     def stop_memory_monitor(self):
         if self.memory_task:
             self.memory_task.cancel()
+        if self.gc_callback in gc.callbacks:
+            gc.callbacks.remove(self.gc_callback)
+
+    def gc_callback(self, phase: str, info: dict[str, int]):
+        """Measure the pauses of the garbage collector."""
+        if phase == "start":
+            self.gc_start_time = time.perf_counter()
+        elif self.gc_start_time is not None:
+            self.gc_pause_seconds.labels(info["generation"]).observe(
+                time.perf_counter() - self.gc_start_time
+            )
+            self.gc_start_time = None
+
+    def tune_gc(self):
+        """Raise the threshold of the youngest GC generation with the number of loaded objects.
+
+        Young collections are less frequent with big heaps, so fewer objects survive to the
+        older generations, which are the ones with long pauses.
+        """
+        if settings.gc_max_threshold is None:
+            return
+        threshold0, threshold1, threshold2 = self.gc_default_thresholds
+        threshold0 = max(threshold0, min(len(self.loaded_objects) // 10, settings.gc_max_threshold))
+        gc.set_threshold(threshold0, threshold1, threshold2)
+
+    def freeze_gc(self, num_objects: int):
+        """Freeze the garbage collector after a bulk load of *num_objects* objects.
+
+        All the objects tracked by the collector are moved to a permanent generation, which is
+        ignored by collections. They are unfrozen when memory is over the threshold.
+        """
+        if settings.gc_freeze and num_objects >= settings.gc_freeze_min_objects:
+            gc.freeze()
+            logger.debug("Frozen %d objects after a bulk load", gc.get_freeze_count())
 
     async def memory_monitor_loop(self):
         try:
@@ -79,11 +293,14 @@ class DataManager:
         """Check memory usage and unload objects if necessary."""
         logger.debug("Checking memory usage")
         async with self.memory_lock:
+            self.tune_gc()
             if self.is_memory_over_threshold():
                 logger.warning("Memory is over threshold")
                 logger.warning("Num loaded objects: %d", len(self.loaded_objects))
 
-                for object_id in list(self.loaded_objects.keys()):
+                # Frozen objects are never collected, and some of them will be unloaded
+                gc.unfreeze()
+                for i, object_id in enumerate(list(self.loaded_objects.keys()), 1):
                     # TODO: Maybe unload multiple objects at once (with gather?)
                     # Or use a queue to unload objects, until not memory pressure
                     # NOTE: Timeout is 0, so it won't wait for the lock if in use,
@@ -91,17 +308,115 @@ class DataManager:
                     dc_object = self.loaded_objects[object_id]
                     await self.unload_object(dc_object, timeout=0, force=False)
 
-                    # TODO: Do we need to call every time gc.collect()?
-                    gc.collect()
+                    # Most of the memory is freed by reference counting. Collect only the
+                    # cycles, in batches, since each collection traverses the whole heap
+                    if i % settings.gc_collect_batch == 0:
+                        gc.collect()
                     if self.is_memory_below_threshold():
                         logger.info("Memory is below threshold")
                         logger.info("Num loaded objects: %d", len(self.loaded_objects))
                         break
                 else:
                     logger.warning("All objects unloaded, but memory is not at ease.")
+
+                gc.collect()
+                # The objects that remain loaded are still long-lived
+                self.freeze_gc(len(self.loaded_objects))
             else:
                 logger.debug("Memory is below threshold")
 
+    def record_access(self, object_id: UUID):
+        """Count an access to the object, to track the hot set."""
+        self.access_counts[object_id] += 1
+
+    def get_object_stats(self) -> dict[UUID, tuple[int, float]]:
+        """Size and access rate (since the last call) of the master objects of this backend.
+
+        The size is the one of the object when it was last stored, or 0 if it is unknown.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.stats_time, 1e-3)
+        self.stats_time = now
+
+        object_ids = set(self.object_sizes)
+        object_ids.update(
+            object_id
+            for object_id, instance in self.loaded_objects.items()
+            if not instance._dc_is_replica
+        )
+        stats = {
+            object_id: (
+                self.object_sizes.get(object_id, 0),
+                (self.access_counts[object_id] - self.reported_access_counts[object_id]) / elapsed,
+            )
+            for object_id in object_ids
+        }
+        self.reported_access_counts = self.access_counts.copy()
+        return stats
+
+    def record_affinity(self, instance: DataClayObject):
+        """Record the objects referenced by the affinity properties of a loaded object.
+
+        If some affinity property is not loaded, its previous references are kept.
+        """
+        references = frozenset(
+            reference._dc_meta.id for reference in instance._dc_affinity_references()
+        )
+        if not instance._dc_unloaded_properties.isdisjoint(instance._dc_affinity):
+            references |= self.affinity.get(instance._dc_meta.id, frozenset())
+        self.affinity[instance._dc_meta.id] = references
+
+    def get_affinity(self) -> dict[UUID, list[UUID]]:
+        """Objects referenced by the affinity properties of the master objects of this backend."""
+        for instance in self.loaded_objects.values():
+            if instance._dc_affinity and not instance._dc_is_replica:
+                self.record_affinity(instance)
+        return {
+            object_id: list(references)
+            for object_id, references in self.affinity.items()
+            if references
+        }
+
+    def forget_object(self, object_id: UUID):
+        """Discard the stats and references of an object no longer stored in this backend."""
+        self.references.pop(object_id, None)
+        self.affinity.pop(object_id, None)
+        self.object_sizes.pop(object_id, None)
+        self.access_counts.pop(object_id, None)
+        self.reported_access_counts.pop(object_id, None)
+
+    async def save_hot_set(self):
+        """Store the loaded objects and their access frequency, most accessed first."""
+        hot_set = sorted(
+            ((str(object_id), self.access_counts[object_id]) for object_id in self.loaded_objects),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        logger.info("Saving hot set of %d objects", len(hot_set))
+        path = _hot_set_path()
+        await dc_to_thread_io(_write_hot_set, path, hot_set)
+
+    async def read_hot_set(self) -> list[UUID]:
+        """Return the objects of the saved hot set (if any) to preload, most accessed first.
+
+        The number of objects is limited by ``settings.preload_max_bytes``.
+        """
+        path = _hot_set_path()
+        try:
+            hot_set = await dc_to_thread_io(_read_hot_set, path, settings.preload_max_bytes)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.warning("Could not read the hot set: %s", e)
+            return []
+
+        object_ids = []
+        for object_id, count in hot_set:
+            object_id = UUID(object_id)
+            self.access_counts[object_id] += count
+            object_ids.append(object_id)
+        return object_ids
+
     def add_hard_reference(self, instance: DataClayObject):
         """Add a hard reference to the provided object."""
         logger.debug("(%s) Adding hard reference to heap", instance._dc_meta.id)
@@ -112,12 +427,62 @@ class DataManager:
         logger.debug("(%s) Removing hard reference from heap", instance._dc_meta.id)
         self.loaded_objects.pop(instance._dc_meta.id, None)
 
-    async def load_object(self, instance: DataClayObject):
+    def add_references(self, object_id: UUID, references: Iterable[UUID]):
+        """Record the objects referenced by an object, replacing the previous ones."""
+        references = frozenset(references)
+        if references:
+            self.references[object_id] = references
+        else:
+            self.references.pop(object_id, None)
+
+    def prefetch_references(self, instance: DataClayObject, depth: Optional[int] = None):
+        """Load the objects referenced by the instance in the background.
+
+        Args:
+            instance (DataClayObject): The object whose references are prefetched.
+            depth (Optional[int]): Depth of the references to prefetch. If None,
+                the prefetch depth of the class of the instance is used.
+        """
+        if depth is None:
+            depth = instance._dc_prefetch_depth
+            if depth is None:
+                depth = settings.prefetch_depth
+        if depth <= 0:
+            return
+
+        object_ids = self.references.get(instance._dc_meta.id)
+        if not object_ids:
+            return
+
+        logger.debug("(%s) Prefetching %d references", instance._dc_meta.id, len(object_ids))
+        task = get_dc_event_loop().create_task(self._prefetch(object_ids, depth))
+        # Keep a reference to the task, so it is not garbage collected
+        self.prefetch_tasks.add(task)
+        task.add_done_callback(self.prefetch_tasks.discard)
+
+    async def _prefetch(self, object_ids: Iterable[UUID], depth: int):
+        runtime = get_runtime()
+
+        async def prefetch(object_id: UUID):
+            try:
+                if self.is_memory_over_threshold():
+                    return
+                instance = await runtime.get_object_by_id(object_id)
+                if instance._dc_is_local and not instance._dc_is_loaded:
+                    await self.load_object(instance, prefetch_depth=depth - 1)
+            except Exception as e:
+                logger.debug("(%s) Could not prefetch object: %s", object_id, e)
+
+        await asyncio.gather(*[prefetch(object_id) for object_id in object_ids])
+
+    async def load_object(self, instance: DataClayObject, prefetch_depth: Optional[int] = None):
         """Load the provided object from disk to memory. This method is blocking.
         Should be called from another thread to avoid blocking the main thread.
 
         Args:
             instance (DataClayObject): The object to load.
+            prefetch_depth (Optional[int]): Depth of the referenced objects to prefetch
+                after loading it. If None, the prefetch depth of its class is used.
         """
         object_id = instance._dc_meta.id
 
@@ -141,7 +506,7 @@ class DataManager:
                 path = f"{settings.storage_path}/{object_id}"
                 # TODO: Is it necessary dc_to_thread_cpu? Should be blocking
                 # to avoid bugs with parallel loads?
-                metadata_dict, dc_properties, getstate = await dc_to_thread_cpu(pickle.load, open(path, "rb"))
+                metadata_dict, dc_properties, getstate = await dc_to_thread_cpu(_load_state, path)
                 self.dataclay_stored_objects.dec()
             except Exception as e:
                 raise ObjectNotFound(object_id) from e
@@ -151,12 +516,57 @@ class DataManager:
             instance._dc_is_loaded = True
             if getstate is not None:
                 instance.__setstate__(getstate)
+            elif isinstance(dc_properties, frozenset):
+                # Properties stored independently are loaded on first access
+                instance._dc_stored_properties = dc_properties
+                instance._dc_unloaded_properties = set(dc_properties)
             else:
                 vars(instance).update(dc_properties)
 
             self.add_hard_reference(instance)
             logger.debug("(%s) Loaded '%s'", object_id, instance.__class__.__name__)
 
+        self.prefetch_references(instance, prefetch_depth)
+
+    async def load_properties(
+        self, instance: DataClayObject, dc_property_names: Optional[Iterable[str]] = None
+    ):
+        """Load the properties of a loaded object that are stored independently.
+
+        Args:
+            instance (DataClayObject): The (loaded) object whose properties are loaded.
+            dc_property_names (Optional[Iterable[str]]): The prefixed names of the properties
+                to load. If None, all the properties not loaded yet are loaded.
+        """
+        object_id = instance._dc_meta.id
+
+        async with lock_manager.get_lock(object_id).writer_lock:
+            if dc_property_names is None:
+                dc_property_names = instance._dc_unloaded_properties
+            dc_property_names = [
+                dc_property_name
+                for dc_property_name in dc_property_names
+                if dc_property_name in instance._dc_unloaded_properties
+                and dc_property_name not in vars(instance)
+            ]
+            if not dc_property_names:
+                return
+
+            logger.debug("(%s) Loading properties %s", object_id, dc_property_names)
+            path = f"{settings.storage_path}/{object_id}"
+            try:
+                values = await asyncio.gather(
+                    *[
+                        dc_to_thread_cpu(_load_state, f"{path}.{dc_property_name}")
+                        for dc_property_name in dc_property_names
+                    ]
+                )
+            except Exception as e:
+                raise ObjectNotFound(object_id) from e
+
+            vars(instance).update(zip(dc_property_names, values))
+            instance._dc_unloaded_properties.difference_update(dc_property_names)
+
     async def unload_object(
         self, instance: DataClayObject, timeout: float = 0, force: bool = False
     ):
@@ -195,7 +605,21 @@ class DataManager:
             # Store object to disk
             try:
                 path = f"{settings.storage_path}/{object_id}"
-                DataClayPickler(open(path, "wb")).dump(instance._dc_state)
+                # Pickled (and compressed) in the CPU-bound executor, not to block the loop
+                references, self.object_sizes[object_id] = await dc_to_thread_cpu(
+                    _store_object,
+                    path,
+                    instance._dc_state,
+                    instance._dc_property_storage,
+                    instance._dc_unloaded_properties,
+                    instance._dc_stored_properties,
+                )
+                if instance._dc_unloaded_properties:
+                    # Keep the references of the properties that are not loaded
+                    references |= self.references.get(object_id, frozenset())
+                self.add_references(object_id, references)
+                if instance._dc_affinity:
+                    self.record_affinity(instance)
                 self.dataclay_stored_objects.inc()
             except Exception as e:
                 raise ObjectStorageError(object_id) from e
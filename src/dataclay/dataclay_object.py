@@ -13,13 +13,14 @@ import asyncio
 import functools
 import inspect
 import logging
+import sys
 import threading
 from collections import ChainMap
 from typing import TYPE_CHECKING, Annotated, Any, Optional, Type, TypeVar, get_origin
 
 from dataclay.annotated import LocalOnly, PropertyTransformer
 from dataclay.config import LEGACY_DEPS, get_runtime
-from dataclay.event_loop import get_dc_event_loop
+from dataclay.event_loop import get_dc_call_loop, get_dc_event_loop
 from dataclay.exceptions import (
     AliasDoesNotExistError,
     DoesNotExistError,
@@ -30,6 +31,7 @@ from dataclay.metadata.kvdata import ObjectMetadata
 from dataclay.utils.telemetry import trace
 
 if TYPE_CHECKING:
+    from collections.abc import Set as AbstractSet
     from uuid import UUID
 
 try:
@@ -50,25 +52,43 @@ logger = logging.getLogger(__name__)
 T = TypeVar("T")
 
 
-def activemethod(func):
-    """Decorator for DataClayObject active methods."""
+def _mark_replica_update(instance: DataClayObject, dc_property_name: str):
+    if instance._dc_meta.replica_backend_ids:
+        get_runtime().mark_replica_update(instance, (dc_property_name,))
+
+
+def activemethod(func=None, *, readonly: bool = False, executor: str = "thread"):
+    """Decorator for DataClayObject active methods.
+
+    Args:
+        readonly: If True, the method does not modify the object, so it can be executed
+            in any replica of the object. Otherwise, it is always executed in the master.
+        executor: Where remote calls to the method are executed in the backend. With "thread",
+            in a thread of the backend. With "process", in a pool of worker processes, so
+            CPU-bound methods are not limited by the GIL. Only the properties of the object
+            are available in the worker, and the changed ones are copied back.
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown activemethod executor '{executor}'")
+    if func is None:
+        return functools.partial(activemethod, readonly=readonly, executor=executor)
 
     @functools.wraps(func)
     async def awrapper(self: DataClayObject, *args, **kwargs):
         try:
-            if self._dc_is_local:
+            if self._dc_is_local and (readonly or not self._dc_is_replica):
                 logger.debug(
-                    "(%s) Calling async activemethod '%s' locally", self._dc_meta.id, func.__name__
+                    "(%s) Calling async activemethod '%s' locally", self._dc_id, func.__name__
                 )
                 return await func(self, *args, **kwargs)
             else:
                 logger.debug(
-                    "(%s) Calling async activemethod '%s' remotely", self._dc_meta.id, func.__name__
+                    "(%s) Calling async activemethod '%s' remotely", self._dc_id, func.__name__
                 )
 
                 future = asyncio.run_coroutine_threadsafe(
                     get_runtime().call_remote_method(self, func.__name__, args, kwargs),
-                    get_dc_event_loop(),
+                    get_dc_call_loop(self._dc_master_backend_id),
                 )
                 return await asyncio.wrap_future(future)
         except Exception:
@@ -82,10 +102,9 @@ def activemethod(func):
             # if func.__name__ == "__init__" and not self._dc_is_registered:
             #     self.make_persistent()
 
-            if self._dc_is_local:
-                logger.debug(
-                    "(%s) Calling activemethod '%s' locally", self._dc_meta.id, func.__name__
-                )
+            # Methods that are not readonly are always executed in the master
+            if self._dc_is_local and (readonly or not self._dc_is_replica):
+                logger.debug("(%s) Calling activemethod '%s' locally", self._dc_id, func.__name__)
 
                 # NOTE: Decided to remove reader lock. It is too complex and not necessary, since
                 # the method can be executed even if the object is not loaded. The object will be
@@ -94,22 +113,26 @@ def activemethod(func):
                 # object is unloaded while executing the method.
                 return func(self, *args, **kwargs)
             else:
-                logger.debug(
-                    "(%s) Calling activemethod '%s' remotely", self._dc_meta.id, func.__name__
-                )
+                logger.debug("(%s) Calling activemethod '%s' remotely", self._dc_id, func.__name__)
                 return asyncio.run_coroutine_threadsafe(
                     get_runtime().call_remote_method(self, func.__name__, args, kwargs),
-                    get_dc_event_loop(),
+                    get_dc_call_loop(self._dc_master_backend_id),
                 ).result()
         except Exception:
             logger.debug("Error calling activemethod '%s'", func.__name__, exc_info=True)
             raise
 
     if inspect.iscoroutinefunction(func):
+        if executor == "process":
+            raise TypeError("Async activemethods cannot be executed in a process")
         awrapper._is_activemethod = True
+        awrapper._is_readonly = readonly
+        awrapper._executor = executor
         return awrapper
     else:
         wrapper._is_activemethod = True
+        wrapper._is_readonly = readonly
+        wrapper._executor = executor
         return wrapper
 
 
@@ -135,15 +158,28 @@ class DataClayProperty:
         | False    | True    |  -
         | False    | False   |  B (remote) or C (persistent)
         """
+        # Fast path for local and loaded objects. Keep it free of logging and function calls.
+        if instance._dc_is_local and instance._dc_is_loaded:
+            try:
+                attr = instance.__dict__[self.dc_property_name]
+            except KeyError:
+                # Not set, stored independently, or unloaded meanwhile
+                return self._get(instance, owner)
+            if self.transformer is None:
+                return attr
+            return self.transformer.getter(attr)
+        return self._get(instance, owner)
+
+    def _get(self, instance: DataClayObject, owner):
         logger.debug(
             "(%s) Getting dc_property '%s.%s'",
-            instance._dc_meta.id,
+            instance._dc_id,
             instance.__class__.__name__,
             self.name,
         )
 
         if instance._dc_is_local:
-            logger.debug("(%s) Calling local __getattribute__", instance._dc_meta.id)
+            logger.debug("(%s) Calling local __getattribute__", instance._dc_id)
             # If the object is local and loaded, we can access the attribute directly
             if not instance._dc_is_loaded:
                 # NOTE: Should be called from another thread.
@@ -155,6 +191,16 @@ class DataClayProperty:
             try:
                 attr = getattr(instance, self.dc_property_name)
             except AttributeError as e:
+                if self.dc_property_name in instance._dc_unloaded_properties:
+                    # The property is stored independently, and loaded on first access
+                    assert get_dc_event_loop()._thread_id != threading.get_ident()
+                    asyncio.run_coroutine_threadsafe(
+                        get_runtime().data_manager.load_properties(
+                            instance, (self.dc_property_name,)
+                        ),
+                        get_dc_event_loop(),
+                    ).result()
+                    return self._get(instance, owner)
                 if self.default_value is Sentinel:
                     e.args = (e.args[0].replace(self.dc_property_name, self.name),)
                     raise e
@@ -164,11 +210,11 @@ class DataClayProperty:
             else:
                 return self.transformer.getter(attr)
         else:
-            logger.debug("(%s) Calling remote __getattribute__", instance._dc_meta.id)
+            logger.debug("(%s) Calling remote __getattribute__", instance._dc_id)
             assert get_dc_event_loop()._thread_id != threading.get_ident()
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(instance, "__getattribute__", (self.name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(instance._dc_master_backend_id),
             ).result()
 
     def __set__(self, instance: DataClayObject, value):
@@ -176,58 +222,139 @@ class DataClayProperty:
 
         See the __get__ method for the basic behavioural explanation.
         """
+        # Fast path for local and loaded objects (replicas are only written through the master)
+        if instance._dc_is_local and instance._dc_is_loaded and not instance._dc_is_replica:
+            if instance._dc_unloaded_properties:
+                # No need to load the stored value, since it is being replaced
+                instance._dc_unloaded_properties.discard(self.dc_property_name)
+            if self.transformer is not None:
+                value = self.transformer.setter(value)
+            instance.__dict__[self.dc_property_name] = value
+            if instance._dc_meta.replica_backend_ids:
+                _mark_replica_update(instance, self.dc_property_name)
+            return
+        return self._set(instance, value)
+
+    def _set(self, instance: DataClayObject, value):
         logger.debug(
             "(%s) Setting dc_property '%s.%s'",
-            instance._dc_meta.id,
+            instance._dc_id,
             instance.__class__.__name__,
             self.name,
         )
 
-        if instance._dc_is_local:
-            logger.debug("(%s) Calling local __setattr__", instance._dc_meta.id)
+        # Replicas are only written through the master
+        if instance._dc_is_local and not instance._dc_is_replica:
+            logger.debug("(%s) Calling local __setattr__", instance._dc_id)
             if not instance._dc_is_loaded:
                 assert get_dc_event_loop()._thread_id != threading.get_ident()
                 asyncio.run_coroutine_threadsafe(
                     get_runtime().data_manager.load_object(instance), get_dc_event_loop()
                 ).result()
+            if self.dc_property_name in instance._dc_unloaded_properties:
+                # No need to load the stored value, since it is being replaced
+                instance._dc_unloaded_properties.discard(self.dc_property_name)
             if self.transformer is not None:
                 value = self.transformer.setter(value)
             setattr(instance, self.dc_property_name, value)
+            _mark_replica_update(instance, self.dc_property_name)
         else:
-            logger.debug("(%s) Calling remote __setattr__", instance._dc_meta.id)
+            logger.debug("(%s) Calling remote __setattr__", instance._dc_id)
             assert get_dc_event_loop()._thread_id != threading.get_ident()
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(instance, "__setattr__", (self.name, value), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(instance._dc_master_backend_id),
             ).result()
 
     def __delete__(self, instance: DataClayObject):
         """Deleter for the dataClay property"""
         logger.debug(
             "(%s) Deleting dc_property '%s.%s'",
-            instance._dc_meta.id,
+            instance._dc_id,
             instance.__class__.__name__,
             self.name,
         )
 
-        if instance._dc_is_local:
-            logger.debug("(%s) Calling local __delattr__", instance._dc_meta.id)
+        if instance._dc_is_local and not instance._dc_is_replica:
+            logger.debug("(%s) Calling local __delattr__", instance._dc_id)
             if not instance._dc_is_loaded:
                 assert get_dc_event_loop()._thread_id != threading.get_ident()
                 asyncio.run_coroutine_threadsafe(
                     get_runtime().data_manager.load_object(instance), get_dc_event_loop()
                 ).result()
 
-            delattr(instance, self.dc_property_name)
+            if self.dc_property_name in instance._dc_unloaded_properties:
+                instance._dc_unloaded_properties.discard(self.dc_property_name)
+            else:
+                delattr(instance, self.dc_property_name)
+            _mark_replica_update(instance, self.dc_property_name)
         else:
-            logger.debug("(%s) Calling remote __delattr__", instance._dc_meta.id)
+            logger.debug("(%s) Calling remote __delattr__", instance._dc_id)
             assert get_dc_event_loop()._thread_id != threading.get_ident()
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(instance, "__delattr__", (self.name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(instance._dc_master_backend_id),
             )
 
 
+# Backend IDs shared by the compact proxies, since there are only a few backends
+_interned_backend_ids: dict[UUID, UUID] = {}
+
+
+class ProxyMetadata:
+    """Compact metadata of a remote object, to hold millions of references with little memory.
+
+    It only has the fields needed to reference the object and call it. The full
+    :class:`ObjectMetadata` is created on first access to ``_dc_meta``.
+    """
+
+    __slots__ = ("id", "dataset_name", "class_name", "master_backend_id")
+
+    def __init__(
+        self,
+        object_id: UUID,
+        dataset_name: Optional[str],
+        class_name: str,
+        master_backend_id: UUID,
+    ):
+        self.id = object_id
+        self.dataset_name = None if dataset_name is None else sys.intern(dataset_name)
+        self.class_name = sys.intern(class_name)
+        self.master_backend_id = _interned_backend_ids.setdefault(
+            master_backend_id, master_backend_id
+        )
+
+    def to_object_metadata(self) -> ObjectMetadata:
+        return ObjectMetadata(
+            id=self.id,
+            dataset_name=self.dataset_name,
+            class_name=self.class_name,
+            master_backend_id=self.master_backend_id,
+        )
+
+
+class _LazyObjectMetadata:
+    """Descriptor of ``_dc_meta`` for the proxies created with a :class:`ProxyMetadata`.
+
+    Other objects have ``_dc_meta`` in their __dict__, so it is not used for them.
+    """
+
+    def __get__(self, instance: Optional[DataClayObject], owner) -> ObjectMetadata:
+        if instance is None:
+            return self
+        instance_dict = vars(instance)
+        proxy_meta = instance_dict.get("_dc_proxy_meta")
+        if proxy_meta is None:
+            try:
+                # Created meanwhile by another thread
+                return instance_dict["_dc_meta"]
+            except KeyError:
+                raise AttributeError("_dc_meta") from None
+        object_md = instance_dict.setdefault("_dc_meta", proxy_meta.to_object_metadata())
+        instance_dict.pop("_dc_proxy_meta", None)
+        return object_md
+
+
 class DataClayObject:
     """Main class for Persistent Objects.
 
@@ -235,16 +362,36 @@ class DataClayObject:
     directly, through the StorageObject alias, or through a derived class).
     """
 
-    _dc_meta: ObjectMetadata
+    _dc_meta: ObjectMetadata = _LazyObjectMetadata()
 
     _dc_is_local: bool = True
     _dc_is_loaded: bool = True
     _dc_is_registered: bool = False
     _dc_is_replica: bool = False
 
+    #: If True, each property is stored in its own file when the object is unloaded, and
+    #: it is loaded independently on first access. Override it in the subclass to opt in.
+    _dc_property_storage: bool = False
+    # Names of the properties stored independently, and the ones not loaded yet (a set of the
+    # instance while some are not loaded, or this empty class default)
+    _dc_stored_properties: frozenset[str] = frozenset()
+    _dc_unloaded_properties: AbstractSet[str] = frozenset()
+    #: Depth of the references to prefetch when the object is loaded. If None, the
+    #: value of ``settings.prefetch_depth`` is used. Override it in the subclass.
+    _dc_prefetch_depth: Optional[int] = None
+    #: Names of the properties whose dataClay objects (directly, or in a collection) are in
+    #: the same affinity group as the object. Groups are placed and moved together, so their
+    #: calls to each other are local. Override it in the subclass.
+    _dc_affinity: tuple[str, ...] = ()
+    # Names of the attributes of all the dataClay properties of the class, in order. Computed
+    # in __init_subclass__, so the properties are found without scanning __dict__ (which still
+    # holds their values)
+    _dc_property_names: tuple[str, ...] = ()
+
     def __init_subclass__(cls) -> None:
-        """Defines a @property for each annotatted attribute"""
+        """Defines a @property for each annotatted attribute, and the table of their names"""
         all_annotations = ChainMap(*(get_annotations(c) for c in cls.__mro__))
+        dc_property_names = []
 
         for property_name, property_type in all_annotations.items():
             is_local_only = False
@@ -267,6 +414,22 @@ class DataClayObject:
             else:
                 dataclay_property = DataClayProperty(property_name, transformer=transformer)
             setattr(cls, property_name, dataclay_property)
+            dc_property_names.append(dataclay_property.dc_property_name)
+
+        cls._dc_property_names = tuple(dc_property_names)
+
+    def _dc_affinity_references(self) -> list[DataClayObject]:
+        """The dataClay objects in the affinity properties of the (local and loaded) object."""
+        references = []
+        properties = vars(self)
+        for name in self._dc_affinity:
+            value = properties.get(DC_PROPERTY_PREFIX + name)
+            if isinstance(value, DataClayObject):
+                references.append(value)
+            elif isinstance(value, (list, tuple, set, frozenset, dict)):
+                values = value.values() if isinstance(value, dict) else value
+                references.extend(v for v in values if isinstance(v, DataClayObject))
+        return references
 
     def __new__(cls, *args, **kwargs):
         obj = super().__new__(cls)
@@ -300,15 +463,46 @@ class DataClayObject:
         return obj
 
     @classmethod
-    def new_proxy_object(cls):
+    def new_proxy_object(cls, proxy_meta: Optional[ProxyMetadata] = None):
         obj = super().__new__(cls)
-        obj._dc_meta = ObjectMetadata(class_name=cls.__module__ + "." + cls.__name__)
+        if proxy_meta is None:
+            obj._dc_meta = ObjectMetadata(class_name=cls.__module__ + "." + cls.__name__)
+        else:
+            vars(obj)["_dc_proxy_meta"] = proxy_meta
         return obj
 
+    @property
+    def _dc_id(self) -> UUID:
+        """ID of the object. Unlike ``_dc_meta.id``, it does not create the full metadata of
+        compact proxies."""
+        proxy_meta = vars(self).get("_dc_proxy_meta")
+        if proxy_meta is not None:
+            return proxy_meta.id
+        return self._dc_meta.id
+
+    @property
+    def _dc_class_name(self) -> str:
+        """Same as :attr:`_dc_id`, for the class name."""
+        proxy_meta = vars(self).get("_dc_proxy_meta")
+        if proxy_meta is not None:
+            return proxy_meta.class_name
+        return self._dc_meta.class_name
+
+    @property
+    def _dc_master_backend_id(self) -> Optional[UUID]:
+        """Same as :attr:`_dc_id`, for the master backend."""
+        proxy_meta = vars(self).get("_dc_proxy_meta")
+        if proxy_meta is not None:
+            return proxy_meta.master_backend_id
+        return self._dc_meta.master_backend_id
+
     @property
     def _dc_properties(self) -> dict[str, Any]:
         """Returns __dict__ with only _dc_property_ attributes"""
-        return {k: v for k, v in vars(self).items() if k.startswith(DC_PROPERTY_PREFIX)}
+        instance_dict = vars(self)
+        return {
+            name: instance_dict[name] for name in self._dc_property_names if name in instance_dict
+        }
 
     @property
     def _dc_state(self) -> tuple[dict, Any]:
@@ -327,6 +521,10 @@ class DataClayObject:
     @property
     def _dc_all_backend_ids(self) -> set[UUID]:
         """Returns a set with all the backend ids where the object is stored"""
+        proxy_meta = vars(self).get("_dc_proxy_meta")
+        if proxy_meta is not None:
+            # Compact proxies only reference remote objects without replicas
+            return {proxy_meta.master_backend_id}
         if self._dc_meta.master_backend_id is None:
             return set()
         return self._dc_meta.replica_backend_ids | {self._dc_meta.master_backend_id}
@@ -346,9 +544,11 @@ class DataClayObject:
         Used to free up space when the client or backend lose ownership of the objects;
         or the object is being stored and unloaded
         """
-        self.__dict__ = {
-            k: v for k, v in vars(self).items() if not k.startswith(DC_PROPERTY_PREFIX)
-        }
+        instance_dict = vars(self)
+        for name in self._dc_property_names:
+            instance_dict.pop(name, None)
+        instance_dict.pop("_dc_stored_properties", None)
+        instance_dict.pop("_dc_unloaded_properties", None)
 
     async def _get_properties(self) -> dict[str, Any]:
         return await get_runtime().get_object_properties(self)
@@ -411,37 +611,64 @@ class DataClayObject:
 
     @tracer.start_as_current_span("make_persistent")
     async def _make_persistent(
-        self, alias: Optional[str] = None, backend_id: Optional[UUID] = None
+        self,
+        alias: Optional[str] = None,
+        backend_id: Optional[UUID] = None,
+        placement: Optional[str] = None,
+        colocate_with: Optional[DataClayObject] = None,
     ):
         if self._dc_is_registered:
             logger.info("(%s) Object is already registered", self._dc_meta.id)
+            if backend_id is None and colocate_with is not None:
+                backend_id = await get_runtime().get_colocated_backend(colocate_with)
             if backend_id:
                 await self.a_move(backend_id)
             if alias:
                 await self.a_add_alias(alias)
         else:
-            await get_runtime().make_persistent(self, alias=alias, backend_id=backend_id)
+            await get_runtime().make_persistent(
+                self,
+                alias=alias,
+                backend_id=backend_id,
+                placement=placement,
+                colocate_with=colocate_with,
+            )
 
     async def a_make_persistent(
-        self, alias: Optional[str] = None, backend_id: Optional[UUID] = None
+        self,
+        alias: Optional[str] = None,
+        backend_id: Optional[UUID] = None,
+        placement: Optional[str] = None,
+        colocate_with: Optional[DataClayObject] = None,
     ):
         """Async version of :meth:`make_persistent`."""
         future = asyncio.run_coroutine_threadsafe(
-            self._make_persistent(alias, backend_id), get_dc_event_loop()
+            self._make_persistent(alias, backend_id, placement, colocate_with),
+            get_dc_event_loop(),
         )
         return await asyncio.wrap_future(future)
 
-    def make_persistent(self, alias: Optional[str] = None, backend_id: Optional[UUID] = None):
+    def make_persistent(
+        self,
+        alias: Optional[str] = None,
+        backend_id: Optional[UUID] = None,
+        placement: Optional[str] = None,
+        colocate_with: Optional[DataClayObject] = None,
+    ):
         """Makes the object persistent.
 
         :param alias: Alias of the object. If None, the object will not have an alias.
-        :param backend_id: ID of the backend where the object will be stored. If None, the object
-            will be stored in a random backend.
+        :param backend_id: ID of the backend where the object will be stored. If None, the backend
+            is chosen by the placement policy.
+        :param placement: Placement policy (``random``, ``local``, ``round-robin`` or ``hash``).
+            If None, the policy of the session is used.
+        :param colocate_with: Persistent object whose backend will store this object too.
 
         :raises: KeyError: If the backend_id is not registered in dataClay.
         """
         future = asyncio.run_coroutine_threadsafe(
-            self._make_persistent(alias, backend_id), get_dc_event_loop()
+            self._make_persistent(alias, backend_id, placement, colocate_with),
+            get_dc_event_loop(),
         )
         return future.result()
 
@@ -453,6 +680,9 @@ class DataClayObject:
     @classmethod
     async def a_get_by_id(cls, object_id: UUID) -> DataClayObject:
         """Async version of :meth:`get_by_id`."""
+        instance = get_runtime().get_inmemory_object(object_id)
+        if instance is not None:
+            return instance
         future = asyncio.run_coroutine_threadsafe(cls._get_by_id(object_id), get_dc_event_loop())
         return await asyncio.wrap_future(future)
 
@@ -477,6 +707,12 @@ class DataClayObject:
         # method will be called in another thread, so it will not block the event loop.
 
         logger.debug("(%s) Calling get_by_id", object_id)
+
+        # Objects already in memory are returned directly, without going through the event loop
+        instance = get_runtime().get_inmemory_object(object_id)
+        if instance is not None:
+            return instance
+
         assert get_dc_event_loop()._thread_id != threading.get_ident()
         future = asyncio.run_coroutine_threadsafe(cls._get_by_id(object_id), get_dc_event_loop())
         return future.result()
@@ -835,7 +1071,8 @@ class DataClayObject:
 
     def __repr__(self):
         status = "instance" if self._dc_is_registered else "volatile instance"
-        return f"<{self._dc_meta.class_name} {status} with ObjectID={self._dc_meta.id}>"
+        meta = vars(self).get("_dc_proxy_meta") or self._dc_meta
+        return f"<{meta.class_name} {status} with ObjectID={meta.id}>"
 
     def __eq__(self, other):
         if not isinstance(other, DataClayObject):
@@ -844,11 +1081,11 @@ class DataClayObject:
         if not self._dc_is_registered or not other._dc_is_registered:
             return False
 
-        return self._dc_meta.id == other._dc_meta.id
+        return self._dc_id == other._dc_id
 
     # FIXME: Think another solution, the user may want to override the method
     def __hash__(self):
-        return hash(self._dc_meta.id)
+        return hash(self._dc_id)
 
     def __copy__(self):
         # NOTE: A shallow copy cannot be performed, or has no sense.
@@ -2,31 +2,129 @@ import asyncio
 import concurrent.futures
 import contextvars
 import functools
+import itertools
+import logging
+import os
 import threading
 from asyncio import AbstractEventLoop
-from typing import Awaitable, Union
+from typing import Any, Awaitable, Coroutine, Hashable, Optional, TypeVar, Union
 
 import psutil
 
 from dataclay.config import settings
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 # NOTE: This global event loop is necessary (even if not recommended by asyncio) because
 # dataClay methods can be called from different threads (when running activemethods in backend)
 # and we need to access the single event loop from the main thread.
 dc_event_loop: AbstractEventLoop = None
 
-try:
-    # Get available CPUs after numactl restriction
-    cpu_count = len(psutil.Process().cpu_affinity())
-except AttributeError:
-    # Fallback to the default CPU count if cpu_affinity is not available
-    # (this happens, at least, on MacOS)
-    cpu_count = psutil.cpu_count()
+# Additional event loops of clients, where the calls to remote objects are sharded
+dc_call_loops: list[AbstractEventLoop] = []
+
+# CPUs to which the functions run in the executors are pinned (set from execution constraints)
+cpu_affinity_var: contextvars.ContextVar[Optional[frozenset[int]]] = contextvars.ContextVar(
+    "cpu_affinity", default=None
+)
+
+
+def parse_cpu_list(cpu_list: str) -> frozenset[int]:
+    """Parse a list of CPUs (or NUMA nodes) like "0-3,8,10-11", as used by Linux."""
+    cpus = set()
+    for part in str(cpu_list).split(","):
+        if not part.strip():
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return frozenset(cpus)
+
+
+def numa_node_cpus(node: int) -> frozenset[int]:
+    """CPUs of a NUMA node."""
+    try:
+        with open(f"/sys/devices/system/node/node{node}/cpulist") as f:
+            return parse_cpu_list(f.read())
+    except OSError as e:
+        raise ValueError(f"NUMA node {node} is not available") from e
+
+
+def constraint_cpus(exec_constraints: dict[str, Any]) -> Optional[frozenset[int]]:
+    """CPUs requested by the ``cpus`` or ``numa_node`` execution constraints."""
+    if exec_constraints.get("cpus") is not None:
+        return parse_cpu_list(exec_constraints["cpus"])
+    if exec_constraints.get("numa_node") is not None:
+        return numa_node_cpus(int(exec_constraints["numa_node"]))
+    return None
+
+
+# If pinning a thread has already failed, so that it is only warned once (not for every thread)
+_affinity_failed = False
+
+
+def set_thread_affinity(cpus: frozenset[int]) -> bool:
+    """Pin the calling thread to the CPUs. Returns False if it is not supported or fails."""
+    global _affinity_failed
+    try:
+        os.sched_setaffinity(0, cpus)
+        return True
+    except AttributeError:
+        # Not available, at least, on MacOS
+        message, args = "CPU affinity is not supported on this platform", ()
+    except OSError as e:
+        # E.g. CPUs outside the cpuset of the container
+        message, args = "Could not pin thread to CPUs %s: %s", (sorted(cpus), e)
+    if _affinity_failed:
+        logger.debug(message, *args)
+    else:
+        _affinity_failed = True
+        logger.warning(message, *args)
+    return False
+
+
+def _executor_cpu_sets() -> list[frozenset[int]]:
+    """CPU sets of the executor threads, which are assigned to them in turns."""
+    if settings.executor_numa_nodes is not None:
+        nodes = sorted(parse_cpu_list(settings.executor_numa_nodes))
+        return [numa_node_cpus(node) for node in nodes]
+    if settings.executor_cpus is not None:
+        return [parse_cpu_list(settings.executor_cpus)]
+    return []
+
+
+def _pin_threads_initializer(cpu_sets: list[frozenset[int]]):
+    """Initializer for executor threads, pinning each one to the next CPU set."""
+    if not cpu_sets:
+        return None
+    turn = itertools.count()
+
+    def initializer():
+        set_thread_affinity(cpu_sets[next(turn) % len(cpu_sets)])
+
+    return initializer
+
+
+executor_cpu_sets = _executor_cpu_sets()
+if executor_cpu_sets:
+    cpu_count = len(frozenset().union(*executor_cpu_sets))
+else:
+    try:
+        # Get available CPUs after numactl restriction
+        cpu_count = len(psutil.Process().cpu_affinity())
+    except AttributeError:
+        # Fallback to the default CPU count if cpu_affinity is not available
+        # (this happens, at least, on MacOS)
+        cpu_count = psutil.cpu_count()
 # For CPU-bound tasks, use the number of CPUs available
-cpu_bound_executor = concurrent.futures.ThreadPoolExecutor(max_workers=cpu_count)
+cpu_bound_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=cpu_count, initializer=_pin_threads_initializer(executor_cpu_sets)
+)
 # For I/O-bound tasks, use a higher multiplier
 io_bound_executor = concurrent.futures.ThreadPoolExecutor(
-    max_workers=cpu_count * settings.io_bound_multiplier
+    max_workers=cpu_count * settings.io_bound_multiplier,
+    initializer=_pin_threads_initializer(executor_cpu_sets),
 )
 
 
@@ -39,9 +137,63 @@ def get_dc_event_loop() -> Union[None, AbstractEventLoop]:
     return dc_event_loop
 
 
+def new_event_loop() -> AbstractEventLoop:
+    """Create a new event loop, using uvloop if ``settings.uvloop`` is set."""
+    if settings.uvloop:
+        # pylint: disable=import-outside-toplevel
+        import uvloop
+
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run_event_loop(main: Coroutine[Any, Any, T]) -> T:
+    """Run the main coroutine of a service, like asyncio.run, using uvloop if
+    ``settings.uvloop`` is set."""
+    if settings.uvloop:
+        # pylint: disable=import-outside-toplevel
+        import uvloop
+
+        return uvloop.run(main)
+    return asyncio.run(main)
+
+
+def start_dc_call_loops(num_loops: int):
+    """Start the event loop threads where the calls to remote objects are sharded."""
+    for i in range(num_loops):
+        loop = new_event_loop()
+        event_loop_thread = EventLoopThread(loop, name=f"CallEventLoopThread-{i}")
+        event_loop_thread.start()
+        event_loop_thread.ready.wait()
+        dc_call_loops.append(loop)
+
+
+def stop_dc_call_loops():
+    for loop in dc_call_loops:
+        loop.call_soon_threadsafe(loop.stop)
+    dc_call_loops.clear()
+
+
+def get_dc_call_loop(key: Hashable) -> AbstractEventLoop:
+    """Event loop for the calls to remote objects, sharded by *key* (e.g. the backend ID)."""
+    if not dc_call_loops or key is None:
+        return dc_event_loop
+    return dc_call_loops[hash(key) % len(dc_call_loops)]
+
+
+async def run_in_dc_event_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Await *coro* in the dataClay event loop, from any event loop.
+
+    Needed for the objects bound to the dataClay event loop, like the metadata client.
+    """
+    if asyncio.get_running_loop() is dc_event_loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, dc_event_loop))
+
+
 class EventLoopThread(threading.Thread):
-    def __init__(self, loop):
-        super().__init__(daemon=True, name="EventLoopThread")
+    def __init__(self, loop, name="EventLoopThread"):
+        super().__init__(daemon=True, name=name)
         self.loop = loop
         self.ready = threading.Event()
 
@@ -67,12 +219,28 @@ async def _dc_to_thread(func, executor, *args, **kwargs):
     separate thread.
     Return a coroutine that can be awaited to get the eventual result of *func*.
     """
-    loop = get_dc_event_loop()
+    loop = asyncio.get_running_loop()
     ctx = contextvars.copy_context()
-    func_call = functools.partial(ctx.run, func, *args, **kwargs)
+    cpus = cpu_affinity_var.get()
+    if cpus is not None:
+        func_call = functools.partial(ctx.run, _run_pinned, cpus, func, *args, **kwargs)
+    else:
+        func_call = functools.partial(ctx.run, func, *args, **kwargs)
     return await loop.run_in_executor(executor, func_call)
 
 
+def _run_pinned(cpus: frozenset[int], func, /, *args, **kwargs):
+    """Run *func* with the thread pinned to the CPUs, so the memory that it allocates is
+    placed in their NUMA node (first-touch policy). The previous affinity is restored."""
+    previous = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    pinned = set_thread_affinity(cpus)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if pinned:
+            os.sched_setaffinity(0, previous)
+
+
 # For CPU-bound tasks
 async def dc_to_thread_cpu(func, /, *args, **kwargs):
     """Asynchronously run function *func* in a separate thread using the CPU-bound executor."""
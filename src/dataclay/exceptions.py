@@ -171,7 +171,7 @@ class ObjectStorageError(ObjectError):
 class BackendError(DataClayException):
     """Base exception for backend errors."""
 
-    def __init__(self, ee_id):
+    def __init__(self, ee_id=None):
         self.ee_id = ee_id
 
 
@@ -183,6 +183,19 @@ class NoOtherBackendsAvailable(BackendError):
         return f"There are no other backends available"
 
 
+class BackendOverloadedError(BackendError):
+    """The backend rejected the call because too many calls are waiting. It can be retried."""
+
+    # Trailing metadata of the gRPC error, which tells it from other RESOURCE_EXHAUSTED errors
+    grpc_metadata = ("dataclay-overloaded", "true")
+
+    def __init__(self, details):
+        self.details = details
+
+    def __str__(self):
+        return f"Backend overloaded: {self.details}"
+
+
 ############
 # Dataclay #
 ############
@@ -1,9 +1,9 @@
 """Entry point for standalone dataClay Metadata server."""
 
-import asyncio
 import logging
 
 from dataclay.config import MetadataSettings, settings
+from dataclay.event_loop import run_event_loop
 from dataclay.metadata import servicer
 
 logger = logging.getLogger(__name__)
@@ -36,4 +36,4 @@ if settings.metrics:
         settings.metrics_exporter,
     )
 
-asyncio.run(servicer.serve())
+run_event_loop(servicer.serve())
@@ -9,11 +9,13 @@ from dataclay.exceptions import (
     AliasAlreadyExistError,
     AliasDoesNotExistError,
     AlreadyExistError,
+    DoesNotExistError,
 )
 from dataclay.metadata.kvdata import (
     Account,
     Alias,
     Backend,
+    BackendStats,
     Dataclay,
     Dataset,
     ObjectMetadata,
@@ -133,7 +135,7 @@ class MetadataAPI:
         The owner of a dataset can call this and add access to an arbitrary account.
         """
         logger.debug("Adding account %s to dataset %s", account_name, dataset_name)
-        with await self.kv_manager.lock(Account.path + account_name):
+        async with self.kv_manager.lock(Account.path + account_name):
             operating_acc = await self.kv_manager.get_kv(Account, username)
             if not operating_acc.verify(password):
                 raise AccountInvalidCredentialsError(username)
@@ -189,12 +191,27 @@ class MetadataAPI:
     @tracer.start_as_current_span("delete_backend")
     async def delete_backend(self, id: UUID):
         logger.debug("Deleting Backend with id %s", id)
-        await self.kv_manager.delete_kv(Backend.path + str(id))
+        await self.kv_manager.delete_kv(Backend.path + str(id), BackendStats.path + str(id))
         logger.info("Deleted Backend with id=%s", id)
 
         # Publishes a message to the channel "del-backend-clients"
         await self.kv_manager.publish("del-backend-client", str(id))
 
+    @tracer.start_as_current_span("set_backend_stats")
+    async def set_backend_stats(self, backend_stats: BackendStats):
+        await self.kv_manager.set(backend_stats)
+
+    @tracer.start_as_current_span("request_backend_stats")
+    async def request_backend_stats(self):
+        # Publishes a message to the channel "request-backend-stats"
+        await self.kv_manager.publish("request-backend-stats", "")
+
+    @tracer.start_as_current_span("get_all_backend_stats")
+    async def get_all_backend_stats(self) -> dict[UUID, BackendStats]:
+        logger.debug("Getting all backend stats from kv store")
+        result = await self.kv_manager.getprefix(BackendStats, BackendStats.path)
+        return {UUID(k): v for k, v in result.items()}
+
     ###################
     # Dataclay Object #
     ###################
@@ -218,6 +235,32 @@ class MetadataAPI:
         logger.debug("Upserting object with id %s", object_md.id)
         await self.kv_manager.set(object_md)
 
+    @tracer.start_as_current_span("upsert_object_replicas")
+    async def upsert_object_replicas(
+        self,
+        object_md: ObjectMetadata,
+        add: Optional[UUID] = None,
+        discard: Optional[UUID] = None,
+    ):
+        """Upsert the object, adding or discarding a backend of its replicas.
+
+        The other replicas are taken from the stored metadata under a lock (instead of from
+        ``object_md``, which may be stale), so that concurrent changes are not lost. The
+        replicas of ``object_md`` are updated accordingly.
+        """
+        logger.debug("Upserting replicas of object with id %s", object_md.id)
+        async with self.kv_manager.lock(ObjectMetadata.path + str(object_md.id)):
+            try:
+                stored_md = await self.kv_manager.get_kv(ObjectMetadata, object_md.id)
+                object_md.replica_backend_ids = stored_md.replica_backend_ids
+            except DoesNotExistError:
+                pass
+            if add is not None:
+                object_md.replica_backend_ids.add(add)
+            if discard is not None:
+                object_md.replica_backend_ids.discard(discard)
+            await self.kv_manager.set(object_md)
+
     @tracer.start_as_current_span("change_object_id")
     async def change_object_id(self, old_id: UUID, new_id: UUID):
         logger.debug("Changing object id from %s to %s", old_id, new_id)
@@ -99,6 +99,23 @@ class Backend(KeyValue):
         return self.path + str(self.id)
 
 
+class BackendStats(KeyValue):
+    """Sizes (in bytes) and access rates (per second) of the objects of a backend, and the
+    objects referenced by their affinity properties."""
+
+    path: ClassVar = "/backend-stats/"
+    proto_class: ClassVar = None
+
+    id: UUID
+    timestamp: float = 0.0
+    objects: dict[UUID, tuple[int, float]] = Field(default_factory=dict)
+    affinity: dict[UUID, list[UUID]] = Field(default_factory=dict)
+
+    @property
+    def key(self):
+        return self.path + str(self.id)
+
+
 class ObjectMetadata(KeyValue):
     path: ClassVar = "/object/"
     proto_class: ClassVar = common_pb2.ObjectMetadata
@@ -131,5 +131,6 @@ class RedisManager:
             result[key.decode().removeprefix(prefix)] = value
         return result
 
-    async def lock(self, name: str):
-        return await self._client.lock("/lock" + name)
+    def lock(self, name: str):
+        """Distributed lock, to be used with ``async with``"""
+        return self._client.lock("/lock" + name)
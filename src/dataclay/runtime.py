@@ -5,16 +5,20 @@ import collections
 import copy
 import logging
 import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Optional, TypeVar
 from uuid import UUID
 from weakref import WeakValueDictionary
 
 from dataclay import utils
 from dataclay.config import exec_constraints_var, session_var, settings
 from dataclay.data_manager import DataManager
-from dataclay.dataclay_object import DataClayObject
+from dataclay.dataclay_object import DataClayObject, ProxyMetadata
+from dataclay.event_loop import get_dc_event_loop
 from dataclay.exceptions import (
+    BackendOverloadedError,
     DataClayException,
     ObjectIsNotVersionError,
     ObjectNotRegisteredError,
@@ -23,20 +27,45 @@ from dataclay.exceptions import (
 from dataclay.lock_manager import lock_manager
 from dataclay.metadata.api import MetadataAPI
 from dataclay.metadata.client import MetadataClient
+from dataclay.metadata.kvdata import BackendStats
 from dataclay.stub import StubDataClayObject
+from dataclay.utils import process_pool
 from dataclay.utils.backend_clients import BackendClientsManager
-from dataclay.utils.serialization import dcdumps, dcloads, recursive_dcdumps
+from dataclay.utils.placement import Placement
+from dataclay.utils.serialization import (
+    dcdumps,
+    dcloads,
+    dcloads_iter,
+    recursive_dcdumps,
+    recursive_dcdumps_iter,
+)
 from dataclay.utils.telemetry import trace
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Awaitable, Callable, Iterable
 
+    from dataclay.backend.client import BackendClient
     from dataclay.metadata.kvdata import ObjectMetadata
 
 
 tracer = trace.get_tracer(__name__)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class _DeletedProperty:
+    """Value of the properties deleted in the master, in the updates sent to its replicas."""
+
+    def __reduce__(self):
+        return "DELETED_PROPERTY"
+
+    def __repr__(self):
+        return "DELETED_PROPERTY"
+
+
+DELETED_PROPERTY = _DeletedProperty()
+
 
 class _DummyInmemoryHitsTotal:
     def inc(self):
@@ -44,6 +73,71 @@ class _DummyInmemoryHitsTotal:
         pass
 
 
+class _DummyPreloadProgress:
+    def set(self, value):
+        """Dummy function"""
+        pass
+
+
+class _DummyHedgeCounter:
+    def inc(self):
+        """Dummy function"""
+        pass
+
+
+class _LatencyTracker:
+    """Recent latencies of the readonly calls, used to choose the hedge delay."""
+
+    #: Number of latencies kept, and minimum number of them to estimate the delay
+    MAX_SAMPLES = 1000
+    MIN_SAMPLES = 20
+    #: The percentile is recomputed after this number of new latencies
+    UPDATE_INTERVAL = 50
+
+    def __init__(self, percentile: float = 0.95):
+        self.percentile = percentile
+        self.samples: collections.deque[float] = collections.deque(maxlen=self.MAX_SAMPLES)
+        self.num_new_samples = 0
+        self.value: Optional[float] = None
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+        self.num_new_samples += 1
+        if self.num_new_samples >= self.UPDATE_INTERVAL or (
+            self.value is None and len(self.samples) >= self.MIN_SAMPLES
+        ):
+            self.num_new_samples = 0
+            ordered = sorted(self.samples)
+            self.value = ordered[int(self.percentile * (len(ordered) - 1))]
+
+
+async def _first_result(*tasks: asyncio.Future) -> asyncio.Future:
+    """Wait for the first of the tasks to succeed. If all of them fail, the first one."""
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is None:
+                return task
+    return tasks[0]
+
+
+def _is_readonly(instance: DataClayObject, method_name: str) -> bool:
+    """Whether the method does not modify the object, so it can be executed in a replica."""
+    if method_name == "__getattribute__":
+        return True
+    method = getattr(type(instance), method_name, None)
+    return getattr(method, "_is_readonly", False)
+
+
+def _target_backend_ids(instance: DataClayObject, readonly: bool) -> set[UUID]:
+    """The backends where a (readonly or not) method of the object can be executed."""
+    master_backend_id = instance._dc_master_backend_id
+    if readonly or master_backend_id is None:
+        return instance._dc_all_backend_ids
+    return {master_backend_id}
+
+
 class DataClayRuntime(ABC):
     def __init__(self, backend_id: UUID = None):
         # self._dataclay_id = None
@@ -54,6 +148,15 @@ class DataClayRuntime(ABC):
 
         # Dictionary of all runtime memory objects stored as weakrefs.
         self.inmemory_objects: WeakValueDictionary[UUID, DataClayObject] = WeakValueDictionary()
+        # Compact proxies are created from any thread (while unpickling references)
+        self.proxy_objects_lock = threading.Lock()
+
+        # Activemethods (class name and method name) whose results are received in chunks
+        self.streamed_methods: set[tuple[str, str]] = set()
+
+        # Properties of master objects that have changed since the replicas were last updated
+        self.replica_updates: dict[UUID, tuple[DataClayObject, set[str]]] = {}
+        self.replica_updates_lock = threading.Lock()
 
         if settings.metrics:
             # pylint: disable=import-outside-toplevel
@@ -61,8 +164,20 @@ class DataClayRuntime(ABC):
 
             metrics.dataclay_inmemory_objects.set_function(lambda: len(self.inmemory_objects))
             self.dataclay_inmemory_hits_total = metrics.dataclay_inmemory_hits_total
+            self.hedgeable_requests_total = metrics.dataclay_hedgeable_requests_total
+            self.hedged_requests_total = metrics.dataclay_hedged_requests_total
+            self.hedged_requests_won_total = metrics.dataclay_hedged_requests_won_total
         else:
             self.dataclay_inmemory_hits_total = _DummyInmemoryHitsTotal()
+            self.hedgeable_requests_total = _DummyHedgeCounter()
+            self.hedged_requests_total = _DummyHedgeCounter()
+            self.hedged_requests_won_total = _DummyHedgeCounter()
+
+        # Latencies of the readonly calls, to hedge the slowest ones
+        self.read_latencies = _LatencyTracker()
+
+        # Chooses the backends of new objects
+        self.placement = Placement()
 
     def start(self, metadata_service: MetadataAPI):
         # NOTE: Moved from __init__ to initialize the MetadataService in the dc_event_loop
@@ -87,6 +202,8 @@ class DataClayRuntime(ABC):
         instance: DataClayObject,
         alias: Optional[str] = None,
         backend_id: Optional[str] = None,
+        placement: Optional[str] = None,
+        colocate_with: Optional[DataClayObject] = None,
     ):
         """
         Persist an object and optionally its associated objects.
@@ -95,15 +212,20 @@ class DataClayRuntime(ABC):
             instance: The object to persist.
             alias: Optional alias for the object.
             backend_id: Optional ID of the destination backend.
+            placement: Optional placement policy, if the backend is not given. By default, the
+                policy of the session (or the current backend, if called from a backend).
+            colocate_with: Optional persistent object, whose backend is the destination. By
+                default, a persistent object of the affinity group of the instance, if any.
 
         Returns:
             The ID of the backend where the object was persisted.
         """
         logger.debug(
-            "(%s) Starting make_persistent. Alias=%s, backend_id=%s",
+            "(%s) Starting make_persistent. Alias=%s, backend_id=%s, placement=%s",
             instance._dc_meta.id,
             alias,
             backend_id,
+            placement,
         )
 
         # Check necessary for BackendAPI.new_object_version. This allows to set the dataset
@@ -125,50 +247,63 @@ class DataClayRuntime(ABC):
             )
 
         try:
+            if backend_id is None and colocate_with is None:
+                colocate_with = next(
+                    (
+                        reference
+                        for reference in instance._dc_affinity_references()
+                        if reference._dc_is_registered
+                    ),
+                    None,
+                )
+            if backend_id is None and colocate_with is not None:
+                backend_id = await self.get_colocated_backend(colocate_with)
+
             # If called inside backend runtime, default is to register in the current backend
-            # unles another backend is explicitly specified
-            if self.is_backend and (backend_id is None or backend_id == self.backend.id):
+            # unless another backend or placement policy is explicitly specified
+            if backend_id is None:
+                if self.is_backend and placement is None:
+                    backend_id = self.backend_id
+                else:
+                    backend_id = await self.choose_backend(instance._dc_meta.id, placement)
+
+            if self.is_backend and backend_id == self.backend_id:
                 logger.debug("(%s) Registering the object in this backend", instance._dc_meta.id)
                 instance._dc_meta.master_backend_id = self.backend_id
                 await self.metadata_service.upsert_object(instance._dc_meta)
                 instance._dc_is_registered = True
                 self.inmemory_objects[instance._dc_meta.id] = instance
                 self.data_manager.add_hard_reference(instance)
+                self.placement.add_placed_objects(self.backend_id)
                 return self.backend_id
 
-            # Called from client runtime, default is to choose a random backend
-            elif backend_id is None:
-                logger.debug(
-                    "(%s) Choosing a random backend to register the object", instance._dc_meta.id
-                )
-                # If there is no backend client, update the list of backend clients
-                if not self.backend_clients:
-                    await self.backend_clients.update()
-                    if not self.backend_clients:
-                        raise RuntimeError(
-                            f"({instance._dc_meta.id}) No backends available to register the object"
-                        )
-                # Choose a random backend
-                backend_id, backend_client = random.choice(tuple(self.backend_clients.items()))
-            else:
-                backend_client = await self.backend_clients.get(backend_id)
+            backend_client = await self.backend_clients.get(backend_id)
 
-            # Serialize instance with a recursive Pickle
+            # Serialize instance with a recursive Pickle, and register the objects in the backend
             visited_objects: dict[UUID, DataClayObject] = {}
-            serialized_objects = await recursive_dcdumps(
-                instance, local_objects=visited_objects, make_persistent=True
-            )
-            # Register the object in the backend
-            await backend_client.make_persistent(serialized_objects)
+            if settings.stream_objects:
+                await backend_client.make_persistent_stream(
+                    recursive_dcdumps_iter(
+                        instance, local_objects=visited_objects, make_persistent=True
+                    )
+                )
+            else:
+                serialized_objects = await recursive_dcdumps(
+                    instance, local_objects=visited_objects, make_persistent=True
+                )
+                await backend_client.make_persistent(serialized_objects)
 
             # Update the object metadata
             for dc_object in visited_objects.values():
+                if self.is_backend:
+                    self.data_manager.forget_object(dc_object._dc_meta.id)
                 dc_object._clean_dc_properties()
                 dc_object._dc_is_registered = True
                 dc_object._dc_is_local = False
                 dc_object._dc_is_loaded = False
                 dc_object._dc_meta.master_backend_id = backend_id
                 self.inmemory_objects[dc_object._dc_meta.id] = dc_object
+            self.placement.add_placed_objects(backend_id, len(visited_objects))
 
             return instance._dc_meta.master_backend_id
         except Exception as e:
@@ -177,10 +312,53 @@ class DataClayRuntime(ABC):
                 await self.metadata_service.delete_alias(alias, instance._dc_meta.dataset_name)
             raise e
 
+    async def choose_backend(self, object_id: UUID, placement: Optional[str] = None) -> UUID:
+        """Choose the backend of a new object with a placement policy.
+
+        Args:
+            object_id: ID of the new object.
+            placement: Placement policy. By default, the policy of the session.
+        """
+        if placement is None:
+            placement = settings.client.placement if settings.client is not None else "random"
+        if self.is_backend and placement == "local":
+            return self.backend_id
+
+        # If there is no backend client, update the list of backend clients
+        if not self.backend_clients:
+            await self.backend_clients.update()
+            if not self.backend_clients:
+                raise RuntimeError(f"({object_id}) No backends available to register the object")
+
+        backend_hosts = {
+            backend_id: self.backend_clients[backend_id].host for backend_id in self.backend_clients
+        }
+        backend_id = self.placement.choose(placement, object_id, backend_hosts)
+        logger.debug("(%s) Backend %s chosen with placement '%s'", object_id, backend_id, placement)
+        return backend_id
+
+    async def get_colocated_backend(self, parent: DataClayObject) -> UUID:
+        """The backend of a persistent object, to place other objects with it."""
+        if not parent._dc_is_registered:
+            raise ObjectNotRegisteredError(parent._dc_meta.id)
+        if parent._dc_meta.master_backend_id is None:
+            await self.sync_object_metadata(parent)
+        return parent._dc_meta.master_backend_id
+
     ##################
     # Object methods #
     ##################
 
+    def get_inmemory_object(self, object_id: UUID) -> Optional[DataClayObject]:
+        """Get the dataclay object if it is in inmemory_objects, or None.
+
+        It can be called from any thread, since it does not use the event loop.
+        """
+        dc_object = self.inmemory_objects.get(object_id)
+        if dc_object is not None:
+            self.dataclay_inmemory_hits_total.inc()
+        return dc_object
+
     async def get_object_by_id(
         self, object_id: UUID, object_md: Optional[ObjectMetadata] = None
     ) -> DataClayObject:
@@ -212,6 +390,11 @@ class DataClayRuntime(ABC):
                         logger.debug("(%s) Getting object metadata from MDS", object_id)
                         object_md = await self.metadata_service.get_object_md_by_id(object_id)
 
+                    # A compact proxy may have been created meanwhile from a reference
+                    dc_object = self.inmemory_objects.get(object_id)
+                    if dc_object is not None:
+                        return dc_object
+
                     # Get the class of the object
                     try:
                         cls: DataClayObject = utils.get_class_by_name(object_md.class_name)
@@ -249,6 +432,28 @@ class DataClayRuntime(ABC):
                     )
                     return proxy_object
 
+    def get_object_by_reference(self, proxy_meta: ProxyMetadata) -> DataClayObject:
+        """Get dataclay object from inmemory_objects. If not present, create a compact proxy
+        from the metadata of the reference, without querying the metadata service.
+
+        Only for remote objects, since the replicas are unknown. It can be called from any thread.
+        """
+        dc_object = self.get_inmemory_object(proxy_meta.id)
+        if dc_object is not None:
+            return dc_object
+
+        try:
+            cls: DataClayObject = utils.get_class_by_name(proxy_meta.class_name)
+        except ModuleNotFoundError:
+            cls: DataClayObject = StubDataClayObject[proxy_meta.class_name]
+
+        proxy_object = cls.new_proxy_object(proxy_meta)
+        proxy_object._dc_is_local = False
+        proxy_object._dc_is_loaded = False
+        proxy_object._dc_is_registered = True
+        with self.proxy_objects_lock:
+            return self.inmemory_objects.setdefault(proxy_meta.id, proxy_object)
+
     async def get_object_by_alias(self, alias: str, dataset_name: str = None) -> DataClayObject:
         """Get object instance from alias"""
         logger.debug("Getting object by alias %s", alias)
@@ -262,6 +467,7 @@ class DataClayRuntime(ABC):
         if instance._dc_is_local:
             if not instance._dc_is_loaded:
                 await self.data_manager.load_object(instance)
+            await self.data_manager.load_properties(instance)
             return instance._dc_properties
         else:
             backend_client = await self.backend_clients.get(instance._dc_meta.master_backend_id)
@@ -295,6 +501,7 @@ class DataClayRuntime(ABC):
                 instance._dc_is_loaded = False
                 instance._dc_is_local = False
                 self.data_manager.remove_hard_reference(instance)
+                self.data_manager.forget_object(instance._dc_meta.id)
                 # NOTE: There is no need to delete, and it may be good
                 # in case that an object was serialized to disk before a
                 # consolidation. However, it will be deleted also since
@@ -312,11 +519,12 @@ class DataClayRuntime(ABC):
         old_object_id = instance._dc_meta.id
 
         if instance._dc_is_local:
-            async with lock_manager.get_lock(instance._dc_meta.id).writer_lock:
-                # loaded since pickle filed is named with the old object_id
-                if not instance._dc_is_loaded:
-                    await self.data_manager.load_object(instance)
+            # loaded since pickle filed is named with the old object_id
+            if not instance._dc_is_loaded:
+                await self.data_manager.load_object(instance)
+            await self.data_manager.load_properties(instance)
 
+            async with lock_manager.get_lock(instance._dc_meta.id).writer_lock:
                 # update the loaded_objects with the new object_id
                 self.data_manager.remove_hard_reference(instance)
                 instance._dc_meta.id = new_object_id
@@ -341,6 +549,8 @@ class DataClayRuntime(ABC):
             raise ObjectNotRegisteredError(instance._dc_meta.id)
         object_md = await self.metadata_service.get_object_md_by_id(instance._dc_meta.id)
         instance._dc_meta = object_md
+        # It is no longer a compact proxy
+        vars(instance).pop("_dc_proxy_meta", None)
 
     ##################
     # Active Methods #
@@ -350,14 +560,14 @@ class DataClayRuntime(ABC):
         self, instance: DataClayObject, method_name: str, args: tuple, kwargs: dict
     ):
         with tracer.start_as_current_span("call_remote_method") as span:
-            span.set_attribute("class", str(instance._dc_meta.class_name))
+            span.set_attribute("class", str(instance._dc_class_name))
             span.set_attribute("method", str(method_name))
             span.set_attribute("args", str(args))
             span.set_attribute("kwargs", str(kwargs))
 
             logger.debug(
                 "(%s) Calling remote method %s args=%s, kwargs=%s",
-                instance._dc_meta.id,
+                instance._dc_id,
                 method_name,
                 args,
                 kwargs,
@@ -368,105 +578,164 @@ class DataClayRuntime(ABC):
                 dcdumps(args), dcdumps(kwargs)
             )
 
+            # Reads can be executed in any replica, but writes only in the master
+            readonly = _is_readonly(instance, method_name)
+
             # Fault tolerance loop
             num_retries = 0
+            num_overloaded = 0
             while True:
                 num_retries += 1
-                logger.debug("(%s) Attempt %s", instance._dc_meta.id, num_retries)
+                logger.debug("(%s) Attempt %s", instance._dc_id, num_retries)
                 # Get the intersection between backend clients and object backends
-                avail_backends = instance._dc_all_backend_ids.intersection(
+                avail_backends = _target_backend_ids(instance, readonly).intersection(
                     self.backend_clients.keys()
                 )
 
                 # If the intersection is empty (no backends available), update the list of backend
                 # clients and the object backend locations, and try again...
                 if not avail_backends:
-                    logger.warning("(%s) No backends available. Syncing...", instance._dc_meta.id)
+                    logger.warning("(%s) No backends available. Syncing...", instance._dc_id)
                     await asyncio.gather(self.backend_clients.update(), instance.a_sync())
 
-                    avail_backends = instance._dc_all_backend_ids.intersection(
+                    avail_backends = _target_backend_ids(instance, readonly).intersection(
                         self.backend_clients.keys()
                     )
                     if not avail_backends:
                         raise RuntimeError(
-                            f"({instance._dc_meta.id}) No backends available to call activemethod"
+                            f"({instance._dc_id}) No backends available to call activemethod"
                         )
 
-                # Choose a random backend from the available ones
+                # Choose a random backend from the available ones (to balance the reads)
                 backend_id = random.choice(tuple(avail_backends))
                 backend_client = await self.backend_clients.get(backend_id)
-                logger.debug("(%s) Backend %s chosen", instance._dc_meta.id, backend_id)
+                logger.debug("(%s) Backend %s chosen", instance._dc_id, backend_id)
 
                 # If the connection fails, update the list of backend clients, and try again
+                response_chunks = None
+                self.placement.call_started(backend_id)
                 try:
                     if method_name == "__getattribute__":
-                        logger.debug(
-                            "(%s) Getting remote attribute '%s'", instance._dc_meta.id, args[0]
-                        )
+                        logger.debug("(%s) Getting remote attribute '%s'", instance._dc_id, args[0])
                         (
                             serialized_response,
                             is_exception,
-                        ) = await backend_client.get_object_attribute(
-                            instance._dc_meta.id,
-                            args[0],  # attribute name
+                        ) = await self.read_request(
+                            lambda client: client.get_object_attribute(
+                                instance._dc_id,
+                                args[0],  # attribute name
+                            ),
+                            backend_id,
+                            avail_backends,
                         )
                     elif method_name == "__setattr__":
-                        logger.debug(
-                            "(%s) Setting remote attribute '%s'", instance._dc_meta.id, args[0]
-                        )
+                        logger.debug("(%s) Setting remote attribute '%s'", instance._dc_id, args[0])
                         (
                             serialized_response,
                             is_exception,
                         ) = await backend_client.set_object_attribute(
-                            instance._dc_meta.id,
+                            instance._dc_id,
                             args[0],  # attribute name
                             await dcdumps(args[1]),  # attribute value
                         )
                     elif method_name == "__delattr__":
                         logger.debug(
-                            "(%s) Deleting remote attribute '%s'", instance._dc_meta.id, args[0]
+                            "(%s) Deleting remote attribute '%s'", instance._dc_id, args[0]
                         )
                         (
                             serialized_response,
                             is_exception,
                         ) = await backend_client.del_object_attribute(
-                            instance._dc_meta.id,
+                            instance._dc_id,
                             args[0],  # attribute name
                         )
                     else:
                         logger.debug(
                             "(%s) Executing remote method '%s' with constraints %s",
-                            instance._dc_meta.id,
+                            instance._dc_id,
                             method_name,
                             exec_constraints_var.get(),
                         )
-                        serialized_response, is_exception = await backend_client.call_active_method(
-                            object_id=instance._dc_meta.id,
-                            method_name=method_name,
-                            args=serialized_args,
-                            kwargs=serialized_kwargs,
-                            exec_constraints=exec_constraints_var.get(),
-                        )
+                        # Big arguments, or methods with big results, are streamed in chunks
+                        method_key = (instance._dc_class_name, method_name)
+                        if settings.stream_calls and (
+                            len(serialized_args) + len(serialized_kwargs)
+                            >= settings.stream_call_threshold
+                            or method_key in self.streamed_methods
+                        ):
+                            (
+                                response_chunks,
+                                is_exception,
+                            ) = await backend_client.call_active_method_stream(
+                                object_id=instance._dc_id,
+                                method_name=method_name,
+                                serialized_arguments=(serialized_args, serialized_kwargs),
+                                exec_constraints=exec_constraints_var.get(),
+                            )
+                        else:
+                            exec_constraints = exec_constraints_var.get()
+
+                            def call_active_method(client):
+                                return client.call_active_method(
+                                    object_id=instance._dc_id,
+                                    method_name=method_name,
+                                    args=serialized_args,
+                                    kwargs=serialized_kwargs,
+                                    exec_constraints=exec_constraints,
+                                )
+
+                            if readonly:
+                                (
+                                    serialized_response,
+                                    is_exception,
+                                ) = await self.read_request(
+                                    call_active_method, backend_id, avail_backends
+                                )
+                            else:
+                                (
+                                    serialized_response,
+                                    is_exception,
+                                ) = await call_active_method(backend_client)
+                            if (
+                                settings.stream_calls
+                                and serialized_response
+                                and len(serialized_response) >= settings.stream_call_threshold
+                            ):
+                                self.streamed_methods.add(method_key)
+                except BackendOverloadedError as e:
+                    # Retry later, since the backend rejected the call without executing it
+                    num_overloaded += 1
+                    if num_overloaded > settings.overload_max_retries:
+                        raise e
+                    delay = min(0.01 * 2**num_overloaded, 1.0)
+                    logger.warning("(%s) %s. Retrying in %.2fs...", instance._dc_id, e, delay)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                    continue
                 except DataClayException as e:
                     if "failed to connect" in str(e):
-                        logger.warning("(%s) Connection failed. Retrying...", instance._dc_meta.id)
+                        logger.warning("(%s) Connection failed. Retrying...", instance._dc_id)
                         await self.backend_clients.update()
                         continue
                     else:
                         raise e
+                finally:
+                    self.placement.call_finished(backend_id)
 
                 # Deserialize the response if not None
-                if serialized_response:
-                    logger.debug("(%s) Deserializing response", instance._dc_meta.id)
+                if response_chunks is not None:
+                    logger.debug("(%s) Deserializing streamed response", instance._dc_id)
+                    response = await dcloads_iter(response_chunks)
+                elif serialized_response:
+                    logger.debug("(%s) Deserializing response", instance._dc_id)
                     response = await dcloads(serialized_response)
                 else:
-                    logger.debug("(%s) Response is None", instance._dc_meta.id)
+                    logger.debug("(%s) Response is None", instance._dc_id)
                     response = None
 
                 # If response is ObjectWithWrongBackendIdError, update object metadata and retry
                 if isinstance(response, ObjectWithWrongBackendIdError):
                     logger.warning(
-                        "(%s) Object with wrong backend id. Retrying...", instance._dc_meta.id
+                        "(%s) Object with wrong backend id. Retrying...", instance._dc_id
                     )
                     instance._dc_meta.master_backend_id = response.backend_id
                     instance._dc_meta.replica_backend_ids = response.replica_backend_ids
@@ -476,18 +745,62 @@ class DataClayRuntime(ABC):
                 if is_exception:
                     logger.debug(
                         "(%s) Remote method '%s' raised an exception",
-                        instance._dc_meta.id,
+                        instance._dc_id,
                         method_name,
                     )
                     raise response
 
                 logger.debug(
                     "(%s) Remote method '%s' executed successfully",
-                    instance._dc_meta.id,
+                    instance._dc_id,
                     method_name,
                 )
                 return response
 
+    async def read_request(
+        self,
+        request: Callable[[BackendClient], Awaitable[T]],
+        backend_id: UUID,
+        avail_backends: set[UUID],
+    ) -> T:
+        """Send a readonly request to a backend, hedging it if enabled.
+
+        If the backend has not responded after the hedge delay, the request is duplicated to
+        another of the available backends. The first response is returned, and the other
+        request is cancelled.
+        """
+        backend_client = await self.backend_clients.get(backend_id)
+        if not settings.hedged_reads or len(avail_backends) < 2:
+            return await request(backend_client)
+
+        self.hedgeable_requests_total.inc()
+        delay = settings.hedge_delay
+        if delay is None:
+            delay = self.read_latencies.value
+
+        start = time.perf_counter()
+        first = asyncio.ensure_future(request(backend_client))
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait((first,), timeout=delay)
+                if not done:
+                    hedge_backend_id = random.choice(tuple(avail_backends - {backend_id}))
+                    logger.debug("Hedging request to backend %s", hedge_backend_id)
+                    self.hedged_requests_total.inc()
+                    hedge_client = await self.backend_clients.get(hedge_backend_id)
+                    hedge = asyncio.ensure_future(request(hedge_client))
+                    try:
+                        result = await _first_result(first, hedge)
+                    finally:
+                        hedge.cancel()
+                    if result is hedge:
+                        self.hedged_requests_won_total.inc()
+                    return result.result()
+            return await first
+        finally:
+            first.cancel()
+            self.read_latencies.add(time.perf_counter() - start)
+
     #########
     # Alias #
     #########
@@ -545,6 +858,10 @@ class DataClayRuntime(ABC):
             remotes,
         )
 
+        # Objects are moved with their affinity groups
+        if not make_replica:
+            instances = await self.get_affinity_group(instances)
+
         # NOTE: We cannot make a replica of a replica because we need a global lock
         # of the metadata to keep consistency of _dc_meta.replica_backend_ids. Therefore,
         # we only allow to make replicas of master objects, which will acquire a lock
@@ -552,49 +869,60 @@ class DataClayRuntime(ABC):
 
         visited_local_objects = {}
         pending_remote_objects = {}
-        serialized_local_objects = []
 
-        # Process each instance and serialize
-        for instance in instances:
-            if instance._dc_is_local and not instance._dc_is_replica:
-                # Check if the instance was already visited (as a reference of another instance)
-                if instance._dc_meta.id in visited_local_objects:
-                    continue
+        async def serialize_local_objects():
+            # Process each instance and serialize
+            for instance in instances:
+                if instance._dc_is_local and not instance._dc_is_replica:
+                    # Check if the instance was already visited (as a reference of another instance)
+                    if instance._dc_meta.id in visited_local_objects:
+                        continue
 
-                # Add the instance to the visited objects
-                visited_local_objects[instance._dc_meta.id] = instance
+                    # Add the instance to the visited objects
+                    visited_local_objects[instance._dc_meta.id] = instance
 
-                # Load the object if it is not loaded
-                if not instance._dc_is_loaded:
-                    await self.data_manager.load_object(instance)
+                    # Load the object if it is not loaded
+                    if not instance._dc_is_loaded:
+                        await self.data_manager.load_object(instance)
+                    await self.data_manager.load_properties(instance)
 
-                if recursive:
-                    if remotes:
+                    if recursive:
                         # If recursive and remotes, we need to obtain the remote references
-                        serialized_objects = await recursive_dcdumps(
-                            instance, visited_local_objects, pending_remote_objects
-                        )
+                        async for object_bytes in recursive_dcdumps_iter(
+                            instance,
+                            visited_local_objects,
+                            pending_remote_objects if remotes else None,
+                        ):
+                            yield object_bytes
                     else:
-                        serialized_objects = await recursive_dcdumps(
-                            instance, visited_local_objects
-                        )
-                    serialized_local_objects.extend(serialized_objects)
+                        # If not recursive, we only serialize the current instance
+                        yield await dcdumps(instance._dc_state)
                 else:
-                    # If not recursive, we only serialize the current instance
-                    object_bytes = await dcdumps(instance._dc_state)
-                    serialized_local_objects.append(object_bytes)
-            else:
-                # If the instance is not local, then it is remote
-                pending_remote_objects[instance._dc_meta.id] = instance
+                    # If the instance is not local, then it is remote
+                    pending_remote_objects[instance._dc_meta.id] = instance
 
         # Register the objects in the destination backend
         # NOTE: Could be that the backend_id is the same as the current backend
         # This could be useful to move all references together in the same backend
-        if len(serialized_local_objects) > 0 and backend_id != self.backend_id:
+        if backend_id == self.backend_id:
+            async for _ in serialize_local_objects():
+                pass
+        else:
             backend_client = await self.backend_clients.get(backend_id)
-            await backend_client.register_objects(
-                serialized_local_objects, make_replica=make_replica
-            )
+            if settings.stream_objects:
+                await backend_client.register_objects_stream(
+                    serialize_local_objects(), make_replica=make_replica
+                )
+            else:
+                serialized_local_objects = [
+                    object_bytes async for object_bytes in serialize_local_objects()
+                ]
+                if len(serialized_local_objects) > 0:
+                    await backend_client.register_objects(
+                        serialized_local_objects, make_replica=make_replica
+                    )
+
+        if backend_id != self.backend_id:
             # Update the metadata of the local objects
             for local_object in visited_local_objects.values():
                 if make_replica:
@@ -604,6 +932,7 @@ class DataClayRuntime(ABC):
                     # The object is no longer local, and is a proxy
                     # TODO: Remove pickle file to reduce space
                     self.data_manager.remove_hard_reference(local_object)
+                    self.data_manager.forget_object(local_object._dc_meta.id)
                     local_object._clean_dc_properties()
                     local_object._dc_is_local = False
                     local_object._dc_is_loaded = False
@@ -634,6 +963,32 @@ class DataClayRuntime(ABC):
                 pending_remote_objects.keys(), backend_id, make_replica, recursive, remotes
             )
 
+    async def get_affinity_group(self, instances: Iterable[DataClayObject]) -> list[DataClayObject]:
+        """The instances, and the persistent objects of their affinity groups.
+
+        The groups are found following the affinity properties of the local objects. Remote
+        objects are included, but their properties are followed by their own backend.
+        """
+        group = {instance._dc_meta.id: instance for instance in instances}
+        num_instances = len(group)
+        pending = list(group.values())
+        while pending:
+            instance = pending.pop()
+            if not instance._dc_affinity or not instance._dc_is_local:
+                continue
+            if not instance._dc_is_loaded:
+                await self.data_manager.load_object(instance)
+            if instance._dc_unloaded_properties:
+                await self.data_manager.load_properties(instance)
+            for reference in instance._dc_affinity_references():
+                if reference._dc_is_registered and reference._dc_meta.id not in group:
+                    group[reference._dc_meta.id] = reference
+                    pending.append(reference)
+
+        if len(group) > num_instances:
+            logger.debug("Adding %d objects of affinity groups", len(group) - num_instances)
+        return list(group.values())
+
     async def replace_object_properties(
         self, instance: DataClayObject, new_instance: DataClayObject
     ):
@@ -642,14 +997,32 @@ class DataClayRuntime(ABC):
         await self.update_object_properties(instance, new_object_properties)
 
     async def update_object_properties(
-        self, instance: DataClayObject, new_properties: dict[str, Any]
+        self,
+        instance: DataClayObject,
+        new_properties: dict[str, Any],
+        deleted_properties: Iterable[str] = (),
     ):
+        """Update (and delete) properties of an object, and propagate them to its replicas.
+
+        Properties whose new value is ``DELETED_PROPERTY`` are deleted too.
+        """
         logger.debug("(%s) Updating object properties", instance._dc_meta.id)
+        new_properties = dict(new_properties)
+        new_properties.update(dict.fromkeys(deleted_properties, DELETED_PROPERTY))
 
         if instance._dc_is_local:
             if not instance._dc_is_loaded:
                 await self.data_manager.load_object(instance)
-            vars(instance).update(new_properties)
+            if instance._dc_unloaded_properties:
+                instance._dc_unloaded_properties.difference_update(new_properties)
+            object_dict = vars(instance)
+            for name, value in new_properties.items():
+                if value is DELETED_PROPERTY:
+                    object_dict.pop(name, None)
+                else:
+                    object_dict[name] = value
+            if not instance._dc_is_replica and instance._dc_meta.replica_backend_ids:
+                self.mark_replica_update(instance, new_properties)
         else:
             backend_client = await self.backend_clients.get(instance._dc_meta.master_backend_id)
             await backend_client.update_object_properties(
@@ -751,6 +1124,90 @@ class DataClayRuntime(ABC):
 
         await self.send_objects([instance], backend_id, True, recursive, remotes)
 
+    def mark_replica_update(self, instance: DataClayObject, dc_property_names: Iterable[str]):
+        """Record properties of a master object that must be propagated to its replicas.
+
+        It can be called from any thread.
+        """
+        with self.replica_updates_lock:
+            _, names = self.replica_updates.setdefault(instance._dc_meta.id, (instance, set()))
+            names.update(dc_property_names)
+
+    async def flush_replica_updates(self):
+        """Send the changed properties of master objects to their replicas."""
+        with self.replica_updates_lock:
+            if not self.replica_updates:
+                return
+            updates, self.replica_updates = self.replica_updates, {}
+
+        await asyncio.gather(
+            *[
+                self.propagate_replica_update(instance, dc_property_names)
+                for instance, dc_property_names in updates.values()
+            ]
+        )
+
+    async def propagate_replica_update(
+        self, instance: DataClayObject, dc_property_names: Iterable[str]
+    ):
+        """Send the current value of some properties of a master object to its replicas.
+
+        Only the given properties are sent. The ones that no longer exist are deleted in the
+        replicas.
+        """
+        if not instance._dc_is_local or instance._dc_is_replica:
+            return
+        replica_backend_ids = set(instance._dc_meta.replica_backend_ids)
+        if not replica_backend_ids:
+            return
+
+        if not instance._dc_is_loaded:
+            await self.data_manager.load_object(instance)
+        if instance._dc_unloaded_properties:
+            await self.data_manager.load_properties(instance, dc_property_names)
+        object_dict = vars(instance)
+        new_properties = {
+            name: object_dict.get(name, DELETED_PROPERTY) for name in dc_property_names
+        }
+        if not new_properties:
+            return
+
+        logger.debug(
+            "(%s) Propagating %d properties to %d replicas",
+            instance._dc_meta.id,
+            len(new_properties),
+            len(replica_backend_ids),
+        )
+        serialized_properties = await dcdumps(new_properties)
+
+        async def update_replica(backend_id: UUID):
+            try:
+                backend_client = await self.backend_clients.get(backend_id)
+            except KeyError:
+                # The backend has been drained, and its replica recreated elsewhere
+                logger.debug(
+                    "(%s) Backend %s is gone. Forgetting its replica",
+                    instance._dc_meta.id,
+                    backend_id,
+                )
+                await self.metadata_service.upsert_object_replicas(
+                    instance._dc_meta, discard=backend_id
+                )
+                return
+            try:
+                await backend_client.update_object_properties(
+                    instance._dc_meta.id, serialized_properties
+                )
+            except Exception as e:
+                logger.warning(
+                    "(%s) Could not update replica in backend %s: %s",
+                    instance._dc_meta.id,
+                    backend_id,
+                    e,
+                )
+
+        await asyncio.gather(*[update_replica(backend_id) for backend_id in replica_backend_ids])
+
     ############
     # Shutdown #
     ############
@@ -804,8 +1261,121 @@ class BackendRuntime(DataClayRuntime):
         # NOTE: Backend is already running in dc_event_loop, no need to divide
         self.metadata_service = MetadataAPI(self.metadata_host, self.metadata_port)
         super().start(self.metadata_service)
+        self.preload_task = None
+        self.replica_sync_task = None
+        if settings.replica_sync == "async":
+            self.replica_sync_task = get_dc_event_loop().create_task(self.replica_sync_loop())
+        self.stats_task = None
+        if settings.stats_interval:
+            self.stats_task = get_dc_event_loop().create_task(self.stats_loop())
+        self.stats_request_tasks: set[asyncio.Task] = set()
+        self.backend_clients.stats_request_callbacks.append(self._on_stats_request)
+
+        if settings.metrics:
+            # pylint: disable=import-outside-toplevel
+            from dataclay.utils import metrics
+
+            self.preload_progress = metrics.dataclay_preload_progress
+        else:
+            self.preload_progress = _DummyPreloadProgress()
+
+    def start_preload(self):
+        """Start preloading the hot set in the background."""
+        self.preload_task = get_dc_event_loop().create_task(self.preload_hot_set())
+
+    async def preload_hot_set(self):
+        """Load the objects that were loaded when the backend was last stopped.
+
+        The most accessed objects are loaded first. Objects that have been moved or deleted
+        in the meantime are skipped, and preloading stops if memory goes over the threshold.
+        """
+        object_ids = await self.data_manager.read_hot_set()
+        if not object_ids:
+            self.preload_progress.set(1)
+            return
+
+        logger.info("Preloading hot set of %d objects", len(object_ids))
+        semaphore = asyncio.Semaphore(settings.preload_concurrency)
+        num_preloaded = 0
+
+        async def preload(object_id: UUID):
+            nonlocal num_preloaded
+            async with semaphore:
+                try:
+                    if not self.data_manager.is_memory_over_threshold():
+                        instance = await self.get_object_by_id(object_id)
+                        if instance._dc_is_local and not instance._dc_is_loaded:
+                            await self.data_manager.load_object(instance, prefetch_depth=0)
+                except Exception as e:
+                    logger.debug("(%s) Could not preload object: %s", object_id, e)
+                num_preloaded += 1
+                self.preload_progress.set(num_preloaded / len(object_ids))
+
+        await asyncio.gather(*[preload(object_id) for object_id in object_ids])
+        logger.info("Preloaded hot set (%d loaded objects)", len(self.data_manager.loaded_objects))
+        self.data_manager.freeze_gc(len(object_ids))
+
+    async def sync_replicas(self):
+        """Propagate the pending updates now if replicas are updated synchronously."""
+        if settings.replica_sync == "sync":
+            await self.flush_replica_updates()
+
+    async def replica_sync_loop(self):
+        """Periodically send the pending property updates to the replicas."""
+        try:
+            while True:
+                await asyncio.sleep(settings.replica_max_lag)
+                try:
+                    await self.flush_replica_updates()
+                except Exception as e:
+                    logger.warning("Error updating replicas: %s", e)
+        except asyncio.CancelledError:
+            logger.debug("Replica sync has been cancelled.")
+
+    async def publish_stats(self):
+        """Publish the sizes, access rates and affinity of the objects of this backend."""
+        backend_stats = BackendStats(
+            id=self.backend_id,
+            timestamp=time.time(),
+            objects=self.data_manager.get_object_stats(),
+            affinity=self.data_manager.get_affinity(),
+        )
+        await self.metadata_service.set_backend_stats(backend_stats)
+
+    def _on_stats_request(self):
+        task = get_dc_event_loop().create_task(self._publish_requested_stats())
+        self.stats_request_tasks.add(task)
+        task.add_done_callback(self.stats_request_tasks.discard)
+
+    async def _publish_requested_stats(self):
+        try:
+            await self.publish_stats()
+        except Exception as e:
+            logger.warning("Error publishing backend stats: %s", e)
+
+    async def stats_loop(self):
+        """Periodically publish the sizes and access rates of the objects, to rebalance them."""
+        try:
+            while True:
+                await asyncio.sleep(settings.stats_interval)
+                try:
+                    await self.publish_stats()
+                except Exception as e:
+                    logger.warning("Error publishing backend stats: %s", e)
+        except asyncio.CancelledError:
+            logger.debug("Stats loop has been cancelled.")
 
     async def stop(self):
+        if self.preload_task:
+            self.preload_task.cancel()
+        if self.stats_task:
+            self.stats_task.cancel()
+
+        # Send the pending updates before the replicas lose their master
+        if self.replica_sync_task:
+            self.replica_sync_task.cancel()
+        await self.flush_replica_updates()
+
         # Stop all backend clients
         await self.backend_clients.stop()
 
@@ -815,8 +1385,13 @@ class BackendRuntime(DataClayRuntime):
         # Stop DataManager memory monitor
         self.data_manager.stop_memory_monitor()
 
+        # Stop the workers of process activemethods, if any
+        process_pool.shutdown_process_executor()
+
         # Flush all data if not ephemeral
         if not settings.ephemeral:
+            if settings.preload_hot_set:
+                await self.data_manager.save_hot_set()
             await self.data_manager.flush_all()
 
         # Stop metadata redis connection
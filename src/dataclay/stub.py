@@ -6,12 +6,13 @@ from typing import NamedTuple
 # Note that session_var is only needed in _get_by_alias, and maybe should be moved to DataClayRuntime (maybe, TODO, check)
 from .config import get_runtime, session_var
 from .dataclay_object import DataClayObject
-from .event_loop import get_dc_event_loop
+from .event_loop import get_dc_call_loop, get_dc_event_loop
 
 local_fields = frozenset(
     [
         "_dc_stub_classname",
         "_dc_meta",
+        "_dc_proxy_meta",
         "_dc_is_local",
         "_dc_is_loaded",
         "_dc_is_registered",
@@ -34,7 +35,8 @@ def stubmethodwrapper(basename, method_name):
         logger.debug("Calling activemethod '%s' from stub %r", method_name, self)
 
         return asyncio.run_coroutine_threadsafe(
-            get_runtime().call_remote_method(self, method_name, args, kwargs), get_dc_event_loop()
+            get_runtime().call_remote_method(self, method_name, args, kwargs),
+            get_dc_call_loop(self._dc_master_backend_id),
         ).result()
 
     remote_calling.__name__ = method_name
@@ -107,7 +109,7 @@ class StubDataClayObject(DataClayObject, metaclass=_StubMetaClass):
         self.make_persistent()
         return asyncio.run_coroutine_threadsafe(
             get_runtime().call_remote_method(self, "__init__", args, kwargs),
-            get_dc_event_loop(),
+            get_dc_call_loop(self._dc_master_backend_id),
         ).result()
 
     @classmethod
@@ -156,7 +158,7 @@ class StubDataClayObject(DataClayObject, metaclass=_StubMetaClass):
 
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__getattribute__", (name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
         else:
             raise AttributeError(
@@ -171,7 +173,7 @@ class StubDataClayObject(DataClayObject, metaclass=_StubMetaClass):
 
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__setattr__", (name, value), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
         else:
             raise AttributeError(
@@ -185,7 +187,7 @@ class StubDataClayObject(DataClayObject, metaclass=_StubMetaClass):
             logger.debug("remote del")
             return asyncio.run_coroutine_threadsafe(
                 get_runtime().call_remote_method(self, "__delattr__", (name,), {}),
-                get_dc_event_loop(),
+                get_dc_call_loop(self._dc_master_backend_id),
             ).result()
         else:
             raise AttributeError(
@@ -8,12 +8,14 @@ from uuid import UUID
 
 from dataclay.backend.client import BackendClient
 from dataclay.config import settings
-from dataclay.event_loop import get_dc_event_loop
+from dataclay.event_loop import get_dc_event_loop, run_in_dc_event_loop
 from dataclay.metadata.api import MetadataAPI
 from dataclay.metadata.kvdata import Backend
 from dataclay.utils.telemetry import trace
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from dataclay.metadata.client import MetadataClient
 
 tracer = trace.get_tracer(__name__)
@@ -25,17 +27,41 @@ class BackendClientsManager(collections.abc.MutableMapping):
 
     def __init__(self, metadata_api: MetadataAPI | MetadataClient):
         self._backend_clients: dict[UUID, BackendClient] = {}
+        # Clients used from other event loops (see settings.client_call_loops), since gRPC
+        # channels are bound to the event loop where they are used
+        self._loop_clients: dict[tuple[asyncio.AbstractEventLoop, UUID], BackendClient] = {}
         self.metadata_api = metadata_api
         self.update_task = None
         self.pubsub = None
         self.worker_task = None
+        # Called with the ID of each backend registered while subscribed
+        self.new_backend_callbacks: list[Callable[[UUID], None]] = []
+        # Called when a rebalance requests the stats of the backends
+        self.stats_request_callbacks: list[Callable[[], None]] = []
 
     async def get(self, key) -> BackendClient:
         try:
-            return self._backend_clients[key]
+            backend_client = self._backend_clients[key]
         except KeyError:
             await self.update()
-            return self._backend_clients[key]
+            backend_client = self._backend_clients[key]
+
+        loop = asyncio.get_running_loop()
+        if loop is get_dc_event_loop():
+            return backend_client
+        return self._get_loop_client(loop, backend_client)
+
+    def _get_loop_client(
+        self, loop: asyncio.AbstractEventLoop, backend_client: BackendClient
+    ) -> BackendClient:
+        loop_client = self._loop_clients.get((loop, backend_client.id))
+        if loop_client is None or loop_client.address != backend_client.address:
+            logger.debug("New client of backend %s for event loop %s", backend_client.id, loop)
+            loop_client = BackendClient(
+                backend_client.host, backend_client.port, backend_id=backend_client.id
+            )
+            self._loop_clients[(loop, backend_client.id)] = loop_client
+        return loop_client
 
     def start_update_loop(self):
         """Start the background thread that updates the dictionary."""
@@ -65,6 +91,10 @@ class BackendClientsManager(collections.abc.MutableMapping):
         If force is True, the backend clients will be updated directly from the kv.
         If force is False, the backend clients will be updated with the metadata backends cache.
         """
+        # The metadata client, and these backend clients, are bound to the dataClay event loop
+        await run_in_dc_event_loop(self._update(force))
+
+    async def _update(self, force: bool):
         logger.debug("Updating backend clients")
         backend_infos = await self.metadata_api.get_all_backends(force=force)
 
@@ -118,7 +148,8 @@ class BackendClientsManager(collections.abc.MutableMapping):
             del self._backend_clients[backend_info.id]
 
     def start_subscribe(self):
-        """Subscribe to the new-backend-client and del-backend-client pub/sub topics"""
+        """Subscribe to the new-backend-client, del-backend-client and request-backend-stats
+        pub/sub topics"""
         if not isinstance(self.metadata_api, MetadataAPI):
             logger.warning("Pub/sub not available. Access to kv data is not allowed for clients.")
             return
@@ -136,6 +167,7 @@ class BackendClientsManager(collections.abc.MutableMapping):
         await self.pubsub.subscribe(
             "new-backend-client",
             "del-backend-client",
+            "request-backend-stats",
         )
         async for message in self.pubsub.listen():
             if message["type"] == "message":
@@ -143,11 +175,17 @@ class BackendClientsManager(collections.abc.MutableMapping):
                     backend_info = Backend.from_json(message["data"])
                     logger.debug("Received new-backend-client publication: %s", backend_info.id)
                     await self.add_backend_client(backend_info)
+                    for callback in self.new_backend_callbacks:
+                        callback(backend_info.id)
                 elif message["channel"].decode() == "del-backend-client":
                     backend_id = UUID(message["data"].decode())
                     logger.debug("Received del-backend-client publication: %s", backend_id)
                     if backend_id in self._backend_clients:
                         del self._backend_clients[backend_id]
+                elif message["channel"].decode() == "request-backend-stats":
+                    logger.debug("Received request-backend-stats publication")
+                    for callback in self.stats_request_callbacks:
+                        callback()
 
     def __getitem__(self, key) -> BackendClient:
         return self._backend_clients[key]
@@ -171,3 +209,6 @@ class BackendClientsManager(collections.abc.MutableMapping):
         for backend_id, backend_client in self._backend_clients.items():
             logger.debug("Closing client connection to %s", backend_id)
             backend_client.close()
+        for backend_client in self._loop_clients.values():
+            backend_client.close()
+        self._loop_clients.clear()
@@ -0,0 +1,110 @@
+"""Compression of the object files stored by the backends.
+
+Compressed blobs start with a small header that records the codec, so files written with
+different settings (or before compression was enabled, i.e. raw pickles) can be loaded.
+The codecs are optional dependencies (``pip install dataclay[compression]``).
+"""
+
+import logging
+import time
+
+from dataclay.config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DCZ"
+HEADER_SIZE = len(MAGIC) + 1
+CODECS = {"zstd": b"z", "lz4": b"l"}
+
+
+class _DummyCounter:
+    def inc(self, amount=1):
+        """Dummy function"""
+        pass
+
+
+if settings.metrics:
+    # pylint: disable=import-outside-toplevel
+    from dataclay.utils import metrics
+
+    compression_saved_bytes = metrics.dataclay_storage_compression_saved_bytes_total
+    compression_seconds = metrics.dataclay_storage_compression_seconds_total
+    decompression_seconds = metrics.dataclay_storage_decompression_seconds_total
+else:
+    compression_saved_bytes = _DummyCounter()
+    compression_seconds = _DummyCounter()
+    decompression_seconds = _DummyCounter()
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    level = settings.storage_compression_level
+    if codec == "zstd":
+        if level is None:
+            return zstandard.ZstdCompressor().compress(data)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    elif codec == "lz4":
+        if level is None:
+            return lz4.frame.compress(data)
+        return lz4.frame.compress(data, compression_level=level)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def compress(data: bytes) -> bytes:
+    """Compress the data with the configured codec.
+
+    The data is returned as it is if compression is disabled, the data is smaller than
+    ``settings.storage_compression_min_size``, or compressing does not reduce its size.
+    """
+    codec = settings.storage_compression
+    if codec == "none" or len(data) < settings.storage_compression_min_size:
+        return data
+    if (codec == "zstd" and zstandard is None) or (codec == "lz4" and lz4 is None):
+        logger.warning("Compression codec %s is not installed. Storing uncompressed", codec)
+        return data
+
+    # Thread CPU time, so that the work of other threads meanwhile is not counted
+    start = time.thread_time()
+    blob = MAGIC + CODECS[codec] + _compress(codec, data)
+    compression_seconds.inc(time.thread_time() - start)
+
+    if len(blob) >= len(data):
+        return data
+    compression_saved_bytes.inc(len(data) - len(blob))
+    return blob
+
+
+def is_compressed(header: bytes) -> bool:
+    """Whether the blob starting with ``header`` was written by :func:`compress`."""
+    return header[: len(MAGIC)] == MAGIC
+
+
+def decompress(blob: bytes) -> bytes:
+    """Decompress a blob written by :func:`compress`. Uncompressed data is returned as it is."""
+    if not is_compressed(blob):
+        return blob
+
+    start = time.thread_time()
+    codec = blob[len(MAGIC) : HEADER_SIZE]
+    payload = memoryview(blob)[HEADER_SIZE:]
+    if codec == CODECS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("Blob is compressed with zstd, but zstandard is not installed")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == CODECS["lz4"]:
+        if lz4 is None:
+            raise RuntimeError("Blob is compressed with lz4, but lz4 is not installed")
+        data = lz4.frame.decompress(payload)
+    else:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    decompression_seconds.inc(time.thread_time() - start)
+    return data
@@ -2,7 +2,12 @@ import functools
 
 import grpc
 
-from dataclay.exceptions import AlreadyExistError, DataClayException, DoesNotExistError
+from dataclay.exceptions import (
+    AlreadyExistError,
+    BackendOverloadedError,
+    DataClayException,
+    DoesNotExistError,
+)
 
 
 def grpc_error_handler(func):
@@ -16,31 +21,50 @@ def grpc_error_handler(func):
     return wrapper_grpc_error_handler
 
 
+def _dataclay_error(rpc_error: grpc.aio.AioRpcError) -> DataClayException:
+    """Map the error of a gRPC call to the dataClay exception raised instead."""
+    if rpc_error.code() == grpc.StatusCode.RESOURCE_EXHAUSTED and (
+        BackendOverloadedError.grpc_metadata in tuple(rpc_error.trailing_metadata() or ())
+    ):
+        return BackendOverloadedError(rpc_error.details())
+    elif "does not exist" in rpc_error.details():
+        if "Alias" in rpc_error.details():
+            return DoesNotExistError(
+                rpc_error.details().replace("Alias ", "").replace(" does not exist", "")
+            )
+        else:
+            return DoesNotExistError(rpc_error.details().replace(" does not exist", ""))
+    elif "already exists" in rpc_error.details():
+        if "Alias" in rpc_error.details():
+            return AlreadyExistError(
+                rpc_error.details().replace("Alias ", "").replace(" already exists", "")
+            )
+        else:
+            return AlreadyExistError(rpc_error.details().replace(" already exists", ""))
+    else:
+        return DataClayException(rpc_error.details())
+
+
 def grpc_aio_error_handler(func):
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
         except grpc.aio.AioRpcError as rpc_error:
-            if "does not exist" in rpc_error.details():
-                if "Alias" in rpc_error.details():
-                    raise DoesNotExistError(
-                        rpc_error.details().replace("Alias ", "").replace(" does not exist", "")
-                    ) from None
-                else:
-                    raise DoesNotExistError(
-                        rpc_error.details().replace(" does not exist", "")
-                    ) from None
-            elif "already exists" in rpc_error.details():
-                if "Alias" in rpc_error.details():
-                    raise AlreadyExistError(
-                        rpc_error.details().replace("Alias ", "").replace(" already exists", "")
-                    ) from None
-                else:
-                    raise AlreadyExistError(
-                        rpc_error.details().replace(" already exists", "")
-                    ) from None
-            else:
-                raise DataClayException(rpc_error.details()) from None
+            raise _dataclay_error(rpc_error) from None
+
+    return wrapper
+
+
+def grpc_aio_iter_error_handler(func):
+    """Same as grpc_aio_error_handler, but for async generators (e.g. reading a stream)."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            async for item in func(*args, **kwargs):
+                yield item
+        except grpc.aio.AioRpcError as rpc_error:
+            raise _dataclay_error(rpc_error) from None
 
     return wrapper
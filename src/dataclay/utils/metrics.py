@@ -16,6 +16,7 @@ from prometheus_client import (
     CollectorRegistry,
     Counter,
     Gauge,
+    Histogram,
     push_to_gateway,
     start_http_server,
 )
@@ -57,6 +58,26 @@ dataclay_loaded_objects = Gauge(
 dataclay_stored_objects = Gauge(
     "dataclay_stored_objects", "Number of stored objects", registry=registry
 )
+dataclay_preload_progress = Gauge(
+    "dataclay_preload_progress",
+    "Fraction of the hot set preloaded on backend startup",
+    registry=registry,
+)
+dataclay_admission_queued_calls = Gauge(
+    "dataclay_admission_queued_calls",
+    "Number of activemethod calls waiting to be admitted",
+    registry=registry,
+)
+dataclay_admission_running_calls = Gauge(
+    "dataclay_admission_running_calls",
+    "Number of admitted activemethod calls running",
+    registry=registry,
+)
+dataclay_gc_frozen_objects = Gauge(
+    "dataclay_gc_frozen_objects",
+    "Number of objects frozen by the garbage collector",
+    registry=registry,
+)
 
 
 # Counters
@@ -67,3 +88,55 @@ dataclay_inmemory_misses_total = Counter(
 dataclay_inmemory_hits_total = Counter(
     "dataclay_inmemory_hits_total", "Number of inmemory hits", registry=registry
 )
+
+dataclay_admission_rejected_calls_total = Counter(
+    "dataclay_admission_rejected_calls_total",
+    "Number of activemethod calls rejected because the queue was full",
+    registry=registry,
+)
+
+dataclay_hedgeable_requests_total = Counter(
+    "dataclay_hedgeable_requests_total",
+    "Number of readonly calls that could be hedged to a replica",
+    registry=registry,
+)
+
+dataclay_hedged_requests_total = Counter(
+    "dataclay_hedged_requests_total",
+    "Number of readonly calls duplicated to another replica",
+    registry=registry,
+)
+
+dataclay_hedged_requests_won_total = Counter(
+    "dataclay_hedged_requests_won_total",
+    "Number of hedged calls where the duplicate responded first",
+    registry=registry,
+)
+
+dataclay_storage_compression_saved_bytes_total = Counter(
+    "dataclay_storage_compression_saved_bytes_total",
+    "Number of bytes saved by compressing stored objects",
+    registry=registry,
+)
+
+dataclay_storage_compression_seconds_total = Counter(
+    "dataclay_storage_compression_seconds_total",
+    "CPU time spent compressing stored objects",
+    registry=registry,
+)
+
+dataclay_storage_decompression_seconds_total = Counter(
+    "dataclay_storage_decompression_seconds_total",
+    "CPU time spent decompressing stored objects",
+    registry=registry,
+)
+
+
+# Histograms
+dataclay_gc_pause_seconds = Histogram(
+    "dataclay_gc_pause_seconds",
+    "Duration of the garbage collections",
+    ["generation"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    registry=registry,
+)
@@ -0,0 +1,163 @@
+"""Placement of the new persistent objects in the backends.
+
+When no backend is given to ``make_persistent``, the backend is chosen by a placement policy,
+set per session (:attr:`~dataclay.config.ClientSettings.placement`) or per call:
+
+- ``random``: a random backend. This is the default.
+- ``local``: a backend in the same host as the client (or the backend itself, when called from
+  an activemethod). If there is none, a random backend.
+- ``round-robin``: the backends in turns, i.e. the one with fewest objects placed by this
+  runtime (and then with fewest calls in progress from it). It only counts the objects and
+  calls of this runtime, not the actual load of the backends, so several clients may choose
+  the same backend.
+- ``hash``: the backend chosen by consistent hashing of the object ID, so that only a fraction
+  of the objects are placed differently when backends are added or removed.
+
+Objects can also be placed with a persistent parent object (``colocate_with``), which has
+precedence over the policy.
+"""
+
+from __future__ import annotations
+
+import bisect
+import collections
+import functools
+import hashlib
+import logging
+import random
+import socket
+import threading
+from typing import TYPE_CHECKING, Optional
+from uuid import UUID
+
+import psutil
+
+from dataclay.config import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_POLICIES = ("random", "local", "round-robin", "hash")
+
+
+@functools.lru_cache(maxsize=1)
+def local_addresses() -> frozenset[str]:
+    """Hostnames and IP addresses of this host."""
+    hostname = socket.gethostname()
+    addresses = {"localhost", "::1", hostname, socket.getfqdn()}
+    try:
+        addresses.update(socket.gethostbyname_ex(hostname)[2])
+    except OSError:
+        pass
+    for interface_addresses in psutil.net_if_addrs().values():
+        # Without the scope of IPv6 link-local addresses (e.g. "fe80::1%eth0")
+        addresses.update(address.address.split("%")[0] for address in interface_addresses)
+    return frozenset(addresses)
+
+
+def is_local_host(host: str) -> bool:
+    return host in local_addresses() or host.startswith("127.")
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of the object IDs to the backends."""
+
+    #: Points of each backend in the ring, to spread the objects evenly
+    VIRTUAL_NODES = 64
+
+    def __init__(self, backend_ids: Iterable[UUID]):
+        self.backend_ids = frozenset(backend_ids)
+        points = sorted(
+            (_hash(backend_id.bytes + i.to_bytes(2, "big")), backend_id)
+            for backend_id in self.backend_ids
+            for i in range(self.VIRTUAL_NODES)
+        )
+        self._hashes = [point for point, _ in points]
+        self._points = [backend_id for _, backend_id in points]
+
+    def get(self, object_id: UUID) -> UUID:
+        index = bisect.bisect(self._hashes, _hash(object_id.bytes)) % len(self._hashes)
+        return self._points[index]
+
+
+class Placement:
+    """Chooses the backends of the new persistent objects.
+
+    It also counts the objects placed in each backend, and the calls in progress to them, for
+    the ``round-robin`` policy.
+    """
+
+    def __init__(self):
+        # Calls are sent from the client threads and the call event loops
+        self.lock = threading.Lock()
+        self.pending_calls: collections.Counter[UUID] = collections.Counter()
+        self.placed_objects: collections.Counter[UUID] = collections.Counter()
+        self.hash_ring: Optional[HashRing] = None
+
+    def call_started(self, backend_id: UUID):
+        with self.lock:
+            self.pending_calls[backend_id] += 1
+
+    def call_finished(self, backend_id: UUID):
+        with self.lock:
+            self.pending_calls[backend_id] -= 1
+            if not self.pending_calls[backend_id]:
+                del self.pending_calls[backend_id]
+
+    def add_placed_objects(self, backend_id: UUID, num_objects: int = 1):
+        with self.lock:
+            self.placed_objects[backend_id] += num_objects
+
+    def round_robin(self, backend_ids: Iterable[UUID]) -> UUID:
+        with self.lock:
+            return min(
+                backend_ids,
+                key=lambda backend_id: (
+                    self.placed_objects[backend_id],
+                    self.pending_calls[backend_id],
+                    random.random(),
+                ),
+            )
+
+    def local_backends(self, backend_hosts: dict[UUID, str]) -> list[UUID]:
+        """The backends in the same host as this runtime."""
+        if settings.client is not None and settings.client.local_backend is not None:
+            local_backend = UUID(settings.client.local_backend)
+            return [local_backend] if local_backend in backend_hosts else []
+        return [backend_id for backend_id, host in backend_hosts.items() if is_local_host(host)]
+
+    def choose(self, policy: str, object_id: UUID, backend_hosts: dict[UUID, str]) -> UUID:
+        """Choose the backend of a new object.
+
+        Args:
+            policy: One of :data:`PLACEMENT_POLICIES`.
+            object_id: ID of the object.
+            backend_hosts: Hosts of the available backends, by backend ID.
+        """
+        if policy == "random":
+            return random.choice(tuple(backend_hosts))
+
+        if policy == "local":
+            local_backends = self.local_backends(backend_hosts)
+            if not local_backends:
+                logger.debug("(%s) No local backend. Choosing a random one", object_id)
+                return random.choice(tuple(backend_hosts))
+            return random.choice(local_backends)
+
+        if policy == "round-robin":
+            return self.round_robin(backend_hosts)
+
+        if policy == "hash":
+            if self.hash_ring is None or self.hash_ring.backend_ids != backend_hosts.keys():
+                self.hash_ring = HashRing(backend_hosts)
+            return self.hash_ring.get(object_id)
+
+        raise ValueError(
+            f"Unknown placement policy '{policy}'. Valid policies are {PLACEMENT_POLICIES}"
+        )
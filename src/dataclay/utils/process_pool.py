@@ -0,0 +1,215 @@
+"""Execution of activemethods in a pool of worker processes.
+
+Activemethods decorated with ``@activemethod(executor="process")`` are not limited by the GIL
+of the backend. The properties of the object are copied into the worker process, the method
+is executed on a local copy of the object, and only the properties that have changed (or have
+been deleted) are copied back to the backend, and propagated to the replicas. Calls in the process
+pool hold the writer lock of the object, so concurrent calls to the same object run one after the
+other. Activemethods running in threads do not take the lock, so they should not write the same
+properties as concurrent process calls.
+
+The worker processes have no dataClay runtime. The referenced dataClay objects are passed
+as unusable proxies, which can be stored or returned but not accessed, and new dataClay
+objects cannot be created.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import pickle
+from typing import TYPE_CHECKING, Any, Optional
+
+from dataclay.config import get_runtime, settings
+from dataclay.dataclay_object import DataClayObject
+from dataclay.event_loop import cpu_count, dc_to_thread_cpu, get_dc_event_loop
+from dataclay.lock_manager import lock_manager
+
+if TYPE_CHECKING:
+    from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+process_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def get_process_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the process pool, creating it on first use.
+
+    Workers are spawned (not forked), since gRPC does not support forking.
+    """
+    global process_executor
+    if process_executor is None:
+        process_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=settings.process_pool_workers or cpu_count,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return process_executor
+
+
+def shutdown_process_executor():
+    global process_executor
+    if process_executor is not None:
+        process_executor.shutdown(wait=False, cancel_futures=True)
+        process_executor = None
+
+
+class _ProcessPickler(pickle.Pickler):
+    """Pickles the dataClay objects in *references* by their position in the list."""
+
+    def __init__(self, file, references: list[DataClayObject], add_references: bool):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = references
+        self.add_references = add_references
+        self._positions = {id(obj): i for i, obj in enumerate(references)}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, DataClayObject):
+            return None
+        if id(obj) not in self._positions:
+            if not self.add_references:
+                raise pickle.PicklingError(
+                    "New dataClay objects cannot be created in process activemethods"
+                )
+            self._positions[id(obj)] = len(self.references)
+            self.references.append(obj)
+        return ("dco", self._positions[id(obj)], type(obj), obj._dc_meta.id)
+
+
+class _ProcessUnpickler(pickle.Unpickler):
+    """Resolves the references written by :class:`_ProcessPickler`.
+
+    In the backend, they are resolved to the original objects. In the worker, to proxies.
+    """
+
+    def __init__(
+        self,
+        file,
+        references: Optional[list[DataClayObject]],
+        proxies: dict[int, DataClayObject],
+    ):
+        super().__init__(file)
+        self.references = references
+        self.proxies = proxies
+
+    def persistent_load(self, pers_id):
+        tag, position, cls, object_id = pers_id
+        if tag != "dco":
+            raise pickle.UnpicklingError(f"Unsupported persistent id: {tag}")
+        if self.references is not None:
+            return self.references[position]
+        if position not in self.proxies:
+            proxy = cls.new_proxy_object()
+            proxy._dc_meta.id = object_id
+            self.proxies[position] = proxy
+        return self.proxies[position]
+
+
+def _dumps(obj, references: list[DataClayObject], add_references: bool) -> bytes:
+    f = io.BytesIO()
+    _ProcessPickler(f, references, add_references).dump(obj)
+    return f.getvalue()
+
+
+def _loads(
+    data: bytes,
+    references: Optional[list[DataClayObject]] = None,
+    proxies: Optional[dict[int, DataClayObject]] = None,
+):
+    return _ProcessUnpickler(io.BytesIO(data), references, proxies).load()
+
+
+def _serialize_call(
+    instance: DataClayObject, args: tuple, kwargs: dict
+) -> tuple[dict[str, bytes], bytes, list[DataClayObject]]:
+    # The object itself is always the first reference
+    references: list[DataClayObject] = [instance]
+    properties = {
+        name: _dumps(value, references, add_references=True)
+        for name, value in instance._dc_properties.items()
+    }
+    arguments = _dumps((args, kwargs), references, add_references=True)
+    return properties, arguments, references
+
+
+def _run_activemethod(
+    cls: type[DataClayObject],
+    object_id: UUID,
+    method_name: str,
+    properties: dict[str, bytes],
+    arguments: bytes,
+    num_references: int,
+) -> tuple[bytes, bool, dict[str, bytes], list[str]]:
+    """Executed in the worker. Returns the result, if it is an exception, and the changes."""
+    instance = cls.new_proxy_object()
+    instance._dc_meta.id = object_id
+    instance._dc_is_local = True
+    instance._dc_is_loaded = True
+    proxies: dict[int, DataClayObject] = {0: instance}
+    vars(instance).update(
+        {name: _loads(data, proxies=proxies) for name, data in properties.items()}
+    )
+    args, kwargs = _loads(arguments, proxies=proxies)
+
+    try:
+        func = getattr(cls, method_name).__wrapped__
+        result, is_exception = func(instance, *args, **kwargs), False
+    except Exception as e:
+        result, is_exception = e, True
+
+    # Proxies keep their position, so unchanged properties are pickled the same way
+    references = [proxies[i] for i in range(num_references)]
+    new_properties = instance._dc_properties
+    updated = {}
+    for name, value in new_properties.items():
+        data = _dumps(value, references, add_references=False)
+        if properties.get(name) != data:
+            updated[name] = data
+    deleted = [name for name in properties if name not in new_properties]
+    return _dumps(result, references, add_references=False), is_exception, updated, deleted
+
+
+async def call_in_process(
+    instance: DataClayObject, method_name: str, args: tuple, kwargs: dict
+) -> tuple[Any, bool]:
+    """Execute an activemethod of a local object in the process pool.
+
+    Returns:
+        The result of the method, and whether it is an exception raised by the method.
+    """
+    object_id = instance._dc_meta.id
+    data_manager = get_runtime().data_manager
+    lock = lock_manager.get_lock(object_id)
+    while True:
+        if not instance._dc_is_loaded:
+            await data_manager.load_object(instance)
+        if instance._dc_unloaded_properties:
+            await data_manager.load_properties(instance)
+
+        # Concurrent calls would overwrite the changes of each other
+        async with lock.writer_lock:
+            # It may have been unloaded while waiting for the lock
+            if not instance._dc_is_loaded or instance._dc_unloaded_properties:
+                continue
+
+            properties, arguments, references = await dc_to_thread_cpu(
+                _serialize_call, instance, args, kwargs
+            )
+            logger.debug("(%s) Running activemethod '%s' in process pool", object_id, method_name)
+            result, is_exception, updated, deleted = await get_dc_event_loop().run_in_executor(
+                get_process_executor(),
+                _run_activemethod,
+                type(instance),
+                object_id,
+                method_name,
+                properties,
+                arguments,
+                len(references),
+            )
+
+            if updated or deleted:
+                new_properties = {name: _loads(data, references) for name, data in updated.items()}
+                await get_runtime().update_object_properties(instance, new_properties, deleted)
+            return _loads(result, references), is_exception
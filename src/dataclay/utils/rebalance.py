@@ -0,0 +1,535 @@
+"""Rebalancing of the objects among the backends.
+
+The load of a backend combines the bytes of its objects and their access rate (weighted by
+:attr:`~dataclay.config.Settings.rebalance_access_weight`), from the stats that the backends
+publish when a rebalance requests them (or periodically, see
+:attr:`~dataclay.config.Settings.stats_interval`). Objects without stats are assumed to have
+the mean size.
+
+The plan moves objects from the backends above the mean load to the least loaded ones, with
+the biggest contributions first, until all of them are within the tolerance. The objects of an
+affinity group are planned as a single unit, since they are moved together. When backends are
+evacuated, all their objects (and only theirs, or those with affinity to them) are moved. The
+plan is executed as parallel transfers, one for each pair of backends, made of batched
+``send_objects`` calls under a shared bandwidth limit.
+
+The replicas held by evacuated backends are recreated in other backends by their masters, with
+the same kind of transfers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+from uuid import UUID
+
+from dataclay.config import settings
+from dataclay.exceptions import NoOtherBackendsAvailable
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Collection, Iterable, Iterator
+
+    from dataclay.backend.client import BackendClient
+    from dataclay.metadata.api import MetadataAPI
+    from dataclay.metadata.kvdata import BackendStats
+
+logger = logging.getLogger(__name__)
+
+
+class Transfer:
+    """Objects moved from a backend to another one."""
+
+    def __init__(self, source: UUID, destination: UUID):
+        self.source = source
+        self.destination = destination
+        self.objects: list[tuple[UUID, int]] = []
+        self.num_bytes = 0
+
+    def add(self, object_id: UUID, size: int):
+        self.objects.append((object_id, size))
+        self.num_bytes += size
+
+    def batches(self, batch_bytes: int) -> Iterator[tuple[list[UUID], int]]:
+        """Split the objects in batches of up to ``batch_bytes`` (or a single bigger object)."""
+        batch, num_bytes = [], 0
+        for object_id, size in self.objects:
+            if batch and num_bytes + size > batch_bytes:
+                yield batch, num_bytes
+                batch, num_bytes = [], 0
+            batch.append(object_id)
+            num_bytes += size
+        if batch:
+            yield batch, num_bytes
+
+    def __repr__(self):
+        return (
+            f"<Transfer {self.source} -> {self.destination}: "
+            f"{len(self.objects)} objects, {self.num_bytes} bytes>"
+        )
+
+
+class RebalancePlan:
+    """Transfers that balance the load of the backends."""
+
+    def __init__(
+        self,
+        loads_before: dict[UUID, float],
+        loads_after: dict[UUID, float],
+        transfers: list[Transfer],
+    ):
+        self.loads_before = loads_before
+        self.loads_after = loads_after
+        self.transfers = transfers
+
+    @property
+    def num_objects(self) -> int:
+        return sum(len(transfer.objects) for transfer in self.transfers)
+
+    @property
+    def num_bytes(self) -> int:
+        return sum(transfer.num_bytes for transfer in self.transfers)
+
+    def summary(self) -> str:
+        lines = [f"{self.num_objects} objects ({self.num_bytes} bytes) to move"]
+        lines.append("Load of the backends (fraction of the total), before -> after:")
+        for backend_id, load in self.loads_before.items():
+            lines.append(f"  {backend_id}: {load:.3f} -> {self.loads_after[backend_id]:.3f}")
+        lines.append("Transfers:")
+        for transfer in self.transfers:
+            lines.append(
+                f"  {transfer.source} -> {transfer.destination}: "
+                f"{len(transfer.objects)} objects, {transfer.num_bytes} bytes"
+            )
+        return "\n".join(lines)
+
+
+def _affinity_units(
+    object_ids: Collection[UUID], affinity: dict[UUID, Collection[UUID]]
+) -> list[list[UUID]]:
+    """Group the objects that are linked by affinity, which are always moved together."""
+    parents = {object_id: object_id for object_id in object_ids}
+
+    def find(object_id: UUID) -> UUID:
+        while parents[object_id] != object_id:
+            parents[object_id] = parents[parents[object_id]]
+            object_id = parents[object_id]
+        return object_id
+
+    for object_id, references in affinity.items():
+        if object_id not in parents:
+            continue
+        for reference in references:
+            if reference in parents:
+                parents[find(reference)] = find(object_id)
+
+    units: dict[UUID, list[UUID]] = {}
+    for object_id in object_ids:
+        units.setdefault(find(object_id), []).append(object_id)
+    return list(units.values())
+
+
+def plan_rebalance(
+    object_backends: dict[UUID, UUID],
+    object_stats: dict[UUID, tuple[int, float]],
+    backend_ids: Collection[UUID],
+    evacuate: Collection[UUID] = (),
+    access_weight: Optional[float] = None,
+    tolerance: Optional[float] = None,
+    affinity: Optional[dict[UUID, Collection[UUID]]] = None,
+) -> RebalancePlan:
+    """Compute the transfers that balance the load of the backends.
+
+    The objects linked by affinity are planned as a single unit, since ``send_objects`` moves
+    whole affinity groups. A unit is sent by the backend with most of its load (an evacuated
+    one, if any), which forwards the members stored elsewhere.
+
+    Args:
+        object_backends: Master backend of each object.
+        object_stats: Size (in bytes, 0 if unknown) and access rate of the objects.
+        backend_ids: The available backends. Objects in other backends are not moved.
+        evacuate: Backends whose objects are all moved to the other ones. If given, the
+            objects of the other backends are not moved, unless they have affinity with them.
+        access_weight: Weight of the access rate in the load. By default, the one in settings.
+        tolerance: Imbalance tolerated. By default, the one in settings.
+        affinity: Objects referenced by the affinity properties of each object.
+
+    Raises:
+        NoOtherBackendsAvailable: If all the backends are evacuated.
+    """
+    if access_weight is None:
+        access_weight = settings.rebalance_access_weight
+    if tolerance is None:
+        tolerance = settings.rebalance_tolerance
+
+    destinations = [backend_id for backend_id in backend_ids if backend_id not in evacuate]
+    if not destinations:
+        raise NoOtherBackendsAvailable()
+
+    known_sizes = [size for size, _ in object_stats.values() if size > 0]
+    default_size = sum(known_sizes) // len(known_sizes) if known_sizes else 1
+
+    # Backend, size and access rate of the objects in the available backends
+    sizes_rates: dict[UUID, tuple[UUID, int, float]] = {}
+    for object_id, backend_id in object_backends.items():
+        if backend_id in backend_ids:
+            size, rate = object_stats.get(object_id, (0, 0.0))
+            sizes_rates[object_id] = (backend_id, size or default_size, rate)
+
+    # The load of an object is its (weighted) fraction of the total bytes and accesses
+    total_bytes = sum(size for _, size, _ in sizes_rates.values()) or 1
+    total_rate = sum(rate for _, _, rate in sizes_rates.values())
+    if not total_rate:
+        access_weight = 0.0
+    object_loads = {}
+    loads = {backend_id: 0.0 for backend_id in backend_ids}
+    for object_id, (backend_id, size, rate) in sizes_rates.items():
+        load = (1 - access_weight) * size / total_bytes
+        if access_weight:
+            load += access_weight * rate / total_rate
+        object_loads[object_id] = load
+        loads[backend_id] += load
+    loads_before = dict(loads)
+
+    # Load of each unit, its share in each backend, and its members, by source backend
+    units: dict[UUID, list[tuple[float, dict[UUID, float], list[UUID]]]] = {
+        backend_id: [] for backend_id in backend_ids
+    }
+    for members in _affinity_units(sizes_rates, affinity or {}):
+        shares: dict[UUID, float] = {}
+        for object_id in members:
+            backend_id = sizes_rates[object_id][0]
+            shares[backend_id] = shares.get(backend_id, 0.0) + object_loads[object_id]
+        source = max(shares, key=lambda backend_id: (backend_id in evacuate, shares[backend_id]))
+        units[source].append((sum(shares.values()), shares, members))
+
+    target = sum(loads.values()) / len(destinations)
+    transfers: dict[tuple[UUID, UUID], Transfer] = {}
+
+    for source in backend_ids:
+        evacuating = source in evacuate
+        if not evacuating and (evacuate or loads[source] <= target * (1 + tolerance)):
+            continue
+        # Biggest contributions first, so that fewer objects are moved
+        for load, shares, members in sorted(units[source], key=lambda x: x[0], reverse=True):
+            excess = loads[source] - (0 if evacuating else target)
+            if not evacuating and excess <= target * tolerance:
+                break
+            destination = min(
+                (backend_id for backend_id in destinations if backend_id != source),
+                key=loads.__getitem__,
+                default=None,
+            )
+            if destination is None:
+                break
+            if not evacuating and (
+                shares[source] > excess
+                or loads[destination] + load - shares.get(destination, 0.0)
+                > target * (1 + tolerance)
+            ):
+                continue
+            if (source, destination) not in transfers:
+                transfers[(source, destination)] = Transfer(source, destination)
+            for object_id in members:
+                backend_id, size, _ = sizes_rates[object_id]
+                if backend_id != destination:
+                    transfers[(source, destination)].add(object_id, size)
+            for backend_id, share in shares.items():
+                loads[backend_id] -= share
+            loads[destination] += load
+
+    return RebalancePlan(loads_before, loads, list(transfers.values()))
+
+
+class _BandwidthLimiter:
+    """Delays the batches so that the transfers do not exceed a number of bytes per second."""
+
+    def __init__(self, max_bandwidth: Optional[int]):
+        self.max_bandwidth = max_bandwidth
+        self.next_time = time.monotonic()
+
+    async def acquire(self, num_bytes: int):
+        if not self.max_bandwidth:
+            return
+        now = time.monotonic()
+        start = max(now, self.next_time)
+        self.next_time = start + num_bytes / self.max_bandwidth
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def execute_transfers(
+    transfers: Iterable[Transfer],
+    get_backend_client: Callable[[UUID], Awaitable[BackendClient]],
+    make_replica: bool = False,
+    batch_bytes: Optional[int] = None,
+    parallel_transfers: Optional[int] = None,
+    max_bandwidth: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+):
+    """Execute transfers in parallel and in batches, sent by their source backends.
+
+    Args:
+        transfers: The transfers to execute.
+        get_backend_client: Returns the client of a backend.
+        make_replica: If True, the objects are replicated in the destination instead of moved.
+        batch_bytes: Maximum size of each batch. By default, the one in settings.
+        parallel_transfers: Maximum transfers in progress. By default, the one in settings.
+        max_bandwidth: Maximum bytes per second of all the transfers. By default, the one
+            in settings.
+        progress: Called with the number of objects sent, and the total, after each batch.
+    """
+    transfers = list(transfers)
+    batch_bytes = batch_bytes or settings.rebalance_batch_bytes
+    semaphore = asyncio.Semaphore(parallel_transfers or settings.rebalance_parallel_transfers)
+    limiter = _BandwidthLimiter(max_bandwidth or settings.rebalance_max_bandwidth)
+    num_objects = sum(len(transfer.objects) for transfer in transfers)
+    num_sent = 0
+
+    async def run_transfer(transfer: Transfer):
+        nonlocal num_sent
+        async with semaphore:
+            backend_client = await get_backend_client(transfer.source)
+            for object_ids, num_bytes in transfer.batches(batch_bytes):
+                await limiter.acquire(num_bytes)
+                await backend_client.send_objects(
+                    object_ids, transfer.destination, make_replica, False, False
+                )
+                num_sent += len(object_ids)
+                logger.debug("Sent %d/%d objects", num_sent, num_objects)
+                if progress is not None:
+                    progress(num_sent, num_objects)
+
+    await asyncio.gather(*[run_transfer(transfer) for transfer in transfers])
+
+
+async def execute_plan(
+    plan: RebalancePlan,
+    get_backend_client: Callable[[UUID], Awaitable[BackendClient]],
+    batch_bytes: Optional[int] = None,
+    parallel_transfers: Optional[int] = None,
+    max_bandwidth: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+):
+    """Execute the transfers of the plan, in parallel and in batches.
+
+    See :func:`execute_transfers` for the arguments.
+    """
+    await execute_transfers(
+        plan.transfers,
+        get_backend_client,
+        batch_bytes=batch_bytes,
+        parallel_transfers=parallel_transfers,
+        max_bandwidth=max_bandwidth,
+        progress=progress,
+    )
+
+
+def _master_stats(
+    object_backends: dict[UUID, UUID], backend_stats: dict[UUID, BackendStats]
+) -> dict[UUID, tuple[int, float]]:
+    """Size and access rate of the objects, from the stats of their master backends."""
+    object_stats = {}
+    for backend_id, stats in backend_stats.items():
+        # Only the stats of the master backend are current
+        object_stats.update(
+            (object_id, size_rate)
+            for object_id, size_rate in stats.objects.items()
+            if object_backends.get(object_id) == backend_id
+        )
+    return object_stats
+
+
+def _master_affinity(
+    object_backends: dict[UUID, UUID], backend_stats: dict[UUID, BackendStats]
+) -> dict[UUID, list[UUID]]:
+    """Affinity references of the objects, from the stats of their master backends."""
+    affinity = {}
+    for backend_id, stats in backend_stats.items():
+        affinity.update(
+            (object_id, references)
+            for object_id, references in stats.affinity.items()
+            if object_backends.get(object_id) == backend_id
+        )
+    return affinity
+
+
+async def _request_backend_stats(
+    metadata_api: MetadataAPI, backend_ids: Collection[UUID]
+) -> dict[UUID, BackendStats]:
+    """Ask the backends to publish their stats, and wait for them (up to a timeout)."""
+    previous_stats = await metadata_api.get_all_backend_stats()
+    await metadata_api.request_backend_stats()
+    deadline = time.monotonic() + settings.stats_request_timeout
+    while True:
+        backend_stats = await metadata_api.get_all_backend_stats()
+        pending = [
+            backend_id
+            for backend_id in backend_ids
+            if backend_id not in backend_stats
+            or (
+                backend_id in previous_stats
+                and backend_stats[backend_id].timestamp == previous_stats[backend_id].timestamp
+            )
+        ]
+        if not pending:
+            return backend_stats
+        if time.monotonic() >= deadline:
+            logger.warning("No current stats from %d backends", len(pending))
+            return backend_stats
+        await asyncio.sleep(0.1)
+
+
+async def rebalance(
+    metadata_api: MetadataAPI,
+    backend_ids: Collection[UUID],
+    get_backend_client: Callable[[UUID], Awaitable[BackendClient]],
+    evacuate: Collection[UUID] = (),
+    dry_run: bool = False,
+    batch_bytes: Optional[int] = None,
+    parallel_transfers: Optional[int] = None,
+    max_bandwidth: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> RebalancePlan:
+    """Plan the rebalancing from the metadata and stats of the objects, and execute it.
+
+    Args:
+        metadata_api: Metadata of the objects and stats of the backends.
+        backend_ids: The available backends.
+        get_backend_client: Returns the client of a backend.
+        evacuate: Backends whose objects are all moved to the other ones.
+        dry_run: If True, the plan is returned but not executed.
+        batch_bytes: Maximum size of each batch. By default, the one in settings.
+        parallel_transfers: Maximum transfers in progress. By default, the one in settings.
+        max_bandwidth: Maximum bytes per second of all the transfers. By default, the one
+            in settings.
+        progress: Called with the number of objects moved, and the total, after each batch.
+    """
+    object_mds, backend_stats = await asyncio.gather(
+        metadata_api.get_all_objects(), _request_backend_stats(metadata_api, backend_ids)
+    )
+    object_backends = {
+        object_id: object_md.master_backend_id
+        for object_id, object_md in object_mds.items()
+        if object_md.master_backend_id is not None
+    }
+    object_stats = _master_stats(object_backends, backend_stats)
+    affinity = _master_affinity(object_backends, backend_stats)
+
+    plan = plan_rebalance(object_backends, object_stats, backend_ids, evacuate, affinity=affinity)
+    logger.info("Rebalance plan: %s", plan.summary())
+    if not dry_run:
+        await execute_plan(
+            plan, get_backend_client, batch_bytes, parallel_transfers, max_bandwidth, progress
+        )
+    return plan
+
+
+def plan_replica_evacuation(
+    object_replicas: dict[UUID, tuple[UUID, set[UUID]]],
+    object_stats: dict[UUID, tuple[int, float]],
+    backend_ids: Collection[UUID],
+    evacuate: Collection[UUID],
+) -> list[Transfer]:
+    """Compute the transfers that recreate the replicas of the evacuated backends elsewhere.
+
+    Each replica is sent by the master backend of the object, which keeps track of its replicas,
+    to the backend with fewest new replicas that has no copy of the object yet. Replicas whose
+    master is not available, or whose object is already in all the other backends, are not
+    recreated.
+
+    Args:
+        object_replicas: Master backend and replica backends of each object.
+        object_stats: Size (in bytes, 0 if unknown) and access rate of the objects.
+        backend_ids: The available backends.
+        evacuate: Backends whose replicas are recreated in the other ones.
+    """
+    known_sizes = [size for size, _ in object_stats.values() if size > 0]
+    default_size = sum(known_sizes) // len(known_sizes) if known_sizes else 1
+
+    new_replicas = {backend_id: 0 for backend_id in backend_ids if backend_id not in evacuate}
+    transfers: dict[tuple[UUID, UUID], Transfer] = {}
+    for object_id, (master_backend_id, replica_backend_ids) in object_replicas.items():
+        if replica_backend_ids.isdisjoint(evacuate):
+            continue
+        if master_backend_id not in new_replicas:
+            logger.warning(
+                "(%s) Master backend %s is not available. Replica not recreated",
+                object_id,
+                master_backend_id,
+            )
+            continue
+        destination = min(
+            (
+                backend_id
+                for backend_id in new_replicas
+                if backend_id != master_backend_id and backend_id not in replica_backend_ids
+            ),
+            key=new_replicas.__getitem__,
+            default=None,
+        )
+        if destination is None:
+            continue
+        if (master_backend_id, destination) not in transfers:
+            transfers[(master_backend_id, destination)] = Transfer(master_backend_id, destination)
+        size, _ = object_stats.get(object_id, (0, 0.0))
+        transfers[(master_backend_id, destination)].add(object_id, size or default_size)
+        new_replicas[destination] += 1
+    return list(transfers.values())
+
+
+async def evacuate_replicas(
+    metadata_api: MetadataAPI,
+    backend_ids: Collection[UUID],
+    get_backend_client: Callable[[UUID], Awaitable[BackendClient]],
+    evacuate: Collection[UUID],
+    batch_bytes: Optional[int] = None,
+    parallel_transfers: Optional[int] = None,
+    max_bandwidth: Optional[int] = None,
+) -> set[UUID]:
+    """Recreate the replicas of the evacuated backends in the other ones.
+
+    The evacuated backends keep their replicas, which must be dropped afterwards.
+
+    Args:
+        metadata_api: Metadata of the objects and stats of the backends.
+        backend_ids: The available backends.
+        get_backend_client: Returns the client of a backend.
+        evacuate: Backends whose replicas are recreated in the other ones.
+        batch_bytes: Maximum size of each batch. By default, the one in settings.
+        parallel_transfers: Maximum transfers in progress. By default, the one in settings.
+        max_bandwidth: Maximum bytes per second of all the transfers. By default, the one
+            in settings.
+
+    Returns:
+        The IDs of the objects with replicas in the evacuated backends.
+    """
+    object_mds, backend_stats = await asyncio.gather(
+        metadata_api.get_all_objects(
+            filter_func=lambda object_md: not object_md.replica_backend_ids.isdisjoint(evacuate)
+        ),
+        metadata_api.get_all_backend_stats(),
+    )
+    object_replicas = {
+        object_id: (object_md.master_backend_id, object_md.replica_backend_ids)
+        for object_id, object_md in object_mds.items()
+    }
+    object_stats = _master_stats(
+        {object_id: master for object_id, (master, _) in object_replicas.items()}, backend_stats
+    )
+
+    transfers = plan_replica_evacuation(object_replicas, object_stats, backend_ids, evacuate)
+    logger.info(
+        "Recreating %d replicas in other backends",
+        sum(len(transfer.objects) for transfer in transfers),
+    )
+    await execute_transfers(
+        transfers,
+        get_backend_client,
+        make_replica=True,
+        batch_bytes=batch_bytes,
+        parallel_transfers=parallel_transfers,
+        max_bandwidth=max_bandwidth,
+    )
+    return set(object_mds)
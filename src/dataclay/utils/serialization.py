@@ -1,23 +1,89 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import io
 import logging
+import mmap
+import os
 import pickle
 import pickletools
 import threading
-from typing import Optional
-from uuid import UUID
+from typing import TYPE_CHECKING, Optional
+from uuid import UUID, uuid4
 
 from dataclay import utils
-from dataclay.config import LEGACY_DEPS, get_runtime
-from dataclay.dataclay_object import DataClayObject
+from dataclay.config import LEGACY_DEPS, get_runtime, settings
+from dataclay.dataclay_object import DataClayObject, ProxyMetadata
 from dataclay.event_loop import dc_to_thread_cpu, get_dc_event_loop
 from dataclay.metadata.kvdata import ObjectMetadata
 
+if TYPE_CHECKING:
+    from collections.abc import (
+        AsyncIterable,
+        AsyncIterator,
+        Awaitable,
+        Callable,
+        Iterable,
+    )
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 logger = logging.getLogger(__name__)
 
 
+def load_reference(
+    object_id: UUID, dataset_name: Optional[str], class_name: str, master_backend_id: UUID
+) -> DataClayObject:
+    """Unpickle a reference to a dataClay object.
+
+    Clients create a compact proxy from the metadata in the reference, without querying the
+    metadata service. Backends get the full metadata, since they need the replicas to know
+    if the object is local. References are only compact on the wire: the objects stored by
+    backends reference others by ID (see :class:`StorageDataClayPickler`).
+    """
+    runtime = get_runtime()
+    if runtime.is_backend:
+        return DataClayObject.get_by_id(object_id)
+    return runtime.get_object_by_reference(
+        ProxyMetadata(object_id, dataset_name, class_name, master_backend_id)
+    )
+
+
+def reduce_reference(obj: DataClayObject) -> tuple:
+    """Return the reduce value of a reference to a registered dataClay object."""
+    proxy_meta = vars(obj).get("_dc_proxy_meta")
+    if proxy_meta is None:
+        object_md = obj._dc_meta
+        if (
+            object_md.master_backend_id is None
+            or object_md.replica_backend_ids
+            or object_md.is_read_only
+            or object_md.original_object_id
+            or object_md.versions_object_ids
+        ):
+            # A compact proxy would lose this metadata
+            return DataClayObject.get_by_id, (object_md.id,)
+        proxy_meta = object_md
+    return load_reference, (
+        proxy_meta.id,
+        proxy_meta.dataset_name,
+        proxy_meta.class_name,
+        proxy_meta.master_backend_id,
+    )
+
+
+def _add_references(object_id: UUID, references: Iterable[UUID]):
+    """Record the references of a serialized object, to prefetch them in backends."""
+    runtime = get_runtime()
+    # Clients do not prefetch, and would keep the references of every serialized object
+    if runtime.is_backend:
+        runtime.data_manager.add_references(object_id, references)
+
+
 class DataClayPickler(pickle.Pickler):
     def __init__(self, file, pending_make_persistent: Optional[list[DataClayObject]] = None):
         super().__init__(file)
@@ -27,10 +93,102 @@ class DataClayPickler(pickle.Pickler):
         if isinstance(obj, DataClayObject):
             if not obj._dc_is_registered:
                 obj.make_persistent()
-            return DataClayObject.get_by_id, (obj._dc_meta.id,)
+            return reduce_reference(obj)
+        else:
+            return NotImplemented
+
+
+class StorageDataClayPickler(DataClayPickler):
+    """Pickler used by the DataManager to store objects to disk.
+
+    Other dataClay objects are referenced by ID, so the references do not go stale when the
+    objects move.
+
+    NumPy arrays bigger than ``settings.memmap_threshold`` are not embedded in the pickle.
+    They are written to a raw (and aligned) ``.npy`` file in the ``<path>.arrays`` directory,
+    and a reference to that file is pickled instead.
+    """
+
+    def __init__(self, file, path: str):
+        super().__init__(file)
+        self.arrays_dir = os.path.abspath(path + ".arrays")
+        self.array_paths: list[str] = []
+        self._array_ids: dict[int, tuple[str, str]] = {}
+        # IDs of the referenced dataClay objects
+        self.references: set[UUID] = set()
+
+    def reducer_override(self, obj):
+        if isinstance(obj, DataClayObject):
+            # Not a compact reference, since its master backend is stale once the object moves
+            if not obj._dc_is_registered:
+                obj.make_persistent()
+            return DataClayObject.get_by_id, (obj._dc_id,)
         else:
             return NotImplemented
 
+    def persistent_id(self, obj):
+        if isinstance(obj, DataClayObject):
+            self.references.add(obj._dc_id)
+            return None
+
+        if (
+            np is None
+            or settings.memmap_threshold is None
+            or not isinstance(obj, np.ndarray)
+            or obj.dtype.hasobject
+            or obj.nbytes < settings.memmap_threshold
+        ):
+            return None
+
+        # Keep the identity of arrays referenced more than once
+        if id(obj) in self._array_ids:
+            return self._array_ids[id(obj)]
+
+        # A memmap loaded from this object is already on disk, so just flush its changes
+        if (
+            isinstance(obj, np.memmap)
+            and isinstance(obj.base, mmap.mmap)
+            and obj.mode == "r+"
+            and os.path.dirname(obj.filename) == self.arrays_dir
+        ):
+            obj.flush()
+            array_path = obj.filename
+        else:
+            # Always use a new file, since previous ones may still be memory-mapped
+            os.makedirs(self.arrays_dir, exist_ok=True)
+            array_path = os.path.join(self.arrays_dir, f"{uuid4().hex}.npy")
+            with open(array_path, "wb") as f:
+                np.save(f, obj, allow_pickle=False)
+
+        self.array_paths.append(array_path)
+        self._array_ids[id(obj)] = ("ndarray", os.path.basename(array_path))
+        return self._array_ids[id(obj)]
+
+
+class StorageDataClayUnpickler(pickle.Unpickler):
+    """Unpickler for the files written by :class:`StorageDataClayPickler`.
+
+    Arrays stored in their own ``.npy`` file are loaded as a read-write ``numpy.memmap``,
+    so only the accessed pages are read, and they are cached by the OS page cache.
+    """
+
+    def __init__(self, file, path: str):
+        super().__init__(file)
+        self.arrays_dir = os.path.abspath(path + ".arrays")
+        self._arrays: dict[str, np.memmap] = {}
+
+    def persistent_load(self, pers_id):
+        tag, filename = pers_id
+        if tag == "ndarray":
+            if filename not in self._arrays:
+                self._arrays[filename] = np.load(
+                    os.path.join(self.arrays_dir, filename),
+                    mmap_mode="r+",
+                    allow_pickle=False,
+                )
+            return self._arrays[filename]
+        raise pickle.UnpicklingError(f"Unsupported persistent id: {tag}")
+
 
 class RecursiveDataClayPickler(DataClayPickler):
     def __init__(
@@ -46,6 +204,8 @@ class RecursiveDataClayPickler(DataClayPickler):
         self.visited_remote_objects = visited_remote_objects
         self.serialized = serialized
         self.make_persistent = make_persistent
+        # IDs of the referenced dataClay objects
+        self.references: set[UUID] = set()
 
     def persistent_id(self, obj):
         """
@@ -57,43 +217,49 @@ class RecursiveDataClayPickler(DataClayPickler):
         - The object's class
 
         If the object is a registered persistent DataClayObject, returns None and triggers
-        the 'reducer_override' method. This method serializes the object as a tuple with:
-        - The get_by_id_sync method
-        - The object's ID
+        the 'reducer_override' method. This method serializes the object as a reference
+        (see :func:`reduce_reference`).
 
         If the object is not a DataClayObject, returns None.
         """
         if isinstance(obj, DataClayObject):
+            self.references.add(obj._dc_id)
             if obj._dc_is_local and not obj._dc_is_replica:
-                if obj._dc_meta.id not in self.visited_local_objects:
-                    self.visited_local_objects[obj._dc_meta.id] = obj
+                if obj._dc_id not in self.visited_local_objects:
+                    self.visited_local_objects[obj._dc_id] = obj
                     if not obj._dc_is_loaded:
                         # TODO: Check that assert don't create overhead
                         assert get_dc_event_loop()._thread_id != threading.get_ident()
                         asyncio.run_coroutine_threadsafe(
                             get_runtime().data_manager.load_object(obj), get_dc_event_loop()
                         ).result()
+                    if obj._dc_unloaded_properties:
+                        asyncio.run_coroutine_threadsafe(
+                            get_runtime().data_manager.load_properties(obj), get_dc_event_loop()
+                        ).result()
 
                     f = io.BytesIO()
-                    RecursiveDataClayPickler(
+                    pickler = RecursiveDataClayPickler(
                         f,
                         self.visited_local_objects,
                         self.visited_remote_objects,
                         self.serialized,
                         self.make_persistent,
-                    ).dump(obj._dc_state)
+                    )
+                    pickler.dump(obj._dc_state)
                     self.serialized.append(f.getvalue())
+                    _add_references(obj._dc_id, pickler.references)
 
                 # if serializing objects for make_persistent, this are not registered
                 # so they must be created we deserialization, instead of calling get_by_id
                 # TODO: use obj._dc_is_registered instead of self.make_persistent
                 if self.make_persistent:
-                    return ("unregistered", obj._dc_meta.id, obj.__class__)
+                    return ("unregistered", obj._dc_id, obj.__class__)
             else:
                 # If the object is not local, then it is remote and just need to return the id
                 # Adding object to visited_remote_objects
-                if obj._dc_meta.id not in self.visited_remote_objects:
-                    self.visited_remote_objects[obj._dc_meta.id] = obj
+                if obj._dc_id not in self.visited_remote_objects:
+                    self.visited_remote_objects[obj._dc_id] = obj
 
 
 async def recursive_dcdumps(
@@ -118,17 +284,98 @@ async def recursive_dcdumps(
 
     # NOTE: Executor needed to allow loading objects in parallel (async call inside non-async)
     file = io.BytesIO()
-    await dc_to_thread_cpu(
-        RecursiveDataClayPickler(
-            file, local_objects, remote_objects, serialized_local_objects, make_persistent
-        ).dump,
-        instance._dc_state,
+    pickler = RecursiveDataClayPickler(
+        file, local_objects, remote_objects, serialized_local_objects, make_persistent
     )
+    await dc_to_thread_cpu(pickler.dump, instance._dc_state)
 
     serialized_local_objects.append(file.getvalue())
+    _add_references(instance._dc_meta.id, pickler.references)
     return serialized_local_objects
 
 
+class _SerializedQueue:
+    """List-like sink that hands the data serialized in an executor thread to the
+    event loop. The serializer is blocked while the queue is full, so a slow consumer
+    bounds the memory used by serialization.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize)
+        # The queue is bound to the loop that consumes it, which may be a call loop
+        self.loop = asyncio.get_running_loop()
+        self.closed = False
+
+    def append(self, data: bytes):
+        if self.closed:
+            raise RuntimeError("The consumer of the serialized data has been closed")
+        asyncio.run_coroutine_threadsafe(self.queue.put(data), self.loop).result()
+
+
+async def _iter_serialized(
+    serialize: Callable[[_SerializedQueue], Awaitable[None]],
+) -> AsyncIterator[bytes]:
+    """Yield the data appended to the queue by ``serialize`` while it is running."""
+    serialized = _SerializedQueue(settings.stream_max_pending_objects)
+
+    async def run():
+        try:
+            await serialize(serialized)
+        finally:
+            if not serialized.closed:
+                await serialized.queue.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (data := await serialized.queue.get()) is not None:
+            yield data
+        await task
+    finally:
+        if not task.done():
+            # Stop the serializer, unblocking it if it is waiting for the queue
+            serialized.closed = True
+            while not serialized.queue.empty():
+                serialized.queue.get_nowait()
+            with contextlib.suppress(Exception):
+                await task
+
+
+async def recursive_dcdumps_iter(
+    instance: DataClayObject,
+    local_objects: Optional[dict[UUID, DataClayObject]] = None,
+    remote_objects: Optional[dict[UUID, DataClayObject]] = None,
+    make_persistent: bool = False,
+) -> AsyncIterator[bytes]:
+    """Same as :func:`recursive_dcdumps`, but yields each object as soon as it is serialized.
+
+    At most ``settings.stream_max_pending_objects`` serialized objects are kept in memory
+    waiting to be consumed.
+    """
+    logger.debug(
+        "(%s) Starting recursive_dcdumps_iter (make_persistent=%s)",
+        instance._dc_meta.id,
+        make_persistent,
+    )
+
+    if local_objects is None:
+        local_objects = {}
+    if remote_objects is None:
+        remote_objects = {}
+    local_objects[instance._dc_meta.id] = instance
+
+    async def serialize(serialized: _SerializedQueue):
+        file = io.BytesIO()
+        pickler = RecursiveDataClayPickler(
+            file, local_objects, remote_objects, serialized, make_persistent
+        )
+        await dc_to_thread_cpu(pickler.dump, instance._dc_state)
+        _add_references(instance._dc_meta.id, pickler.references)
+        await serialized.queue.put(file.getvalue())
+
+    async for object_bytes in _iter_serialized(serialize):
+        yield object_bytes
+
+
 class RecursiveDataClayObjectUnpickler(pickle.Unpickler):
     def __init__(self, file, unserialized: dict[UUID, DataClayObject]):
         super().__init__(file)
@@ -195,6 +442,129 @@ async def dcdumps(obj):
     return file.getvalue()
 
 
+class _ChunkedWriter:
+    """File-like object that splits the data written by a pickler in chunks."""
+
+    def __init__(self, serialized: _SerializedQueue, chunk_size: int):
+        self.serialized = serialized
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.serialized.append(bytes(self.buffer[: self.chunk_size]))
+            del self.buffer[: self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.serialized.append(bytes(self.buffer))
+            self.buffer.clear()
+
+
+class _ChunkedReader(io.RawIOBase):
+    """File-like object that reads (from an executor thread) the chunks fed by the event loop."""
+
+    def __init__(self):
+        super().__init__()
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(
+            settings.stream_max_pending_objects
+        )
+        # The queue is bound to the loop that feeds it, which may be a call loop
+        self.loop = asyncio.get_running_loop()
+        self.chunk = memoryview(b"")
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        while not self.chunk:
+            if self.eof:
+                return 0
+            chunk = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+            if chunk is None:
+                self.eof = True
+                return 0
+            self.chunk = memoryview(chunk)
+        size = min(len(b), len(self.chunk))
+        b[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+    def abort(self):
+        """Stop reading, waking the executor thread if it is waiting for a chunk.
+
+        Must be called from the event loop that feeds the chunks.
+        """
+        self.eof = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+async def dcdumps_iter(obj) -> AsyncIterator[bytes]:
+    """Same as :func:`dcdumps`, but yields the data in chunks of ``settings.stream_chunk_size``
+    bytes while the object is being serialized.
+    """
+    logger.debug("Serializing object in chunks in executor")
+
+    async def serialize(serialized: _SerializedQueue):
+        writer = _ChunkedWriter(serialized, settings.stream_chunk_size)
+
+        def dump():
+            DataClayPickler(writer).dump(obj)
+            writer.flush()
+
+        await dc_to_thread_cpu(dump)
+
+    async for chunk in _iter_serialized(serialize):
+        yield chunk
+
+
+async def dcloads_iter(chunks: AsyncIterable[bytes], num_objects: int = 1):
+    """Same as :func:`dcloads`, but deserializing the data while its chunks are received.
+
+    Args:
+        chunks: The chunks of the data serialized with dcdumps (or dcdumps_iter).
+        num_objects: Number of objects serialized one after the other in the data.
+            If greater than 1, a tuple with the objects is returned.
+    """
+    logger.debug("Deserializing chunks in executor")
+    reader = _ChunkedReader()
+    loaded = False
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                await reader.queue.put(chunk)
+        finally:
+            # Signal the end of the data, unless the reader is no longer reading
+            if not loaded:
+                await reader.queue.put(None)
+
+    def load():
+        file = io.BufferedReader(reader, settings.stream_chunk_size)
+        return tuple(pickle.load(file) for _ in range(num_objects))
+
+    task = asyncio.create_task(feed())
+    try:
+        result = await dc_to_thread_cpu(load)
+    except Exception:
+        # If receiving the chunks failed, raise that error instead of the unpickling one
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception() from None
+        raise
+    finally:
+        loaded = True
+        task.cancel()
+        # If the load was cancelled, its thread could be left waiting for the next chunk
+        reader.abort()
+
+    return result if num_objects > 1 else result[0]
+
+
 async def dcloads(binary):
     """Deserialize the object using pickle.loads.
     It will manage the deserialization of DataClayObjects.
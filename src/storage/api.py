@@ -194,6 +194,8 @@ class ConstraintsContext:
 
     The available constraints are:
     - max_threads (int): Maximum number of threads that can be used in parallel. Defaults to None (unlimited).
+    - cpus (str): CPUs where the active methods are executed (e.g. "0-3,8"). Defaults to None (any).
+    - numa_node (int): NUMA node where the active methods are executed. Defaults to None (any).
     """
 
     def __init__(self, new_config: dict[str, Any]):
@@ -28,6 +28,12 @@ def mds_connection(docker_ip, docker_services):
     return docker_ip, mds_port
 
 
+@pytest.fixture(scope="session")
+def kv_connection(docker_ip, docker_services):
+    kv_port = docker_services.port_for("redis", 6379)
+    return docker_ip, kv_port
+
+
 def pytest_addoption(parser):
     parser.addoption(
         "--build-legacy-deps",
@@ -0,0 +1,50 @@
+import concurrent.futures
+
+from dataclay.config import settings
+from dataclay.contrib.modeltest.counter import Counter
+from dataclay.exceptions import BackendOverloadedError
+
+# The backends admit one call to Counter.slow_add at a time, and queue up to 8 calls
+
+
+def call_concurrently(counter, num_calls):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_calls) as executor:
+        futures = [executor.submit(counter.slow_add, 1) for _ in range(num_calls)]
+    return [future.exception() or future.result() for future in futures]
+
+
+def test_admission_rejects_calls(client, monkeypatch):
+    """Calls beyond the queue are rejected, and fail if they are not retried"""
+    monkeypatch.setattr(settings, "overload_max_retries", 0)
+    counter = Counter()
+    counter.make_persistent()
+
+    results = call_concurrently(counter, 20)
+
+    rejected = [result for result in results if isinstance(result, BackendOverloadedError)]
+    assert rejected
+    assert all(isinstance(result, (int, BackendOverloadedError)) for result in results)
+    # The rejected calls have not been executed
+    assert counter.value == len(results) - len(rejected)
+
+
+def test_admission_retries_rejected_calls(client):
+    """Rejected calls are retried by the client until they are admitted"""
+    counter = Counter()
+    counter.make_persistent()
+
+    results = call_concurrently(counter, 20)
+
+    assert sorted(results) == list(range(1, 21))
+    assert counter.value == 20
+
+
+def test_admission_other_methods(client):
+    """The limit of a method does not apply to the other methods"""
+    counter = Counter()
+    counter.make_persistent()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(counter.echo, range(20)))
+
+    assert results == list(range(20))
@@ -0,0 +1,43 @@
+from uuid import UUID
+
+from dataclay.contrib.modeltest.family import Family, Person
+from dataclay.event_loop import run_dc_coroutine
+
+# Backend of the docker compose that is drained (and stopped) by the test
+DRAINED_BACKEND_ID = UUID("4b9c6b52-7e2a-4d0c-9a53-0d6f3c1e8a44")
+
+
+def test_drain_backend(client):
+    """The objects and replicas of the drained backend are moved to the other backends"""
+    backends = client.get_backends()
+    assert DRAINED_BACKEND_ID in backends
+    other_ids = [backend_id for backend_id in backends if backend_id != DRAINED_BACKEND_ID]
+
+    people = [Person(f"Person {i}", i) for i in range(20)]
+    family = Family(*people)
+    family.make_persistent(backend_id=DRAINED_BACKEND_ID)
+    replicated = Person("Replicated", 50)
+    replicated.make_persistent(backend_id=other_ids[0])
+    replicated.new_replica(backend_id=DRAINED_BACKEND_ID)
+
+    run_dc_coroutine(backends[DRAINED_BACKEND_ID].drain)
+    # The client does not subscribe to the deregistered backends
+    del backends[DRAINED_BACKEND_ID]
+
+    assert DRAINED_BACKEND_ID not in run_dc_coroutine(
+        client.runtime.metadata_service.get_all_backends
+    )
+
+    family.sync()
+    assert family._dc_meta.master_backend_id in other_ids
+    for i, person in enumerate(people):
+        person.sync()
+        assert person._dc_meta.master_backend_id in other_ids
+        assert person.name == f"Person {i}"
+    assert len(family.members) == 20
+
+    replicated.sync()
+    assert replicated._dc_meta.master_backend_id == other_ids[0]
+    assert DRAINED_BACKEND_ID not in replicated._dc_meta.replica_backend_ids
+    assert len(replicated._dc_meta.replica_backend_ids) == 1
+    assert replicated.name == "Replicated"
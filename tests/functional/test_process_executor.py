@@ -0,0 +1,36 @@
+import concurrent.futures
+
+import pytest
+
+from dataclay.contrib.modeltest.counter import Counter
+
+
+def test_process_activemethod(client):
+    counter = Counter(10)
+    counter.make_persistent()
+
+    assert counter.process_add(5) == 15
+    assert counter.value == 15
+
+
+def test_process_activemethod_concurrent_writers(client):
+    """Concurrent process calls to the same object run one after the other"""
+    counter = Counter()
+    counter.make_persistent()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: counter.process_add(1), range(16)))
+
+    assert sorted(results) == list(range(1, 17))
+    assert counter.value == 16
+
+
+def test_process_activemethod_delete(client):
+    """Properties deleted in the worker process are deleted in the backend"""
+    counter = Counter(3)
+    counter.make_persistent()
+
+    counter.process_delete_value()
+
+    with pytest.raises(AttributeError):
+        counter.value
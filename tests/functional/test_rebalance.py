@@ -0,0 +1,64 @@
+import pytest
+
+from dataclay.contrib.modeltest.family import Person
+from dataclay.event_loop import run_dc_coroutine
+from dataclay.metadata.api import MetadataAPI
+from dataclay.utils.rebalance import rebalance
+
+
+@pytest.fixture
+def metadata_api(kv_connection):
+    kv_host, kv_port = kv_connection
+    metadata_api = MetadataAPI(kv_host, kv_port)
+    yield metadata_api
+    run_dc_coroutine(metadata_api.close)
+
+
+def test_rebalance_dry_run(client, metadata_api):
+    """The plan moves all the objects of the evacuated backend, but nothing is moved"""
+    backends = client.get_backends()
+    backend_ids = list(backends)
+    people = [Person(f"Person {i}", i) for i in range(5)]
+    for person in people:
+        person.make_persistent(backend_id=backend_ids[0])
+
+    plan = run_dc_coroutine(
+        rebalance,
+        metadata_api,
+        backend_ids,
+        backends.get,
+        evacuate={backend_ids[0]},
+        dry_run=True,
+    )
+
+    moved = {object_id for transfer in plan.transfers for object_id, _ in transfer.objects}
+    assert {person._dc_meta.id for person in people} <= moved
+    assert all(transfer.source == backend_ids[0] for transfer in plan.transfers)
+    assert set(plan.loads_before) == set(backend_ids)
+    assert sum(plan.loads_before.values()) == pytest.approx(1)
+    assert sum(plan.loads_after.values()) == pytest.approx(1)
+    assert plan.loads_after[backend_ids[0]] == pytest.approx(0)
+    assert plan.num_objects == len(moved)
+
+    for person in people:
+        person.sync()
+        assert person._dc_meta.master_backend_id == backend_ids[0]
+
+
+def test_rebalance(client, metadata_api):
+    """Objects are moved from the most loaded backends, and they are still available"""
+    backends = client.get_backends()
+    backend_ids = list(backends)
+    people = [Person(f"Person {i}", i) for i in range(30)]
+    for person in people:
+        person.make_persistent(backend_id=backend_ids[0])
+
+    plan = run_dc_coroutine(rebalance, metadata_api, backend_ids, backends.get)
+
+    assert max(plan.loads_after.values()) <= max(plan.loads_before.values())
+    moved = {object_id for transfer in plan.transfers for object_id, _ in transfer.objects}
+    for person in people:
+        person.sync()
+        if person._dc_meta.id in moved:
+            assert person._dc_meta.master_backend_id != backend_ids[0]
+        assert person.name == f"Person {person.age}"
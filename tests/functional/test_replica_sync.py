@@ -0,0 +1,72 @@
+import pickle
+import time
+
+import pytest
+
+from dataclay.config import settings
+from dataclay.contrib.modeltest.family import Dog, Person
+from dataclay.event_loop import run_dc_coroutine
+
+
+def get_replica_attribute(client, backend_id, instance, name):
+    """Read the attribute from the replica in the backend, instead of from any copy"""
+    backend_client = client.get_backends()[backend_id]
+    serialized_value, is_exception = run_dc_coroutine(
+        backend_client.get_object_attribute, instance._dc_meta.id, name
+    )
+    value = pickle.loads(serialized_value)
+    if is_exception:
+        raise value
+    return value
+
+
+def wait_replica_sync():
+    # The backends propagate the updates with "async" replica sync (see docker-compose.yml)
+    time.sleep(settings.replica_max_lag + 1)
+
+
+def test_replica_sync_setattr(client):
+    """Properties set in the master are propagated to the replicas"""
+    backend_ids = list(client.get_backends())
+    person = Person("Marc", 24)
+    person.make_persistent(backend_id=backend_ids[0])
+    person.new_replica(backend_id=backend_ids[1])
+
+    person.age = 30
+    person.name = "Marc Jr."
+    wait_replica_sync()
+
+    assert get_replica_attribute(client, backend_ids[1], person, "age") == 30
+    assert get_replica_attribute(client, backend_ids[1], person, "name") == "Marc Jr."
+
+
+def test_replica_sync_activemethod(client):
+    """Properties changed by activemethods in the master are propagated to all the replicas"""
+    backend_ids = list(client.get_backends())
+    dog = Dog("Rex", 2)
+    dog.make_persistent(backend_id=backend_ids[0])
+    dog.new_replica(backend_id=backend_ids[1])
+    dog.new_replica(backend_id=backend_ids[2])
+
+    dog.add_year()
+    wait_replica_sync()
+
+    for backend_id in backend_ids[1:3]:
+        assert get_replica_attribute(client, backend_id, dog, "age") == 3
+        assert get_replica_attribute(client, backend_id, dog, "dog_age") == 21
+
+
+def test_replica_sync_delattr(client):
+    """Properties deleted in the master are deleted in the replicas"""
+    backend_ids = list(client.get_backends())
+    person = Person("Marc", 24)
+    person.make_persistent(backend_id=backend_ids[0])
+    person.new_replica(backend_id=backend_ids[1])
+    assert get_replica_attribute(client, backend_ids[1], person, "dog") is None
+
+    del person.dog
+    wait_replica_sync()
+
+    with pytest.raises(AttributeError):
+        get_replica_attribute(client, backend_ids[1], person, "dog")
+    assert get_replica_attribute(client, backend_ids[1], person, "age") == 24
@@ -0,0 +1,47 @@
+import pytest
+
+from dataclay.config import settings
+from dataclay.contrib.modeltest.counter import Counter
+from dataclay.exceptions import DataClayException
+
+
+class Unimportable:
+    """Its module is not available in the backends, so it cannot be unpickled there"""
+
+
+@pytest.fixture
+def stream_calls(monkeypatch):
+    monkeypatch.setattr(settings, "stream_calls", True)
+    monkeypatch.setattr(settings, "stream_call_threshold", 1024)
+    monkeypatch.setattr(settings, "stream_chunk_size", 256)
+
+
+def test_call_stream(client, stream_calls):
+    """Big arguments and results are sent in chunks"""
+    counter = Counter()
+    counter.make_persistent()
+
+    data = bytes(range(256)) * 400
+    assert counter.echo(data) == data
+    assert counter.echo([data, {"key": data}]) == [data, {"key": data}]
+
+
+def test_call_stream_exception(client, stream_calls):
+    """Exceptions raised by streamed calls are raised in the caller"""
+    counter = Counter()
+    counter.make_persistent()
+
+    with pytest.raises(ValueError, match="Received 100000 bytes"):
+        counter.fail(b"x" * 100_000)
+
+
+def test_call_stream_argument_error(client, stream_calls):
+    """A call fails if an argument cannot be loaded mid-stream, and the next calls work"""
+    counter = Counter()
+    counter.make_persistent()
+
+    with pytest.raises((DataClayException, ImportError)):
+        counter.echo([b"x" * 100_000, Unimportable()])
+
+    data = b"y" * 100_000
+    assert counter.echo(data) == data
@@ -0,0 +1,62 @@
+import pytest
+
+from dataclay.config import settings
+from dataclay.contrib.modeltest.family import Family, Person
+from dataclay.event_loop import run_dc_coroutine
+from dataclay.exceptions import DataClayException, DoesNotExistError
+
+
+class Unimportable:
+    """Its module is not available in the backends, so it cannot be unpickled there"""
+
+
+@pytest.fixture
+def stream_objects(monkeypatch):
+    monkeypatch.setattr(settings, "stream_objects", True)
+
+
+def test_make_persistent_stream(client, stream_objects):
+    """Objects sent in a stream are registered with their references"""
+    family = Family(*[Person(f"Person {i}", i) for i in range(50)])
+    family.make_persistent()
+
+    assert family.is_persistent
+    assert len(family.members) == 50
+    assert family.members[49].name == "Person 49"
+    assert family.members[49].is_persistent
+    assert family.members[49]._dc_meta.master_backend_id == family._dc_meta.master_backend_id
+
+
+def test_make_persistent_stream_error(client, stream_objects):
+    """If an object of the stream fails, none of them is registered"""
+    person = Person("Marc", 24)
+    person.dog = Unimportable()
+    family = Family(Person("Alice", 21), person)
+
+    with pytest.raises(DataClayException):
+        family.make_persistent()
+
+    assert family._dc_is_registered is False
+    assert person._dc_is_registered is False
+    with pytest.raises(DoesNotExistError):
+        run_dc_coroutine(client.runtime.metadata_service.get_object_md_by_id, family._dc_meta.id)
+
+    # The objects can be made persistent once fixed
+    person.dog = None
+    family.make_persistent()
+    assert family.members[1].name == "Marc"
+
+
+def test_move_stream(client, stream_objects):
+    """Objects are moved to another backend in a stream"""
+    backend_ids = list(client.get_backends())
+    family = Family(*[Person(f"Person {i}", i) for i in range(10)])
+    family.make_persistent(backend_id=backend_ids[0])
+
+    family.move(backend_ids[1], recursive=True)
+
+    assert family._dc_meta.master_backend_id == backend_ids[1]
+    person = family.members[9]
+    person.sync()
+    assert person._dc_meta.master_backend_id == backend_ids[1]
+    assert person.name == "Person 9"
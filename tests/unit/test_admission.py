@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from dataclay.backend.admission import PRIORITIES, AdmissionLimit, parse_size
+from dataclay.exceptions import BackendOverloadedError
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        (None, None),
+        (1024, 1024),
+        (1.5, 1),
+        ("1024", 1024),
+        ("1KB", 1024),
+        ("512 MiB", 512 * 1024**2),
+        ("1gb", 1024**3),
+        ("0.5T", 1024**4 // 2),
+    ],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "MB", "1 PB", "1..2", "-1"])
+def test_parse_size_invalid(size):
+    with pytest.raises(ValueError):
+        parse_size(size)
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_weights():
+    limit = AdmissionLimit("test", capacity=4, max_queued=10)
+    assert await limit.acquire(3) == 3
+    assert limit.available == 1
+
+    # Heavier than the available weight: waits until released
+    waiter = asyncio.create_task(limit.acquire(2))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    limit.release(3)
+    assert await waiter == 2
+    assert limit.available == 2
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_clamps_weight():
+    """A call heavier than the limit takes the whole capacity, instead of waiting forever"""
+    limit = AdmissionLimit("test", capacity=4, max_queued=10)
+    assert await limit.acquire(100) == 4
+    assert limit.available == 0
+    limit.release(4)
+    # Calls without weight take one slot
+    assert await limit.acquire(0) == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_order():
+    """Waiters are admitted by priority class, then by arrival, without overtaking"""
+    limit = AdmissionLimit("test", capacity=2, max_queued=10)
+    await limit.acquire(2)
+
+    admitted = []
+
+    async def waiter(name, weight, priority):
+        await limit.acquire(weight, PRIORITIES[priority])
+        admitted.append(name)
+
+    tasks = [
+        asyncio.create_task(waiter("low", 1, "low")),
+        asyncio.create_task(waiter("heavy", 2, "normal")),
+        asyncio.create_task(waiter("light", 1, "normal")),
+        asyncio.create_task(waiter("high", 1, "high")),
+    ]
+    await asyncio.sleep(0)
+
+    limit.release(2)
+    await asyncio.sleep(0)
+    # The high priority call is admitted, but the light call does not overtake the heavy one
+    assert admitted == ["high"]
+
+    limit.release(1)
+    await asyncio.sleep(0)
+    assert admitted == ["high", "heavy"]
+
+    limit.release(2)
+    await asyncio.gather(*tasks)
+    assert admitted == ["high", "heavy", "light", "low"]
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_rejects_when_full():
+    limit = AdmissionLimit("test", capacity=1, max_queued=2)
+    await limit.acquire()
+    tasks = [asyncio.create_task(limit.acquire()) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(BackendOverloadedError):
+        await limit.acquire()
+
+    for _ in range(3):
+        limit.release(1)
+    await asyncio.gather(*tasks)
+    assert limit.available == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_limit_cancelled_waiter():
+    """A cancelled waiter leaves the queue, and the next one is admitted"""
+    limit = AdmissionLimit("test", capacity=2, max_queued=10)
+    await limit.acquire(1)
+    heavy = asyncio.create_task(limit.acquire(2))
+    light = asyncio.create_task(limit.acquire(1))
+    await asyncio.sleep(0)
+    assert not light.done()
+
+    heavy.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await heavy
+    assert await light == 1
+    assert limit.available == 0
@@ -0,0 +1,60 @@
+import collections
+from uuid import uuid4
+
+from dataclay.utils.placement import HashRing, Placement
+
+
+def test_hash_ring_is_deterministic():
+    backend_ids = [uuid4() for _ in range(3)]
+    object_ids = [uuid4() for _ in range(100)]
+    ring = HashRing(backend_ids)
+    other_ring = HashRing(reversed(backend_ids))
+
+    assert [ring.get(object_id) for object_id in object_ids] == [
+        other_ring.get(object_id) for object_id in object_ids
+    ]
+
+
+def test_hash_ring_spreads_objects():
+    backend_ids = [uuid4() for _ in range(4)]
+    ring = HashRing(backend_ids)
+
+    counts = collections.Counter(ring.get(uuid4()) for _ in range(4000))
+
+    assert set(counts) == set(backend_ids)
+    assert min(counts.values()) > 500
+
+
+def test_hash_ring_moves_few_objects():
+    """Only the objects of the new backend change when a backend is added"""
+    backend_ids = [uuid4() for _ in range(4)]
+    new_backend_id = uuid4()
+    object_ids = [uuid4() for _ in range(2000)]
+    ring = HashRing(backend_ids)
+    new_ring = HashRing(backend_ids + [new_backend_id])
+
+    moved = [
+        object_id for object_id in object_ids if ring.get(object_id) != new_ring.get(object_id)
+    ]
+
+    assert all(new_ring.get(object_id) == new_backend_id for object_id in moved)
+    assert len(moved) < len(object_ids) / 3
+
+
+def test_round_robin_placement():
+    """Objects are placed in turns, and then in the backends with fewer calls in progress"""
+    backend_hosts = {uuid4(): "localhost" for _ in range(3)}
+    placement = Placement()
+
+    counts = collections.Counter()
+    for _ in range(6):
+        backend_id = placement.choose("round-robin", uuid4(), backend_hosts)
+        placement.add_placed_objects(backend_id)
+        counts[backend_id] += 1
+
+    assert set(counts.values()) == {2}
+
+    # With the same number of objects, the backends with calls in progress are the last ones
+    busy_backend_id = next(iter(backend_hosts))
+    placement.call_started(busy_backend_id)
+    assert placement.choose("round-robin", uuid4(), backend_hosts) != busy_backend_id
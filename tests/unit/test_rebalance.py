@@ -0,0 +1,214 @@
+from uuid import uuid4
+
+import pytest
+
+from dataclay.exceptions import NoOtherBackendsAvailable
+from dataclay.utils.rebalance import plan_rebalance, plan_replica_evacuation
+
+
+def moved_objects(plan):
+    return {object_id for transfer in plan.transfers for object_id, _ in transfer.objects}
+
+
+def test_plan_rebalance_balances_sizes():
+    """Objects are moved from the loaded backend to the empty one, within the tolerance"""
+    backend_a, backend_b = uuid4(), uuid4()
+    object_ids = [uuid4() for _ in range(10)]
+    object_backends = {object_id: backend_a for object_id in object_ids}
+    object_stats = {object_id: (100, 0.0) for object_id in object_ids}
+
+    plan = plan_rebalance(
+        object_backends, object_stats, [backend_a, backend_b], access_weight=0, tolerance=0.1
+    )
+
+    assert plan.loads_before == {backend_a: pytest.approx(1), backend_b: 0}
+    assert plan.loads_after[backend_a] == pytest.approx(0.5, abs=0.1)
+    assert plan.loads_after[backend_b] == pytest.approx(0.5, abs=0.1)
+    assert len(plan.transfers) == 1
+    assert plan.transfers[0].source == backend_a
+    assert plan.transfers[0].destination == backend_b
+    assert plan.num_bytes == 100 * plan.num_objects
+
+
+def test_plan_rebalance_balanced():
+    """Nothing is moved if the backends are within the tolerance"""
+    backend_a, backend_b = uuid4(), uuid4()
+    object_backends = {uuid4(): backend_a, uuid4(): backend_b}
+    object_stats = {object_id: (100, 1.0) for object_id in object_backends}
+
+    plan = plan_rebalance(object_backends, object_stats, [backend_a, backend_b])
+
+    assert plan.transfers == []
+    assert plan.loads_after == plan.loads_before
+
+
+def test_plan_rebalance_access_rate():
+    """With access weight 1, the accesses are balanced instead of the bytes"""
+    backend_a, backend_b = uuid4(), uuid4()
+    hot_id, cold_id = uuid4(), uuid4()
+    big_ids = [uuid4() for _ in range(4)]
+    object_backends = {hot_id: backend_a, cold_id: backend_a}
+    object_backends.update((object_id, backend_b) for object_id in big_ids)
+    object_stats = {hot_id: (10, 10.0), cold_id: (10, 10.0)}
+    object_stats.update((object_id, (1000, 0.0)) for object_id in big_ids)
+
+    plan = plan_rebalance(
+        object_backends, object_stats, [backend_a, backend_b], access_weight=1, tolerance=0
+    )
+
+    assert len(moved_objects(plan) & {hot_id, cold_id}) == 1
+    assert not moved_objects(plan) & set(big_ids)
+    assert plan.loads_after[backend_a] == pytest.approx(0.5)
+
+
+def test_plan_rebalance_default_size():
+    """Objects without stats are assumed to have the mean size"""
+    backend_a, backend_b = uuid4(), uuid4()
+    known_id, unknown_id = uuid4(), uuid4()
+    object_backends = {known_id: backend_a, unknown_id: backend_a}
+
+    plan = plan_rebalance(
+        object_backends, {known_id: (300, 0.0)}, [backend_a, backend_b], access_weight=0
+    )
+
+    assert plan.num_objects == 1
+    assert plan.num_bytes == 300
+
+
+def test_plan_rebalance_evacuate():
+    """All the objects of the evacuated backends, and only theirs, are moved"""
+    backend_a, backend_b, backend_c = uuid4(), uuid4(), uuid4()
+    evacuated_ids = {uuid4() for _ in range(6)}
+    other_ids = {uuid4() for _ in range(20)}
+    object_backends = {object_id: backend_a for object_id in evacuated_ids}
+    object_backends.update((object_id, backend_b) for object_id in other_ids)
+
+    plan = plan_rebalance(
+        object_backends, {}, [backend_a, backend_b, backend_c], evacuate=[backend_a]
+    )
+
+    assert moved_objects(plan) == evacuated_ids
+    assert plan.loads_after[backend_a] == pytest.approx(0)
+    assert all(transfer.source == backend_a for transfer in plan.transfers)
+    # The evacuated objects go to the least loaded backend
+    assert {transfer.destination for transfer in plan.transfers} == {backend_c}
+
+
+def test_plan_rebalance_evacuate_all():
+    backend_a = uuid4()
+    with pytest.raises(NoOtherBackendsAvailable):
+        plan_rebalance({uuid4(): backend_a}, {}, [backend_a], evacuate=[backend_a])
+
+
+def test_plan_rebalance_unavailable_backend():
+    """Objects in backends that are not available are not moved, nor counted"""
+    backend_a, backend_b, gone = uuid4(), uuid4(), uuid4()
+    object_backends = {uuid4(): gone for _ in range(5)}
+    object_backends[uuid4()] = backend_a
+
+    plan = plan_rebalance(object_backends, {}, [backend_a, backend_b], tolerance=0)
+
+    assert gone not in plan.loads_before
+    assert not moved_objects(plan) - {
+        object_id for object_id, backend_id in object_backends.items() if backend_id != gone
+    }
+
+
+def test_plan_rebalance_affinity_group():
+    """The objects of an affinity group are planned and moved as a single unit"""
+    backend_a, backend_b = uuid4(), uuid4()
+    group = [uuid4() for _ in range(3)]
+    singles = [uuid4() for _ in range(3)]
+    object_backends = {object_id: backend_a for object_id in group + singles}
+    object_stats = {object_id: (100, 0.0) for object_id in object_backends}
+    affinity = {group[0]: [group[1]], group[1]: [group[2]]}
+
+    plan = plan_rebalance(
+        object_backends,
+        object_stats,
+        [backend_a, backend_b],
+        access_weight=0,
+        tolerance=0.1,
+        affinity=affinity,
+    )
+
+    moved = moved_objects(plan)
+    assert set(group) <= moved or not moved & set(group)
+    assert plan.num_bytes == 100 * len(moved)
+    assert plan.loads_after[backend_b] == pytest.approx(len(moved) / 6)
+
+
+def test_plan_rebalance_affinity_across_backends():
+    """A group with members in several backends is sent by the evacuated one, in full"""
+    backend_a, backend_b, backend_c = uuid4(), uuid4(), uuid4()
+    evacuated_id, linked_id = uuid4(), uuid4()
+    object_backends = {evacuated_id: backend_a, linked_id: backend_b}
+
+    plan = plan_rebalance(
+        object_backends,
+        {},
+        [backend_a, backend_b, backend_c],
+        evacuate=[backend_a],
+        affinity={evacuated_id: [linked_id]},
+    )
+
+    assert len(plan.transfers) == 1
+    transfer = plan.transfers[0]
+    assert transfer.source == backend_a
+    assert {object_id for object_id, _ in transfer.objects} == {evacuated_id, linked_id}
+    assert plan.loads_after[transfer.destination] == pytest.approx(1)
+
+
+def test_transfer_batches():
+    backend_a, backend_b = uuid4(), uuid4()
+    object_ids = [uuid4() for _ in range(5)]
+    plan = plan_rebalance(
+        {object_id: backend_a for object_id in object_ids},
+        {object_id: (10, 0.0) for object_id in object_ids},
+        [backend_a, backend_b],
+        evacuate=[backend_a],
+    )
+
+    batches = list(plan.transfers[0].batches(25))
+    assert [num_bytes for _, num_bytes in batches] == [20, 20, 10]
+    assert [object_id for batch, _ in batches for object_id in batch] == [
+        object_id for object_id, _ in plan.transfers[0].objects
+    ]
+
+
+def test_plan_replica_evacuation():
+    """Replicas of the evacuated backend are recreated by the master in another backend"""
+    master, evacuated, other, spare = uuid4(), uuid4(), uuid4(), uuid4()
+    object_id, full_id, orphan_id = uuid4(), uuid4(), uuid4()
+    object_replicas = {
+        object_id: (master, {evacuated}),
+        # Already in all the other backends
+        full_id: (master, {evacuated, other, spare}),
+        # Master not available
+        orphan_id: (uuid4(), {evacuated}),
+        uuid4(): (master, {other}),
+    }
+
+    transfers = plan_replica_evacuation(
+        object_replicas,
+        {object_id: (500, 0.0)},
+        [master, evacuated, other, spare],
+        evacuate=[evacuated],
+    )
+
+    assert len(transfers) == 1
+    assert transfers[0].source == master
+    assert transfers[0].destination in (other, spare)
+    assert transfers[0].objects == [(object_id, 500)]
+
+
+def test_plan_replica_evacuation_spreads_replicas():
+    master, evacuated, backend_b, backend_c = uuid4(), uuid4(), uuid4(), uuid4()
+    object_replicas = {uuid4(): (master, {evacuated}) for _ in range(10)}
+
+    transfers = plan_replica_evacuation(
+        object_replicas, {}, [master, evacuated, backend_b, backend_c], evacuate=[evacuated]
+    )
+
+    assert {transfer.destination for transfer in transfers} == {backend_b, backend_c}
+    assert [len(transfer.objects) for transfer in transfers] == [5, 5]